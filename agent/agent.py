@@ -10,6 +10,8 @@ import platform
 import socket
 import uuid
 import json
+import gzip
+import hashlib
 import time
 import logging
 import argparse
@@ -37,6 +39,10 @@ else:
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 
+# Останній звіт, підтверджений сервером (база для дельта-протоколу)
+SNAPSHOT_FILE = BASE_DIR / "last_report.json"
+PROTOCOL_VERSION = 2
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s  %(levelname)-8s  %(message)s",
@@ -648,7 +654,6 @@ class SystemCollector:
                         continue
                     device_id = d.get("DeviceID", "")
                     # Генеруємо серійний з DeviceID
-                    import hashlib
                     serial = hashlib.md5(device_id.encode()).hexdigest()[:12].upper() if device_id else ""
                     devices.append({
                         "name": name,
@@ -683,6 +688,73 @@ class SystemCollector:
             return None
 
 
+# ---------------------------------------------------------------------------
+# Report hashing
+# ---------------------------------------------------------------------------
+def _canonical(value) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def compute_section_hashes(report: dict) -> dict:
+    """
+    SHA-256 хеші секцій звіту (hardware, software, peripherals).
+    Алгоритм збігається з inventory.agent_sync.compute_section_hashes на сервері.
+    """
+    hardware = {k: v for k, v in report.items() if k not in ("installed_software", "peripherals")}
+    sections = {
+        "hardware": hardware,
+        "software": sorted(_canonical(item) for item in report.get("installed_software") or []),
+        "peripherals": sorted(_canonical(item) for item in report.get("peripherals") or []),
+    }
+    return {
+        section: hashlib.sha256(_canonical(value).encode("utf-8")).hexdigest()
+        for section, value in sections.items()
+    }
+
+
+def build_report_delta(previous: dict, report: dict) -> dict:
+    """
+    Дельта між підтвердженим знімком і новим звітом:
+    змінені/видалені поля обладнання та added/removed для ПЗ і периферії.
+    """
+    lists = ("installed_software", "peripherals")
+    old_hw = {k: v for k, v in previous.items() if k not in lists}
+    new_hw = {k: v for k, v in report.items() if k not in lists}
+    delta = {
+        "hardware": {
+            "changed": {k: v for k, v in new_hw.items() if old_hw.get(k, object()) != v},
+            "removed": [k for k in old_hw if k not in new_hw],
+        },
+    }
+    for section in lists:
+        old_items = {_canonical(i): i for i in previous.get(section) or []}
+        new_items = {_canonical(i): i for i in report.get(section) or []}
+        delta[section] = {
+            "added": [new_items[k] for k in new_items.keys() - old_items.keys()],
+            "removed": [old_items[k] for k in old_items.keys() - new_items.keys()],
+        }
+    return delta
+
+
+def load_snapshot() -> dict | None:
+    try:
+        return json.loads(SNAPSHOT_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(report: dict, revision) -> None:
+    if not revision:
+        return
+    try:
+        SNAPSHOT_FILE.write_text(
+            json.dumps({"revision": revision, "report": report}, ensure_ascii=False, default=str),
+            encoding="utf-8",
+        )
+    except OSError as e:
+        log.warning(f"Не вдалося зберегти знімок звіту: {e}")
+
+
 # ---------------------------------------------------------------------------
 # API Client
 # ---------------------------------------------------------------------------
@@ -724,13 +796,12 @@ class AgentClient:
         self.session.headers["Authorization"] = f"Bearer {self.access_token}"
         log.info("Токен оновлено")
 
-    def send_report(self, data: dict) -> dict:
-        """Відправити звіт на /api/agent/report/. Авто-retry при 401."""
-        url = f"{self.api_url}/api/agent/report/"
-        log.info(f"Відправка звіту на {url}...")
-
+    def _post_gzip(self, url: str, payload: dict, headers: dict) -> requests.Response:
+        """POST стиснутого gzip JSON. Авто-retry при 401."""
+        body = gzip.compress(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+        headers = {**headers, "Content-Encoding": "gzip"}
         for attempt in range(2):
-            resp = self.session.post(url, json=data, timeout=30)
+            resp = self.session.post(url, data=body, headers=headers, timeout=30)
             if resp.status_code == 401 and attempt == 0:
                 log.warning("Токен протух, оновлюю...")
                 try:
@@ -739,9 +810,47 @@ class AgentClient:
                     self.authenticate()
                 continue
             break
+        return resp
+
+    def send_report(self, data: dict) -> dict:
+        """
+        Відправити звіт. Якщо є підтверджений знімок — надсилається лише дельта
+        на /api/agent/report/delta/, інакше повний звіт на /api/agent/report/.
+        """
+        # Хеші секцій дозволяють серверу відповісти "not modified" без розбору тіла
+        hashes = compute_section_hashes(data)
+        headers = {
+            "X-Agent-Serial": str(data.get("serial_number", "")),
+            "X-Agent-Report-Hashes": ", ".join(f"{k}={v}" for k, v in hashes.items()),
+        }
+
+        resp = None
+        snapshot = load_snapshot()
+        if snapshot and snapshot.get("report", {}).get("serial_number") == data.get("serial_number"):
+            delta = build_report_delta(snapshot["report"], data)
+            delta.update({
+                "protocol": PROTOCOL_VERSION,
+                "serial_number": data.get("serial_number"),
+                "base_revision": snapshot.get("revision"),
+            })
+            url = f"{self.api_url}/api/agent/report/delta/"
+            log.info(f"Відправка дельти звіту на {url}...")
+            resp = self._post_gzip(url, delta, headers)
+            if resp.status_code in (400, 404, 409):
+                log.warning(f"Дельту не прийнято ({resp.status_code}), надсилаю повний звіт")
+                resp = None
+
+        if resp is None:
+            url = f"{self.api_url}/api/agent/report/"
+            log.info(f"Відправка звіту на {url}...")
+            resp = self._post_gzip(url, data, headers)
 
         if resp.status_code in (200, 201):
             result = resp.json()
+            save_snapshot(data, result.get("revision"))
+            if result.get("status") == "not_modified":
+                log.info(f"Обладнання #{result.get('equipment_id')} без змін — оновлено лише heartbeat")
+                return result
             action = "Створено" if result.get("created") else "Оновлено"
             log.info(
                 f"{action} обладнання #{result.get('equipment_id')} | "
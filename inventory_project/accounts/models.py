@@ -186,6 +186,7 @@ class CustomUser(AbstractUser):
             models.Index(fields=["department", "is_active"]),
             models.Index(fields=["position", "is_active"]),
             models.Index(fields=["manager"]),
+            models.Index(fields=["date_joined", "id"], name="idx_user_joined_id"),
         ]
 
     def clean(self):
@@ -259,11 +260,15 @@ class CustomUser(AbstractUser):
 
     def get_assigned_equipment_count(self):
         """Кількість призначеного обладнання"""
-        return self.assigned_equipment.filter(status="WORKING").count()
+        from inventory.counters import EquipmentCounterService
+
+        return EquipmentCounterService.get("user_status", f"{self.pk}:WORKING")
 
     def get_responsible_equipment_count(self):
         """Кількість обладнання під відповідальністю"""
-        return self.responsible_equipment.filter(status="WORKING").count()
+        from inventory.counters import EquipmentCounterService
+
+        return EquipmentCounterService.get("responsible_status", f"{self.pk}:WORKING")
 
     def get_subordinates_count(self):
         """Кількість підлеглих"""
@@ -277,31 +282,13 @@ class CustomUser(AbstractUser):
 
     def get_equipment_needing_attention(self):
         """Обладнання що потребує уваги"""
-        from datetime import timedelta
-
-        from django.utils import timezone
-
         from inventory.models import Equipment
 
-        user_equipment = Equipment.objects.filter(
-            models.Q(current_user=self) | models.Q(responsible_person=self)
-        ).distinct()
-
-        today = timezone.now().date()
-
+        counts = Equipment.objects.for_user(self).attention_counts()
         return {
-            "expiring_soon": user_equipment.filter(
-                expiry_date__lte=today + timedelta(days=30),
-                expiry_date__gte=today,
-                status="WORKING",
-            ).count(),
-            "needs_maintenance": len(
-                [eq for eq in user_equipment if eq.needs_maintenance()]
-            ),
-            "warranty_expiring": user_equipment.filter(
-                warranty_until__lte=today + timedelta(days=30),
-                warranty_until__gte=today,
-            ).count(),
+            "expiring_soon": counts["expiring_soon"],
+            "needs_maintenance": counts["needs_maintenance"],
+            "warranty_expiring": counts["warranty_expiring"],
         }
 
     def can_manage_equipment(self, equipment):
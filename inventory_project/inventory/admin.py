@@ -10,6 +10,7 @@ from unfold.contrib.filters.admin import (
 )
 from unfold.decorators import action, display
 
+from django.conf import settings
 from django.contrib import admin, messages
 from django.db import models
 from django.db.models import Q, Sum
@@ -28,6 +29,9 @@ from simple_history.admin import SimpleHistoryAdmin
 
 from django.utils.translation import gettext_lazy as _
 
+from .codes import DEFAULT_CODE_SIZE
+from .depreciation import annotate_depreciation
+from .labels import LabelSheetService, code_executor, render_codes
 from .maintenance import MaintenanceRequest, MaintenanceSchedule, MaintenanceTask
 from .models import (
     CustomDashboard,
@@ -56,6 +60,7 @@ from .spare_parts import (
     StorageLocation,
     Supplier,
 )
+from .tasks import generate_label_sheet
 
 
 class EquipmentLocationFilter(admin.SimpleListFilter):
@@ -203,7 +208,12 @@ class EquipmentAdmin(SimpleHistoryAdmin, ModelAdmin):
         (
             _("Фінансова інформація"),
             {
-                "fields": ("supplier", "purchase_price", "depreciation_rate"),
+                "fields": (
+                    "supplier",
+                    "purchase_price",
+                    "depreciation_rate",
+                    "depreciation_method",
+                ),
                 "classes": ["tab"],
             },
         ),
@@ -258,6 +268,10 @@ class EquipmentAdmin(SimpleHistoryAdmin, ModelAdmin):
     def warranty_active(self, obj):
         return obj.is_under_warranty()
 
+    def get_queryset(self, request):
+        # Поточна вартість рахується в SQL для всієї сторінки списку
+        return annotate_depreciation(super().get_queryset(request))
+
     # Додаємо get_age_display до list_display
     def get_list_display(self, request):
         list_display = list(self.list_display)
@@ -387,9 +401,9 @@ class EquipmentAdmin(SimpleHistoryAdmin, ModelAdmin):
     )
     def mark_as_disposed(self, request, queryset):
         """Списати обладнання"""
-        updated = queryset.filter(status__in=["WORKING", "REPAIR", "STORAGE"]).update(
-            status="DISPOSED"
-        )
+        updated = queryset.filter(
+            status__in=["WORKING", "REPAIR", "STORAGE"]
+        ).update_tracked(status="DISPOSED")
 
         # Створити уведомлення
         for equipment in queryset.filter(status="DISPOSED"):
@@ -452,27 +466,35 @@ class EquipmentAdmin(SimpleHistoryAdmin, ModelAdmin):
         )
 
     @action(
-        description=_("Згенерувати QR-коди"),
+        description=_("Друк етикеток з QR-кодами (PDF)"),
         permissions=["generate_qr_codes"],
     )
     def generate_qr_codes(self, request, queryset):
-        """Згенерувати QR-коди для обладнання"""
-        updated = 0
-        for equipment in queryset:
-            try:
-                equipment.generate_qrcode()
-                equipment.save(update_fields=["qrcode_image"])
-                updated += 1
-            except Exception as e:
-                messages.error(
-                    request, f"Помилка генерації QR-коду для {equipment.name}: {e}"
-                )
+        """Сформувати аркуш етикеток; великі вибірки — у фоновому завданні"""
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True))
 
-        self.message_user(
-            request,
-            f"Згенеровано QR-коди для {updated} одиниць обладнання",
-            messages.SUCCESS,
+        if len(ids) > settings.LABEL_SHEET_SYNC_LIMIT:
+            task = generate_label_sheet.delay("equipment", ids=ids)
+            self.message_user(
+                request,
+                f"Формування етикеток для {len(ids)} одиниць обладнання запущено "
+                f"у фоні (завдання {task.id})",
+                messages.INFO,
+            )
+            return None
+
+        response = HttpResponse(content_type="application/pdf")
+        response["Content-Disposition"] = (
+            f'attachment; filename="labels_{timezone.now().strftime("%Y%m%d")}.pdf"'
+        )
+        LabelSheetService.build(
+            LabelSheetService.iter_labels(
+                LabelSheetService.get_queryset("equipment", ids=ids), "qrcode"
+            ),
+            response,
+            total=len(ids),
         )
+        return response
 
     @action(
         description=_("Експортувати в CSV"),
@@ -605,21 +627,28 @@ class EquipmentAdmin(SimpleHistoryAdmin, ModelAdmin):
         permissions=["generate_qr_codes"],
     )
     def regenerate_qr_codes(self, request, queryset):
-        """Повторно згенерувати QR-коди"""
-        updated = 0
-        for equipment in queryset:
-            try:
-                equipment.generate_qrcode()
-                equipment.save(update_fields=["qrcode_image"])
-                updated += 1
-            except Exception as e:
-                messages.error(
-                    request, f"Помилка оновлення QR-коду для {equipment.name}: {e}"
+        """Повторно згенерувати QR-коди (рендеринг у пулі процесів, один bulk_update)"""
+        items = [equipment for equipment in queryset if equipment.get_code_value()]
+        try:
+            with code_executor() as executor:
+                images = render_codes(
+                    [
+                        ("qrcode", equipment.get_qrcode_data(), DEFAULT_CODE_SIZE)
+                        for equipment in items
+                    ],
+                    executor,
                 )
+        except Exception as e:
+            messages.error(request, f"Помилка оновлення QR-кодів: {e}")
+            return
+
+        for equipment, content in zip(items, images):
+            equipment.generate_qrcode(content)
+        Equipment.objects.bulk_update(items, ["qrcode_image"], batch_size=500)
 
         self.message_user(
             request,
-            f"Оновлено QR-коди для {updated} одиниць обладнання",
+            f"Оновлено QR-коди для {len(items)} одиниць обладнання",
             messages.SUCCESS,
         )
 
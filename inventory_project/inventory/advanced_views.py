@@ -1,7 +1,7 @@
 # inventory/advanced_views.py — Нові моделі, серіалізатори та views
 import io
 import logging
-from decimal import Decimal
+from datetime import datetime
 
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -19,7 +19,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .depreciation import DepreciationSnapshotService
 from .models import Equipment, UserActivity
+from .pagination import KeysetPagination
 
 logger = logging.getLogger("inventory")
 User = get_user_model()
@@ -342,8 +344,8 @@ class ActivityLogView(APIView):
                 | Q(user__username__icontains=search)
             )
 
-        paginator = StandardPagination()
-        page = paginator.paginate_queryset(qs.order_by("-timestamp"), request)
+        paginator = KeysetPagination(ordering="-timestamp")
+        page = paginator.paginate_queryset(qs, request)
         serializer = ActivityLogSerializer(page, many=True)
         return paginator.get_paginated_response(serializer.data)
 
@@ -358,71 +360,11 @@ class GlobalSearchView(APIView):
         if not q or len(q) < 2:
             return Response({"results": {}, "total": 0})
 
-        results = {}
-        total = 0
-
-        # Обладнання
-        equipment_qs = Equipment.objects.filter(
-            Q(name__icontains=q)
-            | Q(serial_number__icontains=q)
-            | Q(inventory_number__icontains=q)
-            | Q(model__icontains=q)
-            | Q(location__icontains=q)
-        )[:5]
-        if equipment_qs.exists():
-            results["equipment"] = [
-                {
-                    "type": "equipment",
-                    "id": e.id,
-                    "title": e.name,
-                    "subtitle": f'{e.get_category_display()} • {e.serial_number or "—"}',
-                    "url": f"/equipment/{e.id}",
-                }
-                for e in equipment_qs
-            ]
-            total += len(results["equipment"])
-
-        # Користувачі
-        users_qs = User.objects.filter(
-            Q(first_name__icontains=q)
-            | Q(last_name__icontains=q)
-            | Q(username__icontains=q)
-            | Q(email__icontains=q)
-        )[:5]
-        if users_qs.exists():
-            results["users"] = [
-                {
-                    "type": "user",
-                    "id": u.id,
-                    "title": u.get_full_name() or u.username,
-                    "subtitle": u.email,
-                    "url": f"/users/{u.id}",
-                }
-                for u in users_qs
-            ]
-            total += len(results["users"])
+        from .search import SearchService
 
-        # Договори
-        try:
-            contracts_qs = Contract.objects.filter(
-                Q(title__icontains=q)
-                | Q(contract_number__icontains=q)
-                | Q(counterparty__icontains=q)
-            )[:5]
-            if contracts_qs.exists():
-                results["contracts"] = [
-                    {
-                        "type": "contract",
-                        "id": c.id,
-                        "title": c.title,
-                        "subtitle": f"{c.contract_number} • {c.counterparty}",
-                        "url": "/contracts",
-                    }
-                    for c in contracts_qs
-                ]
-                total += len(results["contracts"])
-        except Exception:
-            pass
+        # Обладнання, користувачі та договори — з пошукового індексу
+        results = SearchService.search(q, kinds=("equipment", "users", "contracts"))
+        total = sum(len(items) for items in results.values())
 
         # Запис активності
         UserActivity.objects.create(
@@ -436,101 +378,88 @@ class GlobalSearchView(APIView):
         return Response({"results": results, "total": total})
 
 
+def _parse_report_month(request):
+    """?month=YYYY-MM -> перше число місяця або None; ValueError при помилці"""
+    value = request.query_params.get("month")
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m").date()
+
+
 class DepreciationReportView(APIView):
     """Амортизаційний звіт"""
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        equipment = Equipment.objects.filter(
-            purchase_price__isnull=False, purchase_price__gt=0
-        ).select_related("current_user")
-
-        items = []
-        total_purchase = Decimal("0")
-        total_book = Decimal("0")
-        total_depreciation = Decimal("0")
-        rates = []
-
-        for eq in equipment:
-            purchase_price = eq.purchase_price or Decimal("0")
-            rate = eq.depreciation_rate or Decimal("20")  # default 20%
-            age_years = eq.get_age_in_years() if hasattr(eq, "get_age_in_years") else 0
+        try:
+            month = _parse_report_month(request)
+        except ValueError:
+            return Response(
+                {"error": "Очікується місяць у форматі YYYY-MM"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            # Прямолінійний метод
-            annual_dep = purchase_price * rate / 100
-            accumulated = min(annual_dep * Decimal(str(age_years)), purchase_price)
-            book_value = max(purchase_price - accumulated, Decimal("0"))
-            monthly = annual_dep / 12
+        # Закриті місяці — зі знімків, поточний — наживо
+        report = DepreciationSnapshotService.report(month)
+        categories = dict(Equipment.CATEGORY_CHOICES)
 
-            items.append(
-                {
-                    "id": eq.id,
-                    "name": eq.name,
-                    "category": eq.get_category_display(),
-                    "purchase_date": (
-                        eq.purchase_date.isoformat() if eq.purchase_date else None
-                    ),
-                    "purchase_price": float(purchase_price),
-                    "depreciation_rate": float(rate),
-                    "age_years": float(age_years),
-                    "accumulated_depreciation": float(accumulated),
-                    "book_value": float(book_value),
-                    "monthly_depreciation": float(monthly),
-                }
-            )
+        items = [
+            {
+                "id": eq["equipment_id"],
+                "name": eq["name"],
+                "category": categories.get(eq["category"], eq["category"]),
+                "purchase_date": (
+                    eq["purchase_date"].isoformat() if eq["purchase_date"] else None
+                ),
+                "purchase_price": float(eq["purchase_price"]),
+                "depreciation_rate": float(eq["depreciation_rate"]),
+                "depreciation_method": eq["depreciation_method"],
+                "age_years": float(eq["age_years"]),
+                "accumulated_depreciation": float(eq["accumulated_depreciation"]),
+                "book_value": float(eq["book_value"]),
+                "monthly_depreciation": float(eq["monthly_depreciation"]),
+            }
+            for eq in report["items"]
+        ]
 
-            total_purchase += purchase_price
-            total_book += book_value
-            total_depreciation += accumulated
-            rates.append(float(rate))
-
-        # По категоріях
-        by_category = {}
-        for item in items:
-            cat = item["category"]
-            if cat not in by_category:
-                by_category[cat] = {
-                    "category": cat,
-                    "purchase_value": 0,
-                    "book_value": 0,
-                    "depreciation": 0,
-                }
-            by_category[cat]["purchase_value"] += item["purchase_price"]
-            by_category[cat]["book_value"] += item["book_value"]
-            by_category[cat]["depreciation"] += item["accumulated_depreciation"]
+        category_rows = report["by_category"]
+        by_category = [
+            {
+                "category": categories.get(row["category"], row["category"]),
+                "purchase_value": float(row["total_purchase"]),
+                "book_value": float(row["total_book"]),
+                "depreciation": float(row["total_depreciation"]),
+            }
+            for row in category_rows
+        ]
 
-        # По локаціях
         by_location = {}
-        for eq in equipment:
-            loc = eq.location or "Не вказано"
-            if loc not in by_location:
-                by_location[loc] = {
-                    "location": loc,
-                    "purchase_value": 0,
-                    "book_value": 0,
-                    "count": 0,
-                }
-            pp = float(eq.purchase_price or 0)
-            rate = float(eq.depreciation_rate or 20)
-            age = float(eq.get_age_in_years()) if hasattr(eq, "get_age_in_years") else 0
-            annual = pp * rate / 100
-            acc = min(annual * age, pp)
-            bv = max(pp - acc, 0)
-            by_location[loc]["purchase_value"] += pp
-            by_location[loc]["book_value"] += bv
-            by_location[loc]["count"] += 1
+        for row in report["by_location"]:
+            loc = row["location"] or "Не вказано"
+            entry = by_location.setdefault(
+                loc, {"location": loc, "purchase_value": 0, "book_value": 0, "count": 0}
+            )
+            entry["purchase_value"] += float(row["total_purchase"])
+            entry["book_value"] += float(row["total_book"])
+            entry["count"] += row["count"]
 
+        count = sum(row["count"] for row in category_rows)
+        rate_sum = sum(float(row["avg_rate"]) * row["count"] for row in category_rows)
         return Response(
             {
+                "month": report["month"],
+                "source": report["source"],
                 "items": items,
                 "summary": {
-                    "total_purchase_value": float(total_purchase),
-                    "total_book_value": float(total_book),
-                    "total_depreciation": float(total_depreciation),
-                    "avg_depreciation_rate": sum(rates) / len(rates) if rates else 0,
+                    "total_purchase_value": sum(
+                        c["purchase_value"] for c in by_category
+                    ),
+                    "total_book_value": sum(c["book_value"] for c in by_category),
+                    "total_depreciation": sum(c["depreciation"] for c in by_category),
+                    "avg_depreciation_rate": rate_sum / count if count else 0,
                 },
-                "by_category": list(by_category.values()),
+                "by_category": by_category,
                 "by_location": list(by_location.values()),
             }
         )
@@ -812,42 +741,39 @@ class ExportReportView(APIView):
         fmt = request.query_params.get("export_format", "excel")
 
         if report_type == "depreciation":
-            return self._export_depreciation(fmt)
+            try:
+                month = _parse_report_month(request)
+            except ValueError:
+                return Response(
+                    {"error": "Очікується місяць у форматі YYYY-MM"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            return self._export_depreciation(fmt, month)
 
         # Fallback to existing ExportView for other types
         from .views import ExportView
 
         return ExportView().get(request)
 
-    def _export_depreciation(self, fmt):
+    def _export_depreciation(self, fmt, month=None):
         """Експорт амортизаційного звіту"""
-        equipment = Equipment.objects.filter(
-            purchase_price__isnull=False, purchase_price__gt=0
-        )
-
-        rows = []
-        for eq in equipment:
-            pp = float(eq.purchase_price or 0)
-            rate = float(eq.depreciation_rate or 20)
-            age = float(eq.get_age_in_years()) if hasattr(eq, "get_age_in_years") else 0
-            annual = pp * rate / 100
-            acc = min(annual * age, pp)
-            bv = max(pp - acc, 0)
-            rows.append(
-                {
-                    "name": eq.name,
-                    "category": eq.get_category_display(),
-                    "purchase_date": (
-                        eq.purchase_date.isoformat() if eq.purchase_date else ""
-                    ),
-                    "purchase_price": pp,
-                    "rate": rate,
-                    "age": round(age, 1),
-                    "depreciation": round(acc, 2),
-                    "book_value": round(bv, 2),
-                    "monthly": round(annual / 12, 2),
-                }
-            )
+        categories = dict(Equipment.CATEGORY_CHOICES)
+        rows = [
+            {
+                "name": eq["name"],
+                "category": categories.get(eq["category"], eq["category"]),
+                "purchase_date": (
+                    eq["purchase_date"].isoformat() if eq["purchase_date"] else ""
+                ),
+                "purchase_price": float(eq["purchase_price"]),
+                "rate": float(eq["depreciation_rate"]),
+                "age": round(float(eq["age_years"]), 1),
+                "depreciation": float(eq["accumulated_depreciation"]),
+                "book_value": float(eq["book_value"]),
+                "monthly": float(eq["monthly_depreciation"]),
+            }
+            for eq in DepreciationSnapshotService.report(month)["items"]
+        ]
 
         if fmt == "excel":
             return self._depreciation_excel(rows)
@@ -1005,19 +931,19 @@ class BulkOperationsView(APIView):
         if action_type == "change_status":
             new_status = request.data.get("status")
             if new_status:
-                equipment.update(status=new_status)
+                equipment.update_tracked(status=new_status)
                 return Response({"message": f"Статус змінено для {count} одиниць"})
 
         elif action_type == "change_location":
             location = request.data.get("location")
             if location:
-                equipment.update(location=location)
+                equipment.update_tracked(location=location)
                 return Response({"message": f"Локацію змінено для {count} одиниць"})
 
         elif action_type == "assign_user":
             user_id = request.data.get("user_id")
             if user_id:
-                equipment.update(current_user_id=user_id)
+                equipment.update_tracked(current_user_id=user_id)
                 return Response(
                     {"message": f"Користувача призначено для {count} одиниць"}
                 )
@@ -0,0 +1,511 @@
+# inventory/agent_sync.py - Пакетний прийом звітів агента інвентаризації
+import gzip
+import hashlib
+import json
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .models import Equipment, PeripheralDevice, Software
+
+logger = logging.getLogger("inventory")
+
+# Секції звіту, для яких зберігається хеш вмісту
+REPORT_SECTIONS = ("hardware", "software", "peripherals")
+
+# Заголовки, в яких агент передає хеші секцій ще до розбору тіла запиту
+AGENT_SERIAL_HEADER = "HTTP_X_AGENT_SERIAL"
+AGENT_HASHES_HEADER = "HTTP_X_AGENT_REPORT_HASHES"
+
+# Версія дельта-протоколу між агентом та сервером
+AGENT_PROTOCOL_VERSION = 2
+
+# Списки звіту, що передаються в дельті як added/removed
+DELTA_LIST_SECTIONS = ("installed_software", "peripherals")
+
+
+# Поля звіту агента, що переносяться в Equipment (джерело -> поле моделі)
+EQUIPMENT_FIELD_MAP = {
+    "name": "name",
+    "category": "category",
+    "model": "model",
+    "manufacturer": "manufacturer",
+    "inventory_number": "inventory_number",
+    "asset_tag": "asset_tag",
+    "location": "location",
+    "building": "building",
+    "floor": "floor",
+    "room": "room",
+    "status": "status",
+    "priority": "priority",
+    "ip_address": "ip_address",
+    "mac_address": "mac_address",
+    "hostname": "hostname",
+    "cpu": "cpu",
+    "ram": "ram",
+    "storage": "storage",
+    "gpu": "gpu",
+    "motherboard": "motherboard",
+    "motherboard_serial": "motherboard_serial",
+    "disk_model": "disk_model",
+    "display": "display",
+    "network_adapter": "network_adapter",
+    "power_supply": "power_supply",
+    "bios_version": "bios_version",
+    "operating_system": "operating_system",
+    "description": "description",
+    "notes": "notes",
+    "supplier": "supplier",
+}
+
+
+# ============ MODELS ============
+
+
+class AgentReportState(models.Model):
+    """Хеші останнього прийнятого звіту агента по секціях"""
+
+    serial_number = models.CharField(
+        max_length=255, unique=True, verbose_name="Серійний номер"
+    )
+    equipment = models.OneToOneField(
+        Equipment,
+        on_delete=models.CASCADE,
+        related_name="agent_report_state",
+        verbose_name="Обладнання",
+    )
+    hardware_hash = models.CharField(max_length=64, blank=True, default="")
+    software_hash = models.CharField(max_length=64, blank=True, default="")
+    peripherals_hash = models.CharField(max_length=64, blank=True, default="")
+    snapshot = models.JSONField(
+        default=dict, blank=True, verbose_name="Останній підтверджений звіт"
+    )
+    revision = models.PositiveIntegerField(default=0, verbose_name="Ревізія")
+    last_seen_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Останній звіт"
+    )
+
+    class Meta:
+        app_label = "inventory"
+        verbose_name = "Стан звіту агента"
+        verbose_name_plural = "Стани звітів агентів"
+
+    def __str__(self):
+        return self.serial_number
+
+    def get_hashes(self) -> dict:
+        return {
+            section: getattr(self, f"{section}_hash") for section in REPORT_SECTIONS
+        }
+
+
+# ============ HASHING ============
+
+
+def _canonical(value) -> str:
+    return json.dumps(
+        value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+
+
+def compute_section_hashes(data: dict) -> dict:
+    """
+    Канонічні SHA-256 хеші секцій звіту.
+    Порядок ключів та елементів списків не впливає на результат —
+    агент рахує хеші тим самим алгоритмом.
+    """
+    hardware = {
+        key: value
+        for key, value in data.items()
+        if key not in ("installed_software", "peripherals")
+    }
+    sections = {
+        "hardware": hardware,
+        "software": sorted(
+            _canonical(item) for item in data.get("installed_software") or []
+        ),
+        "peripherals": sorted(
+            _canonical(item) for item in data.get("peripherals") or []
+        ),
+    }
+    return {
+        section: hashlib.sha256(_canonical(value).encode("utf-8")).hexdigest()
+        for section, value in sections.items()
+    }
+
+
+def parse_hashes_header(value: str) -> dict:
+    """Розібрати заголовок виду 'hardware=<hex>, software=<hex>, peripherals=<hex>'"""
+    hashes = {}
+    for part in (value or "").split(","):
+        section, _, digest = part.strip().partition("=")
+        if section in REPORT_SECTIONS and digest:
+            hashes[section] = digest.strip().lower()
+    return hashes
+
+
+# ============ DELTA ============
+
+
+def apply_report_delta(snapshot: dict, delta: dict) -> dict:
+    """
+    Відновити повний звіт з підтвердженого знімка та дельти агента.
+    Елементи списків порівнюються за канонічним JSON, тому зміна
+    елемента передається як пара removed/added.
+    """
+    report = {
+        key: value for key, value in snapshot.items() if key not in DELTA_LIST_SECTIONS
+    }
+    hardware = delta.get("hardware") or {}
+    report.update(hardware.get("changed") or {})
+    for key in hardware.get("removed") or []:
+        report.pop(key, None)
+
+    for section in DELTA_LIST_SECTIONS:
+        items = {_canonical(item): item for item in snapshot.get(section) or []}
+        patch = delta.get(section) or {}
+        for item in patch.get("removed") or []:
+            items.pop(_canonical(item), None)
+        for item in patch.get("added") or []:
+            items[_canonical(item)] = item
+        report[section] = [items[key] for key in sorted(items)]
+
+    report["serial_number"] = delta["serial_number"]
+    return report
+
+
+class GzipJSONParser(JSONParser):
+    """JSON-парсер, що приймає тіло з Content-Encoding: gzip"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get("request")
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "") if request else ""
+        if "gzip" not in encoding.lower() or stream is None:
+            return super().parse(stream, media_type, parser_context)
+
+        limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0
+        try:
+            with gzip.GzipFile(fileobj=stream) as gz:
+                raw = gz.read(limit + 1) if limit else gz.read()
+        except (OSError, EOFError) as e:
+            raise ParseError(f"Некоректне gzip-тіло запиту: {e}")
+        if limit and len(raw) > limit:
+            raise ParseError("Розпакований звіт перевищує допустимий розмір")
+
+        try:
+            return json.loads(raw.decode("utf-8"))
+        except ValueError as e:
+            raise ParseError(f"JSON parse error - {e}")
+
+
+# ============ SERVICE ============
+
+
+class QueryCounter:
+    """Лічильник SQL-запитів, виконаних у межах контексту"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    """Контекст, що рахує запити до БД без увімкненого DEBUG"""
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+class AgentIngestService:
+    """Сервіс пакетної синхронізації звіту агента з БД"""
+
+    @staticmethod
+    def check_not_modified(serial_number: str, hashes: dict):
+        """
+        Перевірити хеші, надіслані агентом до розбору тіла звіту.
+        Якщо жодна секція не змінилась — оновлює лише heartbeat і
+        повертає AgentReportState, інакше None.
+        """
+        if not serial_number or set(hashes) != set(REPORT_SECTIONS):
+            return None
+
+        state = (
+            AgentReportState.objects.filter(serial_number=serial_number)
+            .only("equipment_id", "revision", *(f"{s}_hash" for s in REPORT_SECTIONS))
+            .first()
+        )
+        if state is None or state.get_hashes() != hashes:
+            return None
+
+        AgentIngestService._touch_heartbeat(state.equipment_id)
+        return state
+
+    @staticmethod
+    def rebuild_from_delta(delta: dict):
+        """
+        Застосувати дельту до збереженого знімка.
+        Повертає (повний звіт, None) або (None, поточна ревізія), якщо
+        дельта побудована не від останнього підтвердженого знімка.
+        """
+        state = (
+            AgentReportState.objects.filter(serial_number=delta["serial_number"])
+            .only("snapshot", "revision")
+            .first()
+        )
+        current = state.revision if state else 0
+        if state is None or not state.snapshot or delta.get("base_revision") != current:
+            return None, current
+        return apply_report_delta(state.snapshot, delta), None
+
+    @staticmethod
+    def _touch_heartbeat(equipment_id: int):
+        """Оновити updated_at без save(), щоб не перегенеровувати коди"""
+        now = timezone.now()
+        Equipment.objects.filter(pk=equipment_id).update(updated_at=now)
+        AgentReportState.objects.filter(equipment_id=equipment_id).update(
+            last_seen_at=now
+        )
+
+    @staticmethod
+    def ingest(data: dict) -> dict:
+        """
+        Застосувати звіт агента в одній транзакції.
+        Секції, хеш яких збігається з останнім звітом, пропускаються.
+        Повертає підсумок синхронізації разом з кількістю виконаних запитів.
+        """
+        serial_number = data["serial_number"]
+        hashes = compute_section_hashes(data)
+        software = {"synced": 0, "added": 0, "removed": 0}
+        peripherals = {"synced": 0}
+        created = False
+
+        with count_queries() as counter, transaction.atomic():
+            state = (
+                AgentReportState.objects.select_for_update()
+                .filter(serial_number=serial_number)
+                .first()
+            )
+            previous = state.get_hashes() if state else {}
+            skipped = [s for s in REPORT_SECTIONS if previous.get(s) == hashes[s]]
+
+            if len(skipped) == len(REPORT_SECTIONS):
+                equipment_id = state.equipment_id
+                revision = state.revision
+                AgentIngestService._touch_heartbeat(equipment_id)
+            else:
+                if "hardware" in skipped:
+                    equipment = Equipment.objects.get(pk=state.equipment_id)
+                else:
+                    equipment, created = Equipment.objects.update_or_create(
+                        serial_number=serial_number,
+                        defaults=AgentIngestService.build_equipment_fields(data),
+                    )
+                equipment_id = equipment.id
+
+                if "software" not in skipped:
+                    software = AgentIngestService.sync_software(
+                        equipment, data.get("installed_software", [])
+                    )
+                if "peripherals" not in skipped:
+                    peripherals = AgentIngestService.sync_peripherals(
+                        equipment, data.get("peripherals", [])
+                    )
+
+                revision = (state.revision if state else 0) + 1
+                AgentReportState.objects.update_or_create(
+                    serial_number=serial_number,
+                    defaults={
+                        "equipment": equipment,
+                        "snapshot": dict(data),
+                        "revision": revision,
+                        "last_seen_at": timezone.now(),
+                        **{f"{s}_hash": hashes[s] for s in REPORT_SECTIONS},
+                    },
+                )
+
+        logger.info(
+            f"Звіт агента {serial_number}: ПЗ +{software['added']}/-{software['removed']}, "
+            f"периферія {peripherals['synced']}, пропущено: {', '.join(skipped) or '-'}, "
+            f"запитів до БД: {counter.count}"
+        )
+
+        return {
+            "equipment_id": equipment_id,
+            "created": created,
+            "software_synced": software["synced"],
+            "software_added": software["added"],
+            "software_removed": software["removed"],
+            "peripherals_synced": peripherals["synced"],
+            "skipped_sections": skipped,
+            "hashes": hashes,
+            "revision": revision,
+            "queries": counter.count,
+        }
+
+    @staticmethod
+    def build_equipment_fields(data: dict) -> dict:
+        """Поля Equipment зі звіту з урахуванням значень за замовчуванням"""
+        fields = {}
+        for src, dst in EQUIPMENT_FIELD_MAP.items():
+            val = data.get(src)
+            if val is not None and val != "":
+                fields[dst] = val
+
+        fields.setdefault("name", data["serial_number"])
+        fields.setdefault("category", "PC")
+        fields.setdefault("status", "WORKING")
+        return fields
+
+    @staticmethod
+    def sync_software(equipment: Equipment, installed_software: list) -> dict:
+        """
+        Синхронізувати встановлене ПЗ множинами:
+        один запит на пошук (name, version), bulk_create відсутніх записів
+        та додавання/видалення лише різниці у проміжній таблиці.
+        """
+        reported = {}
+        for sw in installed_software:
+            name = (sw.get("name") or "").strip()
+            if not name:
+                continue
+            key = (name, sw.get("version", "") or "")
+            reported.setdefault(key, sw.get("vendor", "") or "")
+
+        if not reported:
+            desired_ids = set()
+        else:
+            names = {name for name, _ in reported}
+            versions = {version for _, version in reported}
+            resolved = {}
+            for sw_id, name, version in (
+                Software.objects.filter(name__in=names, version__in=versions)
+                .order_by("id")
+                .values_list("id", "name", "version")
+            ):
+                # Перший (найстаріший) запис з однаковою парою — канонічний
+                if (name, version) in reported:
+                    resolved.setdefault((name, version), sw_id)
+
+            missing = [
+                Software(name=name, version=version, vendor=vendor)
+                for (name, version), vendor in reported.items()
+                if (name, version) not in resolved
+            ]
+            if missing:
+                from .search import SearchService
+
+                created = Software.objects.bulk_create(missing)
+                for sw_obj in created:
+                    resolved[(sw_obj.name, sw_obj.version)] = sw_obj.id
+                # bulk_create обходить post_save, тож індексуємо нове ПЗ явно
+                SearchService.index_objects("software", created)
+            desired_ids = set(resolved.values())
+
+        through = Software.installed_on.through
+        current_ids = set(
+            through.objects.filter(equipment_id=equipment.id).values_list(
+                "software_id", flat=True
+            )
+        )
+
+        to_add = desired_ids - current_ids
+        to_remove = current_ids - desired_ids
+        if to_add:
+            through.objects.bulk_create(
+                [
+                    through(software_id=sw_id, equipment_id=equipment.id)
+                    for sw_id in to_add
+                ]
+            )
+        if to_remove:
+            through.objects.filter(
+                equipment_id=equipment.id, software_id__in=to_remove
+            ).delete()
+
+        return {
+            "synced": len(desired_ids),
+            "added": len(to_add),
+            "removed": len(to_remove),
+        }
+
+    @staticmethod
+    def sync_peripherals(equipment: Equipment, peripherals: list) -> dict:
+        """
+        Синхронізувати периферію: існуючі пристрої завантажуються одним запитом
+        та оновлюються через bulk_update, нові створюються через save(),
+        щоб згенерувати для них коди.
+        """
+        with_serial = {}
+        without_serial = {}
+        for peri in peripherals:
+            name = (peri.get("name") or "").strip()
+            if not name:
+                continue
+            serial = (peri.get("serial_number") or "").strip()
+            peri_type = peri.get("type", "OTHER") or "OTHER"
+            if serial:
+                with_serial[serial] = (name, peri_type)
+            else:
+                without_serial.setdefault(name, peri_type)
+
+        if not with_serial and not without_serial:
+            return {"synced": 0}
+
+        existing = PeripheralDevice.objects.filter(
+            Q(serial_number__in=with_serial)
+            | Q(connected_to=equipment, name__in=without_serial)
+        )
+        by_serial = {}
+        by_name = {}
+        for device in existing:
+            by_serial[device.serial_number] = device
+            if device.connected_to_id == equipment.id:
+                by_name.setdefault(device.name, device)
+
+        changed = []
+        for serial, (name, peri_type) in with_serial.items():
+            device = by_serial.get(serial)
+            if device is None:
+                PeripheralDevice(
+                    serial_number=serial,
+                    name=name,
+                    type=peri_type,
+                    connected_to=equipment,
+                ).save()
+                continue
+            if (
+                device.name != name
+                or device.type != peri_type
+                or device.connected_to_id != equipment.id
+            ):
+                device.name = name
+                device.type = peri_type
+                device.connected_to = equipment
+                changed.append(device)
+
+        for name, peri_type in without_serial.items():
+            if name not in by_name:
+                PeripheralDevice(
+                    name=name,
+                    type=peri_type,
+                    connected_to=equipment,
+                    serial_number=f"AUTO-{equipment.id}-{name[:20]}",
+                ).save()
+
+        if changed:
+            PeripheralDevice.objects.bulk_update(
+                changed, ["name", "type", "connected_to"]
+            )
+
+        return {"synced": len(with_serial) + len(without_serial)}
@@ -1,10 +1,11 @@
 # inventory/analytics.py
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
 from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
 
 from rest_framework import status
@@ -12,6 +13,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from .analytics_cache import AnalyticsCache, cached_analytics
 from .models import Equipment, Notification
 
 User = get_user_model()
@@ -20,6 +22,7 @@ logger = logging.getLogger("inventory")
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@cached_analytics("equipment_analytics", tags=("equipment",))
 def equipment_analytics(request):
     """Загальна аналітика обладнання"""
     try:
@@ -131,6 +134,7 @@ def equipment_analytics(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@cached_analytics("financial_analytics", tags=("equipment",))
 def financial_analytics(request):
     """Фінансова аналітика"""
     try:
@@ -222,6 +226,7 @@ def financial_analytics(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@cached_analytics("maintenance_analytics", tags=("equipment", "maintenance"))
 def maintenance_analytics(request):
     """Аналітика обслуговування"""
     try:
@@ -323,6 +328,7 @@ def maintenance_analytics(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@cached_analytics("user_analytics", tags=("users", "equipment", "notifications"))
 def user_analytics(request):
     """Аналітика користувачів"""
     try:
@@ -406,56 +412,107 @@ def user_analytics(request):
         )
 
 
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAuthenticated])
+def analytics_cache_stats(request):
+    """Статистика кешу аналітики; DELETE обнуляє лічильники (тільки staff)"""
+    if not request.user.is_staff:
+        return Response(
+            {"detail": "Недостатньо прав"}, status=status.HTTP_403_FORBIDDEN
+        )
+    if request.method == "DELETE":
+        AnalyticsCache.reset_stats()
+    return Response({"endpoints": AnalyticsCache.stats()})
+
+
+def _add_months(month, count):
+    """Перше число місяця, зсунутого на count календарних місяців"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _years_ago(day, years):
+    """Та сама дата years років тому (29 лютого -> 28 лютого)"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def _monthly(queryset, date_field, first, months, **aggregates):
+    """
+    {перше число місяця: агрегати} для months місяців від first одним
+    згрупованим запитом TruncMonth(date_field)
+    """
+    rows = (
+        queryset.filter(
+            **{
+                f"{date_field}__gte": first,
+                f"{date_field}__lt": _add_months(first, months),
+            }
+        )
+        .annotate(month=TruncMonth(date_field))
+        .values("month")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    return {row.pop("month"): row for row in rows}
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def advanced_analytics(request):
     """Розширена аналітика з прогнозуванням та трендами"""
     try:
         today = timezone.now().date()
+        this_month = today.replace(day=1)
 
-        # 1. Розподіл обладнання за віком (роки)
-        age_distribution = []
-        for i in range(8):
-            year_start = today - timedelta(days=365 * (i + 1))
-            year_end = today - timedelta(days=365 * i)
-            count = Equipment.objects.filter(
-                purchase_date__gte=year_start, purchase_date__lt=year_end
-            ).count()
-            age_distribution.append(
-                {
-                    "age": f"{i}-{i+1}" if i < 7 else "7+",
-                    "label": f"{i} р." if i < 7 else "7+ р.",
-                    "count": count,
-                }
-            )
-
-        # 2. Щомісячні тренди закупівель (24 місяці)
+        # 1. Розподіл за віком (календарні роки) та підсумки — один запит
+        bounds = [_years_ago(today, years) for years in range(8)]
+        age_counts = Equipment.objects.aggregate(
+            **{
+                f"age_{i}": Count(
+                    "id",
+                    filter=Q(
+                        purchase_date__gt=bounds[i + 1], purchase_date__lte=bounds[i]
+                    ),
+                )
+                for i in range(7)
+            },
+            age_7=Count("id", filter=Q(purchase_date__lte=bounds[7])),
+            total_active=Count("id", filter=Q(status="WORKING")),
+            over_5_years=Count("id", filter=Q(purchase_date__lt=_years_ago(today, 5))),
+        )
+        age_distribution = [
+            {
+                "age": f"{i}-{i+1}" if i < 7 else "7+",
+                "label": f"{i} р." if i < 7 else "7+ р.",
+                "count": age_counts[f"age_{i}"],
+            }
+            for i in range(8)
+        ]
+
+        # 2. Щомісячні закупівлі за 24 календарні місяці
+        first_month = _add_months(this_month, -23)
+        acquisitions = _monthly(
+            Equipment.objects.all(),
+            "purchase_date",
+            first_month,
+            24,
+            count=Count("id"),
+            total_cost=Sum("purchase_price"),
+        )
         monthly_acquisitions = []
         for i in range(24):
-            month_date = today.replace(day=1) - timedelta(days=30 * i)
-            month_start = month_date.replace(day=1)
-            if month_start.month == 12:
-                month_end = month_start.replace(
-                    year=month_start.year + 1, month=1
-                ) - timedelta(days=1)
-            else:
-                month_end = month_start.replace(
-                    month=month_start.month + 1
-                ) - timedelta(days=1)
-
-            qs = Equipment.objects.filter(
-                purchase_date__gte=month_start, purchase_date__lte=month_end
-            )
-            count = qs.count()
-            total = float(qs.aggregate(total=Sum("purchase_price"))["total"] or 0)
+            month = _add_months(first_month, i)
+            row = acquisitions.get(month, {})
             monthly_acquisitions.append(
                 {
-                    "month": month_start.strftime("%Y-%m"),
-                    "count": count,
-                    "total_cost": total,
+                    "month": month.strftime("%Y-%m"),
+                    "count": row.get("count", 0),
+                    "total_cost": float(row.get("total_cost") or 0),
                 }
             )
-        monthly_acquisitions.reverse()
 
         # 3. Аналіз витрат по категоріях
         cost_by_category = list(
@@ -472,96 +529,67 @@ def advanced_analytics(request):
             item["total_cost"] = float(item["total_cost"] or 0)
             item["avg_cost"] = float(item["avg_cost"] or 0)
 
-        # 4. Прогноз заміни обладнання (наступні 12 місяців)
+        # 4. Прогноз заміни обладнання (поточний та 11 наступних місяців)
+        expiring = _monthly(
+            Equipment.objects.filter(status="WORKING"),
+            "expiry_date",
+            this_month,
+            12,
+            count=Count("id"),
+        )
+        warranty_ending = _monthly(
+            Equipment.objects.all(), "warranty_until", this_month, 12, count=Count("id")
+        )
         lifecycle_forecast = []
         for i in range(12):
-            month_date = today + timedelta(days=30 * i)
-            month_start = month_date.replace(day=1)
-            if month_start.month == 12:
-                month_end = month_start.replace(
-                    year=month_start.year + 1, month=1
-                ) - timedelta(days=1)
-            else:
-                month_end = month_start.replace(
-                    month=month_start.month + 1
-                ) - timedelta(days=1)
-
-            expiring = Equipment.objects.filter(
-                expiry_date__gte=month_start,
-                expiry_date__lte=month_end,
-                status="WORKING",
-            ).count()
-            warranty_expiring = Equipment.objects.filter(
-                warranty_until__gte=month_start,
-                warranty_until__lte=month_end,
-            ).count()
+            month = _add_months(this_month, i)
             lifecycle_forecast.append(
                 {
-                    "month": month_start.strftime("%Y-%m"),
-                    "expiring": expiring,
-                    "warranty_ending": warranty_expiring,
+                    "month": month.strftime("%Y-%m"),
+                    "expiring": expiring.get(month, {}).get("count", 0),
+                    "warranty_ending": warranty_ending.get(month, {}).get("count", 0),
                 }
             )
 
-        # 5. Частота обслуговування по категоріях та місяцях (останні 6 місяців)
-        maintenance_heatmap = []
-        categories = Equipment.objects.values_list("category", flat=True).distinct()
-        for cat in categories:
-            row = {"category": cat, "months": []}
-            for i in range(6):
-                m = today.replace(day=1) - timedelta(days=30 * i)
-                m_start = m.replace(day=1)
-                if m_start.month == 12:
-                    m_end = m_start.replace(year=m_start.year + 1, month=1) - timedelta(
-                        days=1
+        # 5. Обслуговування по категоріях за 6 місяців — умовні Count по місяцях
+        heatmap_months = [_add_months(this_month, i - 5) for i in range(6)]
+        heatmap_rows = (
+            Equipment.objects.values("category")
+            .annotate(
+                **{
+                    f"m{i}": Count(
+                        "id",
+                        filter=Q(
+                            last_maintenance_date__gte=month,
+                            last_maintenance_date__lt=_add_months(month, 1),
+                        ),
                     )
-                else:
-                    m_end = m_start.replace(month=m_start.month + 1) - timedelta(days=1)
-
-                count = Equipment.objects.filter(
-                    category=cat,
-                    last_maintenance_date__gte=m_start,
-                    last_maintenance_date__lte=m_end,
-                ).count()
-                row["months"].append(
-                    {
-                        "month": m_start.strftime("%Y-%m"),
-                        "count": count,
-                    }
-                )
-            row["months"].reverse()
-            maintenance_heatmap.append(row)
-
-        # 6. Простий прогноз витрат (лінійна екстраполяція)
-        last_6_months_costs = []
-        for i in range(6):
-            m = today.replace(day=1) - timedelta(days=30 * i)
-            m_start = m.replace(day=1)
-            if m_start.month == 12:
-                m_end = m_start.replace(year=m_start.year + 1, month=1) - timedelta(
-                    days=1
-                )
-            else:
-                m_end = m_start.replace(month=m_start.month + 1) - timedelta(days=1)
-            total = float(
-                Equipment.objects.filter(
-                    purchase_date__gte=m_start, purchase_date__lte=m_end
-                ).aggregate(total=Sum("purchase_price"))["total"]
-                or 0
-            )
-            last_6_months_costs.append(total)
-        last_6_months_costs.reverse()
-
-        avg_monthly_cost = sum(last_6_months_costs) / max(len(last_6_months_costs), 1)
-        cost_forecast = []
-        for i in range(6):
-            m = today + timedelta(days=30 * (i + 1))
-            cost_forecast.append(
-                {
-                    "month": m.strftime("%Y-%m"),
-                    "predicted_cost": round(avg_monthly_cost, 2),
+                    for i, month in enumerate(heatmap_months)
                 }
             )
+            .order_by("category")
+        )
+        maintenance_heatmap = [
+            {
+                "category": row["category"],
+                "months": [
+                    {"month": month.strftime("%Y-%m"), "count": row[f"m{i}"]}
+                    for i, month in enumerate(heatmap_months)
+                ],
+            }
+            for row in heatmap_rows
+        ]
+
+        # 6. Простий прогноз витрат (середнє за останні 6 місяців)
+        last_6_months_costs = [row["total_cost"] for row in monthly_acquisitions[-6:]]
+        avg_monthly_cost = sum(last_6_months_costs) / len(last_6_months_costs)
+        cost_forecast = [
+            {
+                "month": _add_months(this_month, i + 1).strftime("%Y-%m"),
+                "predicted_cost": round(avg_monthly_cost, 2),
+            }
+            for i in range(6)
+        ]
 
         return Response(
             {
@@ -573,12 +601,8 @@ def advanced_analytics(request):
                 "cost_forecast": cost_forecast,
                 "summary": {
                     "avg_monthly_cost": round(avg_monthly_cost, 2),
-                    "total_active_equipment": Equipment.objects.filter(
-                        status="WORKING"
-                    ).count(),
-                    "equipment_over_5_years": Equipment.objects.filter(
-                        purchase_date__lt=today - timedelta(days=365 * 5)
-                    ).count(),
+                    "total_active_equipment": age_counts["total_active"],
+                    "equipment_over_5_years": age_counts["over_5_years"],
                 },
                 "generated_at": timezone.now().isoformat(),
             }
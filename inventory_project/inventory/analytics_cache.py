@@ -0,0 +1,249 @@
+# inventory/analytics_cache.py - Кеш результатів аналітики з тегами залежностей
+import hashlib
+import json
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from rest_framework.response import Response
+
+logger = logging.getLogger("inventory")
+
+GENERATION_KEY = "analytics:gen:{}"
+ENTRY_KEY = "analytics:entry:{}:{}"
+LOCK_KEY = "analytics:lock:{}:{}"
+STATS_KEY = "analytics:stats:{}:{}"
+STATS_KINDS = ("hits", "stale", "misses", "waits")
+WAIT_STEP = 0.05
+
+# Назва endpoint -> теги, від яких залежить результат (заповнює cached_analytics)
+ENDPOINT_TAGS = {}
+
+
+def _generation_seed():
+    # Лічильник, що зник з кешу, починається з поточного часу, а не з 0, щоб
+    # не повторити вже використану генерацію ще живого запису
+    return int(time.time())
+
+
+def normalize_params(query_params, defaults=None):
+    """
+    Параметри, що впливають на результат: лише оголошені у defaults,
+    без порожніх значень; відсутній параметр дорівнює значенню за замовчуванням.
+    """
+    params = {}
+    for name, default in (defaults or {}).items():
+        values = sorted(v.strip() for v in query_params.getlist(name) if v.strip())
+        if not values:
+            values = [] if default is None else [str(default)]
+        if values:
+            params[name] = values
+    return params
+
+
+def _params_hash(params):
+    raw = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+class AnalyticsCache:
+    """
+    Результати аналітики під ключем endpoint + нормалізовані параметри.
+    Запис зберігає генерації своїх тегів на момент обчислення; сигнали
+    збільшують генерацію тегу, і запис з іншими генераціями вважається
+    застарілим. Перерахунок ключа виконує лише той, хто взяв блокування.
+    """
+
+    @staticmethod
+    def generations(tags):
+        keys = [GENERATION_KEY.format(tag) for tag in tags]
+        current = cache.get_many(keys)
+        missing = [key for key in keys if key not in current]
+        for key in missing:
+            cache.add(key, _generation_seed(), None)
+        if missing:
+            current.update(cache.get_many(missing))
+        return [current.get(key, 0) for key in keys]
+
+    @staticmethod
+    def bump(*tags):
+        """Інвалідувати всі записи, що залежать від tags"""
+        for tag in tags:
+            key = GENERATION_KEY.format(tag)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, _generation_seed(), None)
+
+    @staticmethod
+    def _count(endpoint, kind):
+        key = STATS_KEY.format(endpoint, kind)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    @staticmethod
+    def get_or_compute(endpoint, params, compute, tags=None, timeout=None):
+        """
+        Значення з кешу або compute(). Поки один воркер перераховує ключ,
+        інші віддають попередній результат, якщо дані не змінювались (минув
+        лише час життя), або чекають на новий до ANALYTICS_CACHE_WAIT секунд.
+        """
+        tags = ENDPOINT_TAGS.get(endpoint, ()) if tags is None else tags
+        timeout = timeout or settings.ANALYTICS_CACHE_TIMEOUT
+        digest = _params_hash(params)
+        entry_key = ENTRY_KEY.format(endpoint, digest)
+        lock_key = LOCK_KEY.format(endpoint, digest)
+
+        gens = AnalyticsCache.generations(tags)
+        entry = cache.get(entry_key)
+        valid = entry is not None and entry["gens"] == gens
+        if valid and entry["fresh_until"] > time.time():
+            AnalyticsCache._count(endpoint, "hits")
+            return entry["value"]
+
+        if not cache.add(lock_key, 1, settings.ANALYTICS_CACHE_LOCK_TIMEOUT):
+            if valid:
+                AnalyticsCache._count(endpoint, "stale")
+                return entry["value"]
+            deadline = time.time() + settings.ANALYTICS_CACHE_WAIT
+            while time.time() < deadline and cache.get(lock_key) is not None:
+                time.sleep(WAIT_STEP)
+                entry = cache.get(entry_key)
+                if entry is not None and entry["gens"] == gens:
+                    AnalyticsCache._count(endpoint, "waits")
+                    return entry["value"]
+            # Обчислення іншого воркера не встигло або впало — рахуємо самі
+            AnalyticsCache._count(endpoint, "misses")
+            return compute()
+
+        AnalyticsCache._count(endpoint, "misses")
+        try:
+            value = compute()
+            cache.set(
+                entry_key,
+                {"value": value, "gens": gens, "fresh_until": time.time() + timeout},
+                # Після закінчення свіжості запис ще живе як запасний для
+                # воркерів, що чекають на перерахунок
+                timeout + settings.ANALYTICS_CACHE_LOCK_TIMEOUT,
+            )
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    @staticmethod
+    def stats():
+        """{endpoint: {hits, stale, misses, waits, hit_ratio, tags}}"""
+        keys = [
+            STATS_KEY.format(endpoint, kind)
+            for endpoint in ENDPOINT_TAGS
+            for kind in STATS_KINDS
+        ]
+        counters = cache.get_many(keys)
+        result = {}
+        for endpoint, tags in ENDPOINT_TAGS.items():
+            row = {
+                kind: counters.get(STATS_KEY.format(endpoint, kind), 0)
+                for kind in STATS_KINDS
+            }
+            total = sum(row.values())
+            served = total - row["misses"]
+            row["hit_ratio"] = round(served / total, 4) if total else None
+            row["tags"] = list(tags)
+            result[endpoint] = row
+        return result
+
+    @staticmethod
+    def reset_stats():
+        cache.delete_many(
+            [
+                STATS_KEY.format(endpoint, kind)
+                for endpoint in ENDPOINT_TAGS
+                for kind in STATS_KINDS
+            ]
+        )
+
+
+class _Uncacheable(Exception):
+    """Відповідь з помилкою повертається як є і не кешується"""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+def cached_analytics(endpoint, tags, params=None, timeout=None):
+    """
+    Декоратор view аналітики: кешує дані успішної відповіді.
+    params — {назва параметра запиту: значення за замовчуванням}; інші
+    параметри (наприклад, анти-кеш "_") на ключ не впливають.
+    """
+    ENDPOINT_TAGS[endpoint] = tuple(tags)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            def compute():
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    raise _Uncacheable(response)
+                return response.data
+
+            try:
+                data = AnalyticsCache.get_or_compute(
+                    endpoint,
+                    normalize_params(request.query_params, params),
+                    compute,
+                    timeout=timeout,
+                )
+            except _Uncacheable as e:
+                return e.response
+            return Response(data)
+
+        return wrapper
+
+    return decorator
+
+
+# ============ SIGNALS ============
+
+
+def _tag_models():
+    """Тег -> моделі, зміна яких інвалідує записи з цим тегом"""
+    from django.contrib.auth import get_user_model
+
+    from .maintenance import MaintenanceRequest, MaintenanceSchedule, MaintenanceTask
+    from .models import Equipment, Notification
+    from .spare_parts import SparePart, SparePartMovement, Supplier
+
+    return {
+        "equipment": (Equipment,),
+        "maintenance": (MaintenanceRequest, MaintenanceSchedule, MaintenanceTask),
+        "users": (get_user_model(),),
+        "spare_parts": (SparePart, SparePartMovement, Supplier),
+        "notifications": (Notification,),
+    }
+
+
+def connect_signals():
+    """Збільшувати генерацію тегу після коміту кожної зміни його моделей"""
+    for tag, models in _tag_models().items():
+
+        def bump(sender, tag=tag, **kwargs):
+            transaction.on_commit(lambda: AnalyticsCache.bump(tag))
+
+        for model in models:
+            for signal, action in ((post_save, "save"), (post_delete, "delete")):
+                signal.connect(
+                    bump,
+                    sender=model,
+                    weak=False,
+                    dispatch_uid=f"analytics_cache_{action}_{model.__name__}",
+                )
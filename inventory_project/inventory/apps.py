@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "inventory"
+
+    def ready(self):
+        from . import analytics_cache, counters, search, suggestions, webhooks
+
+        analytics_cache.connect_signals()
+        counters.connect_signals()
+        search.connect_signals()
+        suggestions.connect_signals()
+        webhooks.connect_signals()
@@ -1,13 +1,19 @@
 # inventory/automation.py — Автоматичні правила обробки обладнання
+import hashlib
+import json
 import logging
+import math
+from collections import Counter
 from datetime import timedelta
+from datetime import timezone as dt_timezone
 
 from celery import shared_task
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
-from django.db import models
+from django.core.mail import send_mass_mail
+from django.db import connection, models, transaction
+from django.db.models import Count, Exists, OuterRef, Q
 from django.utils import timezone
 
 from rest_framework import serializers, status, viewsets
@@ -15,6 +21,7 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from .counters import COUNTER_FIELDS, EquipmentCounterService, counter_keys
 from .models import Equipment, Notification
 
 logger = logging.getLogger("inventory")
@@ -45,6 +52,8 @@ class AutomationRule(models.Model):
         null=True, blank=True, verbose_name="Останній запуск"
     )
     run_count = models.IntegerField(default=0, verbose_name="Кількість запусків")
+    watermark = models.DateTimeField(null=True, blank=True, verbose_name="Оброблено до")
+    watermark_key = models.CharField(max_length=64, blank=True, default="")
     created_by = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, verbose_name="Створив"
     )
@@ -63,9 +72,63 @@ class AutomationRule(models.Model):
     def __str__(self):
         return self.name
 
+    def fingerprint(self):
+        """Хеш тригера, умов і дій: зміна будь-чого з них скидає watermark"""
+        raw = json.dumps(
+            [self.trigger_type, self.conditions, self.actions],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class AutomationFiring(models.Model):
+    """Журнал спрацювань: правило вже виконало дії для цього обладнання"""
+
+    rule = models.ForeignKey(
+        AutomationRule, on_delete=models.CASCADE, related_name="firings"
+    )
+    equipment = models.ForeignKey(
+        Equipment, on_delete=models.CASCADE, related_name="automation_firings"
+    )
+    fired_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = "inventory"
+        verbose_name = "Спрацювання правила"
+        verbose_name_plural = "Спрацювання правил"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["rule", "equipment"], name="uniq_automation_firing"
+            ),
+        ]
+
 
 # ============ ENGINE ============
 
+# Відповідне правилу обладнання обробляється пачками по CHUNK_SIZE одиниць
+CHUNK_SIZE = 1000
+# Скільки одиниць перелічується в агрегованому webhook запуску правила
+WEBHOOK_ITEMS_LIMIT = 100
+# Запитів на пачку для кожної дії (для оцінки вартості dry run)
+ACTION_QUERIES = {
+    "CHANGE_STATUS": 5,
+    "SEND_NOTIFICATION": 1,
+    "CREATE_MAINTENANCE": 1,
+    "SEND_EMAIL": 0,
+    "SEND_WEBHOOK": 0,
+}
+
+MATCH_FIELDS = (
+    "id",
+    "name",
+    "serial_number",
+    "current_user__email",
+    "current_user__first_name",
+    "current_user__last_name",
+    "current_user__username",
+) + COUNTER_FIELDS
+
 
 class AutomationEngine:
     """Двигун автоматизації: перевіряє умови та виконує дії"""
@@ -80,7 +143,7 @@ class AutomationEngine:
                 affected = AutomationEngine.evaluate_rule(rule)
                 rule.last_run = timezone.now()
                 rule.run_count += 1
-                rule.save(update_fields=["last_run", "run_count"])
+                rule.save(update_fields=RUN_FIELDS)
                 results.append({"rule": rule.name, "affected": affected})
             except Exception as e:
                 logger.error(f"Помилка виконання правила {rule.name}: {e}")
@@ -88,22 +151,177 @@ class AutomationEngine:
         return results
 
     @staticmethod
-    def evaluate_rule(rule: AutomationRule) -> int:
-        """Перевірити одне правило та виконати дії"""
-        equipment_qs = AutomationEngine._get_matching_equipment(rule)
-        affected = 0
-
-        for equipment in equipment_qs:
-            for action_config in rule.actions:
-                AutomationEngine._execute_action(action_config, equipment, rule)
-                affected += 1
+    def evaluate_rule(rule: AutomationRule, full=False) -> int:
+        """
+        Перевірити одне правило та виконати дії над новими збігами.
+        Відповідне обладнання читається пачками за id, кожна дія виконується
+        для пачки кількома запитами незалежно від її розміру; листи та
+        webhooks збираються за весь запуск і відправляються один раз.
+        Оновлює rule.watermark; зберігає правило викликач (RUN_FIELDS).
+        """
+        started = timezone.now()
+        incremental = AutomationEngine.is_incremental(rule, full)
+        if rule.watermark_key and rule.watermark_key != rule.fingerprint():
+            # Змінились умови чи дії — попередні спрацювання не рахуються
+            AutomationFiring.objects.filter(rule=rule).delete()
+        AutomationEngine._release(rule, incremental)
+
+        run = RuleRun(rule)
+        candidates = AutomationEngine.candidates(rule, incremental).order_by("pk")
+        last_pk = 0
+        try:
+            while True:
+                chunk = candidates.filter(pk__gt=last_pk).values(*MATCH_FIELDS)
+                rows = list(chunk[:CHUNK_SIZE])
+                if not rows:
+                    break
+                last_pk = rows[-1]["id"]
+                with transaction.atomic():
+                    run.execute(rows)
+        finally:
+            # Листи й webhooks для вже зафіксованих пачок, навіть якщо наступна впала
+            run.finish()
+
+        rule.watermark = started
+        rule.watermark_key = rule.fingerprint()
+        return run.matched * len(rule.actions)
 
-        return affected
+    @staticmethod
+    def is_incremental(rule: AutomationRule, full=False):
+        """Чи можна розглядати лише зміни після watermark"""
+        return (
+            not full
+            and rule.watermark is not None
+            and rule.watermark_key == rule.fingerprint()
+        )
 
     @staticmethod
-    def _get_matching_equipment(rule: AutomationRule):
-        """Отримати обладнання що відповідає умовам правила"""
+    def candidates(rule: AutomationRule, incremental):
+        """
+        Обладнання, для якого правило ще не спрацьовувало. В інкрементному
+        режимі — лише одиниці, змінені після watermark, або ті, для яких
+        часове вікно тригера перетнуто з дня watermark. Обидві межі вікна й
+        умови правила беруться в одному календарі — UTC, як timezone.now().date().
+        """
         today = timezone.now().date()
+        fired = AutomationFiring.objects.filter(rule=rule, equipment=OuterRef("pk"))
+        candidates = AutomationEngine._get_matching_equipment(rule, today).filter(
+            ~Exists(fired)
+        )
+        if not incremental:
+            return candidates
+        fresh = Q(updated_at__gt=rule.watermark)
+        since = rule.watermark.astimezone(dt_timezone.utc).date()
+        window = AutomationEngine._window(rule, since, today)
+        if window is not None:
+            fresh |= window
+        return candidates.filter(fresh)
+
+    @staticmethod
+    def _release(rule: AutomationRule, incremental):
+        """
+        Прибрати з журналу обладнання, що більше не відповідає правилу, щоб
+        воно могло спрацювати знову. Інкрементно — лише серед змінених.
+        """
+        firings = AutomationFiring.objects.filter(rule=rule)
+        if incremental:
+            firings = firings.filter(equipment__updated_at__gt=rule.watermark)
+        matching = AutomationEngine._get_matching_equipment(rule).values("pk")
+        firings.exclude(equipment__in=matching).delete()
+
+    @staticmethod
+    def _window(rule: AutomationRule, since, today):
+        """Умова "межа тригера перейшла через значення поля між since і today" """
+        conditions = rule.conditions or {}
+
+        if rule.trigger_type == "EQUIPMENT_AGE":
+            age = timedelta(days=365 * int(conditions.get("value", 5)))
+            return Q(purchase_date__gt=since - age, purchase_date__lte=today - age)
+
+        elif rule.trigger_type == "WARRANTY_EXPIRY":
+            days = timedelta(days=int(conditions.get("value", 30)))
+            return Q(warranty_until__gt=since + days, warranty_until__lte=today + days)
+
+        elif rule.trigger_type == "MAINTENANCE_OVERDUE":
+            days = timedelta(days=int(conditions.get("value", 365)))
+            crossed = {"__gte": since - days, "__lt": today - days}
+            return Q(
+                **{f"last_maintenance_date{op}": d for op, d in crossed.items()}
+            ) | Q(
+                last_maintenance_date__isnull=True,
+                **{f"purchase_date{op}": d for op, d in crossed.items()},
+            )
+
+        return None
+
+    @staticmethod
+    def dry_run(rule: AutomationRule, full=False):
+        """
+        Скільки обладнання відповідає правилу зараз і що коштуватиме запуск:
+        рядки для кожної дії, листи, події webhook, кількість запитів та
+        оцінка планувальника PostgreSQL. Нічого не змінює.
+        """
+        incremental = AutomationEngine.is_incremental(rule, full)
+        candidates = AutomationEngine.candidates(rule, incremental)
+        types = [a.get("type", "") for a in rule.actions]
+        target = next(
+            (
+                a.get("params", {}).get("status", "DISPOSED")
+                for a in rule.actions
+                if a.get("type") == "CHANGE_STATUS"
+            ),
+            None,
+        )
+        totals = candidates.aggregate(
+            matched=Count("id"),
+            with_user=Count("id", filter=Q(current_user__isnull=False)),
+            recipients=Count(
+                "current_user__email",
+                distinct=True,
+                filter=Q(current_user__email__gt=""),
+            ),
+            status_changes=Count("id", filter=~Q(status=target or "")),
+        )
+        matched = totals["matched"]
+        chunks = math.ceil(matched / CHUNK_SIZE)
+        per_chunk = 2 + sum(ACTION_QUERIES.get(t, 0) for t in types)
+        events = 0
+        if matched and "SEND_WEBHOOK" in types:
+            events += 1
+        if target and totals["status_changes"]:
+            events += 1
+
+        planner_cost = None
+        if connection.vendor == "postgresql":
+            plan = json.loads(candidates.explain(format="json"))
+            planner_cost = plan[0]["Plan"]["Total Cost"]
+
+        return {
+            "dry_run": True,
+            "mode": "incremental" if incremental else "full",
+            "watermark": rule.watermark,
+            "matched": matched,
+            "already_fired": rule.firings.count(),
+            "estimate": {
+                "chunks": chunks,
+                "queries": chunks * per_chunk + 1,
+                "status_changes": totals["status_changes"] if target else 0,
+                "notifications": (
+                    totals["with_user"] if "SEND_NOTIFICATION" in types else 0
+                ),
+                "maintenance_requests": (
+                    matched if "CREATE_MAINTENANCE" in types else 0
+                ),
+                "emails": totals["recipients"] if "SEND_EMAIL" in types else 0,
+                "webhook_events": events,
+                "planner_cost": planner_cost,
+            },
+        }
+
+    @staticmethod
+    def _get_matching_equipment(rule: AutomationRule, today=None):
+        """Отримати обладнання що відповідає умовам правила (today — дата UTC)"""
+        today = today or timezone.now().date()
         conditions = rule.conditions or {}
 
         if rule.trigger_type == "EQUIPMENT_AGE":
@@ -139,76 +357,320 @@ class AutomationEngine:
 
         return Equipment.objects.none()
 
-    @staticmethod
-    def _execute_action(
-        action_config: dict, equipment: Equipment, rule: AutomationRule
-    ):
-        """Виконати дію для одного обладнання"""
-        action_type = action_config.get("type", "")
-        params = action_config.get("params", {})
-
-        if action_type == "CHANGE_STATUS":
-            new_status = params.get("status", "DISPOSED")
-            equipment.status = new_status
-            equipment.save(update_fields=["status"])
-
-        elif action_type == "SEND_NOTIFICATION":
-            if equipment.current_user:
-                Notification.objects.create(
-                    user=equipment.current_user,
-                    equipment=equipment,
-                    title=f"Автоматизація: {rule.name}",
-                    message=f'Обладнання "{equipment.name}" відповідає правилу "{rule.name}"',
+
+class RuleRun:
+    """
+    Один запуск правила. Дії застосовуються до пачки рядків values():
+    статус — одним update(), сповіщення та запити на ТО — bulk_create.
+    Листи групуються по отримувачах і йдуть одним з'єднанням через
+    send_mass_mail, а webhooks — по одній події на запуск у finish().
+    """
+
+    def __init__(self, rule: AutomationRule):
+        self.rule = rule
+        self.matched = 0
+        self.title = f"Автоматизація: {rule.name}"
+        self.emails = {}
+        self.items = []
+        self.webhook = False
+        self.status_changes = []
+        self.new_status = None
+        self.tags = set()
+        self._requester = None
+
+    def execute(self, rows):
+        """
+        Дії над пачкою в транзакції викликача, лише для рядків, спрацювання
+        яких вставив саме цей запуск. Якщо пачка падає, зібране для неї
+        відкидається разом з її транзакцією.
+        """
+        rows = self.claim(rows)
+        if not rows:
+            return
+        saved = self.checkpoint()
+        try:
+            self.matched += len(rows)
+            for action_config in self.rule.actions:
+                action_type = action_config.get("type", "")
+                params = action_config.get("params", {})
+                if action_type == "CHANGE_STATUS":
+                    self.change_status(rows, params.get("status", "DISPOSED"))
+                elif action_type == "SEND_NOTIFICATION":
+                    self.notify(rows)
+                elif action_type == "SEND_WEBHOOK":
+                    self.collect_webhook(rows)
+                elif action_type == "SEND_EMAIL":
+                    self.collect_email(rows)
+                elif action_type == "CREATE_MAINTENANCE":
+                    self.create_maintenance(rows)
+        except Exception:
+            self.rollback(saved)
+            raise
+
+    def claim(self, rows):
+        """
+        Записати спрацювання через INSERT ... ON CONFLICT DO NOTHING RETURNING.
+        Повертає лише вставлені рядки: якщо той самий рядок уже записав
+        паралельний запуск правила (beat і ручний), дії для нього не дублюються.
+        """
+        table = connection.ops.quote_name(AutomationFiring._meta.db_table)
+        now = timezone.now()
+        placeholders = ", ".join(["(%s, %s, %s)"] * len(rows))
+        params = []
+        for row in rows:
+            params += [self.rule.pk, row["id"], now]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (rule_id, equipment_id, fired_at)"
+                f" VALUES {placeholders}"
+                " ON CONFLICT (rule_id, equipment_id) DO NOTHING"
+                " RETURNING equipment_id",
+                params,
+            )
+            inserted = {equipment_id for (equipment_id,) in cursor.fetchall()}
+        return [row for row in rows if row["id"] in inserted]
+
+    def checkpoint(self):
+        """Розміри зібраного перед пачкою, щоб відкотити його, якщо пачка впаде"""
+        return {
+            "matched": self.matched,
+            "items": len(self.items),
+            "webhook": self.webhook,
+            "status_changes": len(self.status_changes),
+            "new_status": self.new_status,
+            "tags": set(self.tags),
+            "emails": {email: len(r["lines"]) for email, r in self.emails.items()},
+        }
+
+    def rollback(self, saved):
+        self.matched = saved["matched"]
+        del self.items[saved["items"] :]
+        self.webhook = saved["webhook"]
+        del self.status_changes[saved["status_changes"] :]
+        self.new_status = saved["new_status"]
+        self.tags = saved["tags"]
+        for email in list(self.emails):
+            if email not in saved["emails"]:
+                del self.emails[email]
+            else:
+                del self.emails[email]["lines"][saved["emails"][email] :]
+
+    def change_status(self, rows, new_status):
+        """
+        Один UPDATE на пачку. Рядки блокуються й перечитуються, щоб
+        лічильники KPI та історія змін отримали фактичні старі значення,
+        бо update() не викликає save() і сигналів.
+        """
+        ids = [row["id"] for row in rows if row["status"] != new_status]
+        if not ids:
+            return
+        locked = list(
+            Equipment.objects.select_for_update()
+            .filter(pk__in=ids)
+            .exclude(status=new_status)
+            .values("id", *COUNTER_FIELDS)
+        )
+        if not locked:
+            return
+        changed = [row["id"] for row in locked]
+        Equipment.objects.filter(pk__in=changed).update(
+            status=new_status, updated_at=timezone.now()
+        )
+
+        deltas = Counter()
+        for row in locked:
+            deltas.subtract(counter_keys(row))
+            deltas.update(counter_keys({**row, "status": new_status}))
+        EquipmentCounterService.apply(deltas)
+        Equipment.history.bulk_history_create(
+            Equipment.objects.filter(pk__in=changed),
+            batch_size=CHUNK_SIZE,
+            update=True,
+            default_change_reason=self.title,
+        )
+
+        old = {row["id"]: row["status"] for row in locked}
+        for row in rows:
+            if row["id"] in old:
+                self.status_changes.append(
+                    {
+                        "equipment_id": row["id"],
+                        "name": row["name"],
+                        "serial_number": row["serial_number"],
+                        "old_status": old[row["id"]],
+                    }
+                )
+                row["status"] = new_status
+        self.new_status = new_status
+        self.tags.add("equipment")
+
+    def notify(self, rows):
+        notifications = Notification.objects.bulk_create(
+            [
+                Notification(
+                    user_id=row["current_user_id"],
+                    equipment_id=row["id"],
+                    title=self.title,
+                    message=(
+                        f'Обладнання "{row["name"]}" відповідає правилу'
+                        f' "{self.rule.name}"'
+                    ),
                     notification_type="INFO",
                     priority="MEDIUM",
                 )
+                for row in rows
+                if row["current_user_id"]
+            ]
+        )
+        if notifications:
+            self.tags.add("notifications")
+
+    def collect_webhook(self, rows):
+        room = WEBHOOK_ITEMS_LIMIT - len(self.items)
+        self.items += [
+            {
+                "equipment_id": row["id"],
+                "equipment": row["name"],
+                "serial_number": row["serial_number"],
+            }
+            for row in rows[: max(room, 0)]
+        ]
+        self.webhook = True
+
+    def collect_email(self, rows):
+        for row in rows:
+            email = row["current_user__email"]
+            if not row["current_user_id"] or not email:
+                continue
+            if email not in self.emails:
+                full_name = " ".join(
+                    part
+                    for part in (
+                        row["current_user__first_name"],
+                        row["current_user__last_name"],
+                    )
+                    if part
+                )
+                self.emails[email] = {
+                    "name": full_name or row["current_user__username"],
+                    "lines": [],
+                }
+            self.emails[email]["lines"].append(
+                f'• "{row["name"]}" ({row["serial_number"]})'
+            )
 
-        elif action_type == "SEND_WEBHOOK":
-            try:
-                from .webhooks import WebhookService
+    def requester_id(self):
+        if self._requester is None:
+            self._requester = self.rule.created_by_id or (
+                User.objects.filter(is_staff=True)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+                .first()
+            )
+        return self._requester
+
+    def create_maintenance(self, rows):
+        from .maintenance import MaintenanceRequest
+
+        requester = self.requester_id()
+        if requester is None:
+            logger.error(
+                f"Правило {self.rule.name}: немає автора чи адміністратора "
+                f"для запитів на ТО"
+            )
+            return
+        MaintenanceRequest.objects.bulk_create(
+            [
+                MaintenanceRequest(
+                    equipment_id=row["id"],
+                    requester_id=requester,
+                    request_type="INSPECTION",
+                    title=self.title[:200],
+                    description=f"Автоматично створено правилом: {self.rule.name}",
+                    priority="MEDIUM",
+                )
+                for row in rows
+            ],
+            batch_size=CHUNK_SIZE,
+        )
+        self.tags.add("maintenance")
+
+    def finish(self):
+        """Відправити зібрані листи й webhooks та інвалідувати кеш аналітики"""
+        if self.emails:
+            self.send_emails()
+        if self.status_changes or self.webhook:
+            self.send_webhooks()
+        if self.tags:
+            from .analytics_cache import AnalyticsCache
+
+            tags = sorted(self.tags)
+            transaction.on_commit(lambda: AnalyticsCache.bump(*tags))
+
+    def send_emails(self):
+        messages = [
+            (
+                f"IT Inventory: {self.rule.name}",
+                "\n".join(
+                    [
+                        f"Привіт {recipient['name']}!",
+                        "",
+                        f'Обладнання відповідає правилу "{self.rule.name}":',
+                        *recipient["lines"],
+                    ]
+                ),
+                settings.DEFAULT_FROM_EMAIL,
+                [email],
+            )
+            for email, recipient in self.emails.items()
+        ]
+        try:
+            send_mass_mail(messages, fail_silently=True)
+        except Exception as e:
+            logger.error(f"Email error: {e}")
 
+    def send_webhooks(self):
+        from .webhooks import WebhookService
+
+        try:
+            if self.status_changes:
+                count = len(self.status_changes)
                 WebhookService.send_webhook(
-                    "automation.triggered",
+                    "equipment.status_changed",
                     {
-                        "rule": rule.name,
-                        "equipment": equipment.name,
-                        "serial_number": equipment.serial_number,
-                        "title": f"Автоматизація: {rule.name}",
-                        "message": f'Обладнання "{equipment.name}" відповідає правилу "{rule.name}"',
+                        "bulk": True,
+                        "count": count,
+                        "new_status": self.new_status,
+                        "items": self.status_changes[:WEBHOOK_ITEMS_LIMIT],
+                        "title": self.title,
+                        "message": (
+                            f'Правило "{self.rule.name}" змінило статус {count}'
+                            f" одиниць обладнання на {self.new_status}"
+                        ),
                     },
                 )
-            except Exception as e:
-                logger.error(f"Webhook error: {e}")
-
-        elif action_type == "SEND_EMAIL":
-            if equipment.current_user and equipment.current_user.email:
-                try:
-                    send_mail(
-                        subject=f"IT Inventory: {rule.name}",
-                        message=(
-                            f'Обладнання "{equipment.name}" ({equipment.serial_number})'
-                            f' відповідає правилу "{rule.name}".'
+            if self.webhook:
+                WebhookService.send_webhook(
+                    "automation.triggered",
+                    {
+                        "rule": self.rule.name,
+                        "rule_id": self.rule.pk,
+                        "count": self.matched,
+                        "items": self.items,
+                        "truncated": self.matched > len(self.items),
+                        "title": self.title,
+                        "message": (
+                            f'Правилу "{self.rule.name}" відповідає'
+                            f" {self.matched} одиниць обладнання"
                         ),
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[equipment.current_user.email],
-                        fail_silently=True,
-                    )
-                except Exception as e:
-                    logger.error(f"Email error: {e}")
+                    },
+                )
+        except Exception as e:
+            logger.error(f"Webhook error: {e}")
 
-        elif action_type == "CREATE_MAINTENANCE":
-            try:
-                from .maintenance import MaintenanceRequest
 
-                MaintenanceRequest.objects.create(
-                    equipment=equipment,
-                    requester=rule.created_by
-                    or User.objects.filter(is_staff=True).first(),
-                    problem_description=f"Автоматично створено правилом: {rule.name}",
-                    priority="MEDIUM",
-                )
-            except Exception as e:
-                logger.error(f"Create maintenance error: {e}")
+# Поля правила, що зберігаються після запуску
+RUN_FIELDS = ["last_run", "run_count", "watermark", "watermark_key"]
 
 
 # ============ CELERY TASK ============
@@ -233,6 +695,8 @@ class AutomationRuleSerializer(serializers.ModelSerializer):
             "created_by",
             "last_run",
             "run_count",
+            "watermark",
+            "watermark_key",
             "created_at",
             "updated_at",
         ]
@@ -241,6 +705,11 @@ class AutomationRuleSerializer(serializers.ModelSerializer):
 # ============ VIEWSET ============
 
 
+def _flag(request, name):
+    value = request.data.get(name, request.query_params.get(name, False))
+    return value in (True, 1, "1", "true", "True")
+
+
 class AutomationRuleViewSet(viewsets.ModelViewSet):
     queryset = AutomationRule.objects.all().order_by("-created_at")
     serializer_class = AutomationRuleSerializer
@@ -251,13 +720,19 @@ class AutomationRuleViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"])
     def run(self, request, pk=None):
-        """Запустити конкретне правило"""
+        """
+        Запустити конкретне правило. {"dry_run": true} — лише оцінка,
+        {"full": true} — розглянути все обладнання, а не зміни після watermark
+        """
         rule = self.get_object()
+        full = _flag(request, "full")
         try:
-            affected = AutomationEngine.evaluate_rule(rule)
+            if _flag(request, "dry_run"):
+                return Response(AutomationEngine.dry_run(rule, full=full))
+            affected = AutomationEngine.evaluate_rule(rule, full=full)
             rule.last_run = timezone.now()
             rule.run_count += 1
-            rule.save(update_fields=["last_run", "run_count"])
+            rule.save(update_fields=RUN_FIELDS)
             return Response({"status": "ok", "affected": affected})
         except Exception as e:
             return Response(
@@ -0,0 +1,156 @@
+# inventory/codes.py - Рендеринг штрих-кодів та QR-кодів з дисковим LRU-кешем
+import hashlib
+import logging
+import os
+import tempfile
+from io import BytesIO
+
+import barcode
+import qrcode
+import qrcode.image.svg
+from barcode.errors import BarcodeError
+from barcode.writer import ImageWriter, SVGWriter
+
+from django.conf import settings
+
+logger = logging.getLogger("inventory")
+
+CODE_KINDS = ("barcode", "qrcode")
+CODE_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+# Масштаб за замовчуванням відповідає зображенням, що зберігаються в моделях
+DEFAULT_CODE_SIZE = 10
+MIN_CODE_SIZE = 1
+MAX_CODE_SIZE = 40
+
+
+class CodeRenderError(ValueError):
+    """Значення не можна закодувати (наприклад, кирилиця в Code128)"""
+
+
+def render_barcode(
+    value: str, fmt: str = "png", size: int = DEFAULT_CODE_SIZE
+) -> bytes:
+    """
+    Code128 штрих-код; size масштабує ширину та висоту модулів.
+    CodeRenderError, якщо value містить символи поза Code128.
+    """
+    writer = ImageWriter() if fmt == "png" else SVGWriter()
+    options = {
+        "module_width": 0.02 * size,
+        "module_height": 1.5 * size,
+    }
+    buffer = BytesIO()
+    try:
+        barcode.get("code128", value, writer=writer).write(buffer, options)
+    except BarcodeError as e:
+        raise CodeRenderError(f"Неможливо закодувати {value!r} у Code128: {e}") from e
+    return buffer.getvalue()
+
+
+def render_qrcode(data: str, fmt: str = "png", size: int = DEFAULT_CODE_SIZE) -> bytes:
+    """QR-код; size — розмір однієї клітинки (box_size)"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=size,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    if fmt == "svg":
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+        img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def code_etag(kind: str, payload: str, fmt: str, size: int) -> str:
+    """Сильний ETag, що залежить лише від закодованих даних та параметрів"""
+    raw = f"{kind}\x00{fmt}\x00{size}\x00{payload}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class DiskLRUCache:
+    """
+    Обмежений кеш файлів на локальному диску.
+    Час доступу зберігається в mtime, при переповненні видаляються найстаріші файли.
+    """
+
+    def __init__(self, directory, max_files):
+        self.directory = str(directory)
+        self.max_files = max_files
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def set(self, key: str, data: bytes):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._evict()
+        except OSError as e:
+            logger.warning(f"Не вдалося записати код у кеш {self.directory}: {e}")
+
+    def _evict(self):
+        entries = [
+            entry
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and not entry.name.endswith(".tmp")
+        ]
+        overflow = len(entries) - self.max_files
+        if overflow <= 0:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:overflow]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class CodeImageService:
+    """Рендеринг кодів на запит з кешуванням результату"""
+
+    @staticmethod
+    def get_cache() -> DiskLRUCache:
+        return DiskLRUCache(
+            settings.CODE_IMAGE_CACHE_DIR, settings.CODE_IMAGE_CACHE_MAX_FILES
+        )
+
+    @staticmethod
+    def get_payload(obj, kind: str) -> str:
+        if kind == "barcode":
+            return obj.get_code_value()
+        return obj.get_qrcode_data()
+
+    @staticmethod
+    def render(kind: str, payload: str, fmt: str, size: int, etag: str) -> bytes:
+        """Повернути зображення з кешу або згенерувати та закешувати його"""
+        cache = CodeImageService.get_cache()
+        key = f"{etag}.{fmt}"
+        content = cache.get(key)
+        if content is None:
+            renderer = render_barcode if kind == "barcode" else render_qrcode
+            content = renderer(payload, fmt, size)
+            cache.set(key, content)
+        return content
@@ -0,0 +1,270 @@
+# inventory/counters.py - Денормалізовані лічильники обладнання для KPI
+import logging
+from collections import Counter
+
+from django.db import connection, models, transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .models import Equipment
+
+logger = logging.getLogger("inventory")
+
+# Поля Equipment (attname), від яких залежать ключі лічильників
+COUNTER_FIELDS = (
+    "status",
+    "category",
+    "location",
+    "current_user_id",
+    "responsible_person_id",
+)
+
+
+# ============ MODELS ============
+
+
+class EquipmentCounter(models.Model):
+    """
+    Кількість обладнання для пари (вимір, значення), наприклад
+    ("status", "WORKING") або ("user_status", "5:WORKING").
+    Оновлюється сигналами в транзакції збереження обладнання.
+    """
+
+    dimension = models.CharField(max_length=30, verbose_name="Вимір")
+    value = models.CharField(max_length=255, blank=True, default="")
+    count = models.BigIntegerField(default=0, verbose_name="Кількість")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = "inventory"
+        verbose_name = "Лічильник обладнання"
+        verbose_name_plural = "Лічильники обладнання"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dimension", "value"], name="uniq_equipment_counter"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}:{self.value} = {self.count}"
+
+
+def counter_keys(values):
+    """Ключі (вимір, значення) лічильників для збережених значень одиниці"""
+    status = values["status"]
+    keys = [
+        ("total", ""),
+        ("status", status),
+        ("category", values["category"]),
+        ("location", values["location"] or ""),
+    ]
+    user = values["current_user_id"]
+    if user is not None:
+        keys += [("user", str(user)), ("user_status", f"{user}:{status}")]
+    responsible = values["responsible_person_id"]
+    if responsible is not None:
+        keys += [
+            ("responsible", str(responsible)),
+            ("responsible_status", f"{responsible}:{status}"),
+        ]
+    return keys
+
+
+# ============ SERVICE ============
+
+
+class EquipmentCounterService:
+    """Читання лічильників одним запитом за індексом та їх підтримка"""
+
+    @staticmethod
+    def get(dimension, value=""):
+        row = (
+            EquipmentCounter.objects.filter(dimension=dimension, value=str(value))
+            .values_list("count", flat=True)
+            .first()
+        )
+        return row or 0
+
+    @staticmethod
+    def many(keys):
+        """{(вимір, значення): кількість} для кількох ключів одним запитом"""
+        keys = [(dimension, str(value)) for dimension, value in keys]
+        condition = models.Q()
+        for dimension, value in keys:
+            condition |= models.Q(dimension=dimension, value=value)
+        found = {}
+        if keys:
+            found = {
+                (dimension, value): count
+                for dimension, value, count in EquipmentCounter.objects.filter(
+                    condition
+                ).values_list("dimension", "value", "count")
+            }
+        return {key: found.get(key, 0) for key in keys}
+
+    @staticmethod
+    def group(dimension):
+        """{значення: кількість} по виміру, без нульових"""
+        return dict(
+            EquipmentCounter.objects.filter(dimension=dimension, count__gt=0)
+            .order_by("-count", "value")
+            .values_list("value", "count")
+        )
+
+    @staticmethod
+    def apply(deltas):
+        """
+        Додати {(вимір, значення): зміна} одним INSERT ... ON CONFLICT.
+        Рядки впорядковані, щоб паралельні транзакції блокували їх в одному
+        порядку і не взаємоблокувались.
+        """
+        rows = sorted((key, delta) for key, delta in deltas.items() if delta)
+        if not rows:
+            return
+        table = connection.ops.quote_name(EquipmentCounter._meta.db_table)
+        now = timezone.now()
+        placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+        params = []
+        for (dimension, value), delta in rows:
+            params += [dimension, value, delta, now]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (dimension, value, count, updated_at)"
+                f" VALUES {placeholders}"
+                " ON CONFLICT (dimension, value) DO UPDATE SET"
+                f" count = {table}.count + EXCLUDED.count,"
+                " updated_at = EXCLUDED.updated_at",
+                params,
+            )
+
+    @staticmethod
+    def update(queryset, **values):
+        """
+        queryset.update(**values) разом з лічильниками: update() не викликає
+        сигналів, тож рядки блокуються й перечитуються, а дельти рахуються від
+        фактичних старих значень. values — attname полів Equipment.
+        Повертає кількість оновлених рядків.
+        """
+        with transaction.atomic():
+            locked = list(
+                Equipment.objects.select_for_update()
+                .filter(pk__in=queryset.values("pk"))
+                .values("id", *COUNTER_FIELDS)
+            )
+            if not locked:
+                return 0
+            updated = Equipment.objects.filter(
+                pk__in=[row["id"] for row in locked]
+            ).update(**values)
+
+            changed = {f: v for f, v in values.items() if f in COUNTER_FIELDS}
+            if changed:
+                deltas = Counter()
+                for row in locked:
+                    deltas.subtract(counter_keys(row))
+                    deltas.update(counter_keys({**row, **changed}))
+                EquipmentCounterService.apply(deltas)
+        return updated
+
+    @staticmethod
+    def expected_counts():
+        """Точні значення лічильників за таблицею Equipment"""
+        expected = Counter()
+        cells = (
+            Equipment.objects.values(*COUNTER_FIELDS)
+            .annotate(total=Count("id"))
+            .order_by()
+        )
+        for cell in cells.iterator():
+            for key in counter_keys(cell):
+                expected[key] += cell["total"]
+        return expected
+
+    @staticmethod
+    def reconcile():
+        """
+        Виправити розбіжності (масові update() в обхід сигналів, ручні правки).
+        На PostgreSQL таблиця лічильників блокується від записів на час
+        перевірки, тож паралельні збереження обладнання не губляться.
+        Повертає {"checked": ..., "repaired": ...}.
+        """
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                table = connection.ops.quote_name(EquipmentCounter._meta.db_table)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+
+            current = {
+                (dimension, value): count
+                for dimension, value, count in EquipmentCounter.objects.values_list(
+                    "dimension", "value", "count"
+                )
+            }
+            expected = EquipmentCounterService.expected_counts()
+            deltas = {
+                key: expected.get(key, 0) - current.get(key, 0)
+                for key in set(current) | set(expected)
+            }
+            deltas = {key: delta for key, delta in deltas.items() if delta}
+            EquipmentCounterService.apply(deltas)
+            EquipmentCounter.objects.filter(count=0).delete()
+
+        if deltas:
+            logger.warning(
+                f"Виправлено {len(deltas)} лічильників обладнання: "
+                + ", ".join(f"{d}:{v} {n:+d}" for (d, v), n in sorted(deltas.items()))
+            )
+        return {"checked": len(set(current) | set(expected)), "repaired": len(deltas)}
+
+
+# ============ SIGNALS ============
+
+
+def _stored_values(instance):
+    """Значення COUNTER_FIELDS, що були в БД до поточного збереження"""
+    stored = instance.__dict__.pop("_counter_stored", None)
+    if stored is not None:
+        return stored
+    original = getattr(instance, "_original_values", None) or {}
+    return {
+        field: original[field] if field in original else getattr(instance, field)
+        for field in COUNTER_FIELDS
+    }
+
+
+def _equipment_pre_save(sender, instance, **kwargs):
+    # Збережені значення невідомі (екземпляр створено вручну з pk) — прочитати
+    if not instance._state.adding and not instance.is_tracked():
+        instance._counter_stored = (
+            Equipment.objects.filter(pk=instance.pk).values(*COUNTER_FIELDS).first()
+        )
+
+
+def _equipment_saved(sender, instance, created, update_fields=None, **kwargs):
+    new = {field: getattr(instance, field) for field in COUNTER_FIELDS}
+    deltas = Counter(counter_keys(new))
+    if not created:
+        old = _stored_values(instance)
+        if update_fields is not None:
+            names = {instance._meta.get_field(f).attname for f in update_fields}
+            new = {f: new[f] if f in names else old[f] for f in COUNTER_FIELDS}
+            deltas = Counter(counter_keys(new))
+        deltas.subtract(counter_keys(old))
+    EquipmentCounterService.apply(deltas)
+
+
+def _equipment_deleted(sender, instance, **kwargs):
+    deltas = Counter()
+    deltas.subtract(counter_keys(_stored_values(instance)))
+    EquipmentCounterService.apply(deltas)
+
+
+def connect_signals():
+    pre_save.connect(
+        _equipment_pre_save, sender=Equipment, dispatch_uid="counters_pre_save"
+    )
+    post_save.connect(_equipment_saved, sender=Equipment, dispatch_uid="counters_save")
+    post_delete.connect(
+        _equipment_deleted, sender=Equipment, dispatch_uid="counters_delete"
+    )
@@ -5,28 +5,133 @@ from typing import Any, Dict, List
 
 from accounts.models import CustomUser
 
-from django.db.models import Count, Q, Sum
+from django.db.models import Count, F, Q, Sum
 from django.utils import timezone
 
+from .counters import EquipmentCounterService
+from .depreciation import depreciation_totals
 from .models import Equipment, Notification
 
 
+# ============ АГРЕГАТИ ============
+
+
+class EquipmentAggregates:
+    """
+    Лічильники та суми по обладнанню одним згрупованим запитом.
+    Запит групує за (статус, категорія, локація, відділ користувача) з умовною
+    агрегацією Count(filter=Q(...)); зрізи по кожному виміру згортаються з
+    отриманих комірок без повторних запитів. Один екземпляр обслуговує всіх
+    споживачів дашборду в межах одного запиту.
+    """
+
+    DIMENSIONS = ("status", "category", "location", "department")
+    METRICS = (
+        "count",
+        "value",
+        "new_today",
+        "expiring_soon",
+        "maintenance_overdue",
+    )
+
+    def __init__(self, cells):
+        self.cells = cells
+        self._groups = {}
+        self.totals = self._bucket(cells)
+
+    @classmethod
+    def collect(cls, queryset=None):
+        """Виконати агрегуючий запит (по всьому обладнанню або по queryset)"""
+        today = timezone.now().date()
+        queryset = Equipment.objects.all() if queryset is None else queryset
+        cells = list(
+            queryset.values(
+                "status",
+                "category",
+                "location",
+                department=F("current_user__department"),
+            )
+            .annotate(
+                count=Count("id"),
+                value=Sum("purchase_price"),
+                new_today=Count("id", filter=Q(created_at__date=today)),
+                expiring_soon=Count(
+                    "id",
+                    filter=Q(
+                        expiry_date__gte=today,
+                        expiry_date__lte=today + timedelta(days=30),
+                    ),
+                ),
+                maintenance_overdue=Count(
+                    "id",
+                    filter=Q(status="WORKING")
+                    & (
+                        Q(next_maintenance_date__lt=today)
+                        | Q(
+                            next_maintenance_date__isnull=True,
+                            last_maintenance_date__lt=today - timedelta(days=365),
+                        )
+                    ),
+                ),
+            )
+            .order_by()
+        )
+        return cls(cells)
+
+    @classmethod
+    def _bucket(cls, cells):
+        bucket = dict.fromkeys(cls.METRICS, 0)
+        bucket["value"] = None
+        bucket["by_status"] = {}
+        for cell in cells:
+            for metric in cls.METRICS:
+                if cell[metric] is not None:
+                    bucket[metric] = (
+                        cell[metric]
+                        if bucket[metric] is None
+                        else bucket[metric] + cell[metric]
+                    )
+            statuses = bucket["by_status"]
+            statuses[cell["status"]] = statuses.get(cell["status"], 0) + cell["count"]
+        return bucket
+
+    def group(self, dimension):
+        """{значення виміру: метрики + by_status} для одного з DIMENSIONS"""
+        if dimension not in self._groups:
+            cells_by_key = {}
+            for cell in self.cells:
+                cells_by_key.setdefault(cell[dimension], []).append(cell)
+            self._groups[dimension] = {
+                key: self._bucket(cells) for key, cells in cells_by_key.items()
+            }
+        return self._groups[dimension]
+
+    def status_count(self, status):
+        return self.totals["by_status"].get(status, 0)
+
+
 class DashboardService:
     """Сервіс для отримання даних дашборду"""
 
     @staticmethod
-    def get_equipment_overview() -> Dict[str, Any]:
-        """Загальна статистика обладнання"""
-        total_count = Equipment.objects.count()
-        working_count = Equipment.objects.filter(status="WORKING").count()
-        repair_count = Equipment.objects.filter(status="REPAIR").count()
-        maintenance_count = Equipment.objects.filter(status="MAINTENANCE").count()
+    def get_equipment_overview(aggregates=None) -> Dict[str, Any]:
+        """
+        Загальна статистика обладнання: з уже зібраних агрегатів або, без
+        них, з лічильників одним запитом
+        """
+        if aggregates is not None:
+            total_count = aggregates.totals["count"]
+            by_status = aggregates.totals["by_status"]
+        else:
+            by_status = EquipmentCounterService.group("status")
+            total_count = sum(by_status.values())
+        working_count = by_status.get("WORKING", 0)
 
         return {
             "total_equipment": total_count,
             "working_equipment": working_count,
-            "in_repair": repair_count,
-            "in_maintenance": maintenance_count,
+            "in_repair": by_status.get("REPAIR", 0),
+            "in_maintenance": by_status.get("MAINTENANCE", 0),
             "working_percentage": round(
                 (working_count / total_count * 100) if total_count > 0 else 0, 2
             ),
@@ -35,126 +140,122 @@ class DashboardService:
     @staticmethod
     def get_financial_overview() -> Dict[str, Any]:
         """Фінансова статистика"""
-        equipment_qs = Equipment.objects.exclude(purchase_price__isnull=True)
-
-        total_value = equipment_qs.aggregate(total=Sum("purchase_price"))[
-            "total"
-        ] or Decimal("0.00")
-
-        # Амортизаційна вартість
-        current_value = sum(
-            eq.get_depreciation_value() or Decimal("0.00") for eq in equipment_qs
+        # Вартість та амортизація по категоріях одним агрегуючим запитом
+        by_category = depreciation_totals(
+            Equipment.objects.exclude(purchase_price__isnull=True), "category"
         )
+        total_value = sum((row["total_purchase"] for row in by_category), Decimal("0"))
+        current_value = sum((row["total_book"] for row in by_category), Decimal("0"))
 
-        # Вартість по категоріях
-        category_values = (
-            equipment_qs.values("category")
-            .annotate(total_value=Sum("purchase_price"), count=Count("id"))
-            .order_by("-total_value")
+        category_values = sorted(
+            (
+                {
+                    "category": row["category"],
+                    "total_value": row["total_purchase"],
+                    "book_value": row["total_book"],
+                    "count": row["count"],
+                }
+                for row in by_category
+            ),
+            key=lambda x: x["total_value"],
+            reverse=True,
         )
 
         return {
             "total_purchase_value": float(total_value),
             "current_depreciated_value": float(current_value),
             "depreciation_amount": float(total_value - current_value),
-            "category_breakdown": list(category_values),
+            "category_breakdown": category_values,
         }
 
     @staticmethod
-    def get_department_statistics() -> List[Dict[str, Any]]:
+    def get_department_statistics(aggregates=None) -> List[Dict[str, Any]]:
         """Статистика по відділах"""
-        # Групуємо по відділах користувачів
-        dept_stats = []
+        aggregates = aggregates or EquipmentAggregates.collect()
+        by_department = aggregates.group("department")
+        user_counts = dict(
+            CustomUser.objects.values_list("department")
+            .annotate(total=Count("id"))
+            .order_by()
+        )
 
+        dept_stats = []
         for dept_code, dept_name in CustomUser.DEPARTMENT_CHOICES:
-            users_in_dept = CustomUser.objects.filter(department=dept_code)
-            equipment_count = Equipment.objects.filter(
-                current_user__in=users_in_dept
-            ).count()
-
-            equipment_value = Equipment.objects.filter(
-                current_user__in=users_in_dept
-            ).aggregate(total=Sum("purchase_price"))["total"] or Decimal("0.00")
-
+            bucket = by_department.get(dept_code)
             dept_stats.append(
                 {
                     "department_code": dept_code,
                     "department_name": dept_name,
-                    "equipment_count": equipment_count,
-                    "equipment_value": float(equipment_value),
-                    "user_count": users_in_dept.count(),
+                    "equipment_count": bucket["count"] if bucket else 0,
+                    "equipment_value": float(
+                        (bucket and bucket["value"]) or Decimal("0.00")
+                    ),
+                    "user_count": user_counts.get(dept_code, 0),
                 }
             )
 
         return sorted(dept_stats, key=lambda x: x["equipment_value"], reverse=True)
 
     @staticmethod
-    def get_location_statistics() -> List[Dict[str, Any]]:
+    def get_location_statistics(aggregates=None) -> List[Dict[str, Any]]:
         """Статистика по локаціях"""
-        return list(
-            Equipment.objects.values("location")
-            .annotate(
-                equipment_count=Count("id"),
-                total_value=Sum("purchase_price"),
-                working_count=Count("id", filter=Q(status="WORKING")),
-                repair_count=Count("id", filter=Q(status="REPAIR")),
-            )
-            .filter(equipment_count__gt=0)
-            .order_by("-equipment_count")[:20]  # Топ 20 локацій
-        )
+        aggregates = aggregates or EquipmentAggregates.collect()
+        locations = [
+            {
+                "location": location,
+                "equipment_count": bucket["count"],
+                "total_value": bucket["value"],
+                "working_count": bucket["by_status"].get("WORKING", 0),
+                "repair_count": bucket["by_status"].get("REPAIR", 0),
+            }
+            for location, bucket in aggregates.group("location").items()
+            if bucket["count"] > 0
+        ]
+        locations.sort(key=lambda x: x["equipment_count"], reverse=True)
+        return locations[:20]  # Топ 20 локацій
 
     @staticmethod
     def get_maintenance_alerts() -> Dict[str, Any]:
         """Алерти про технічне обслуговування"""
         today = timezone.now().date()
 
-        # Обладнання що потребує обслуговування
-        needs_maintenance = []
-        for equipment in Equipment.objects.filter(status="WORKING"):
-            if equipment.needs_maintenance():
-                days_overdue = 0
-                if equipment.last_maintenance_date:
-                    maintenance_due = equipment.last_maintenance_date + timedelta(
-                        days=365
-                    )
-                    days_overdue = (today - maintenance_due).days
-                else:
-                    days_overdue = (
-                        (today - equipment.purchase_date).days
-                        if equipment.purchase_date
-                        else 999
-                    )
-
-                needs_maintenance.append(
-                    {
-                        "id": equipment.id,
-                        "name": equipment.name,
-                        "serial_number": equipment.serial_number,
-                        "location": equipment.location,
-                        "days_overdue": days_overdue,
-                        "last_maintenance": (
-                            equipment.last_maintenance_date.isoformat()
-                            if equipment.last_maintenance_date
-                            else None
-                        ),
-                    }
-                )
+        # Обладнання що потребує обслуговування: відбір і сортування в SQL
+        overdue = Equipment.objects.needs_maintenance(today).with_days_overdue(today)
+        needs_maintenance = [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "serial_number": row["serial_number"],
+                "location": row["location"],
+                "days_overdue": row["days_overdue"],
+                "last_maintenance": (
+                    row["last_maintenance_date"].isoformat()
+                    if row["last_maintenance_date"]
+                    else None
+                ),
+            }
+            for row in overdue.order_by("-days_overdue", "pk").values(
+                "id",
+                "name",
+                "serial_number",
+                "location",
+                "days_overdue",
+                "last_maintenance_date",
+            )[:10]
+        ]
 
         # Гарантія що скоро закінчується
+        warranty = Equipment.objects.working().warranty_expiring(30, today)
         warranty_expiring = list(
-            Equipment.objects.filter(
-                warranty_until__lte=today + timedelta(days=30),
-                warranty_until__gte=today,
-                status="WORKING",
-            ).values("id", "name", "serial_number", "location", "warranty_until")[:10]
+            warranty.values(
+                "id", "name", "serial_number", "location", "warranty_until"
+            )[:10]
         )
 
         return {
-            "needs_maintenance_count": len(needs_maintenance),
-            "needs_maintenance": sorted(
-                needs_maintenance, key=lambda x: x["days_overdue"], reverse=True
-            )[:10],
-            "warranty_expiring_count": len(warranty_expiring),
+            "needs_maintenance_count": overdue.count(),
+            "needs_maintenance": needs_maintenance,
+            "warranty_expiring_count": warranty.count(),
             "warranty_expiring": warranty_expiring,
         }
 
@@ -0,0 +1,447 @@
+# inventory/depreciation.py - Амортизація обладнання як SQL-вирази та місячні знімки
+import calendar
+import logging
+from datetime import date
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import (
+    Avg,
+    Case,
+    Count,
+    DateField,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Func,
+    IntegerField,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest, Least, Power, Round
+from django.utils import timezone
+
+logger = logging.getLogger("inventory")
+
+STRAIGHT_LINE = "STRAIGHT_LINE"
+DECLINING_BALANCE = "DECLINING_BALANCE"
+
+DEPRECIATION_METHOD_CHOICES = [
+    (STRAIGHT_LINE, "Прямолінійний"),
+    (DECLINING_BALANCE, "Зменшуваного залишку"),
+]
+
+DAYS_IN_YEAR = Decimal("365.25")
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+RATIO = DecimalField(max_digits=24, decimal_places=10)
+ZERO = Value(Decimal("0"), output_field=RATIO)
+ONE = Value(Decimal("1"), output_field=RATIO)
+
+
+class DaysSince(Func):
+    """Кількість днів від поля-дати до on_date (date - date у PostgreSQL)"""
+
+    arg_joiner = " - "
+    template = "(%(expressions)s)"
+    output_field = IntegerField()
+
+    def __init__(self, expression, on_date, **extra):
+        super().__init__(Value(on_date, output_field=DateField()), expression, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)",
+            arg_joiner=") - julianday(",
+            **extra_context,
+        )
+
+
+def _wrap(expression, output_field=RATIO):
+    return ExpressionWrapper(expression, output_field=output_field)
+
+
+def depreciation_expressions(on_date=None):
+    """
+    Вирази для annotate(): age_years, book_value, accumulated_depreciation,
+    monthly_depreciation. Метод береться з поля depreciation_method.
+    Без дати покупки вік нульовий, а балансова вартість 0, як і раніше
+    в get_depreciation_value() (вся ціна вважається зношеною).
+    """
+    on_date = on_date or timezone.now().date()
+    price = Coalesce(F("purchase_price"), ZERO, output_field=RATIO)
+    rate = _wrap(F("depreciation_rate") / Value(Decimal("100")))
+    days = Greatest(
+        Coalesce(DaysSince("purchase_date", on_date), Value(0)),
+        Value(0),
+        output_field=IntegerField(),
+    )
+    age = _wrap(days / Value(DAYS_IN_YEAR))
+    annual = _wrap(price * rate)
+
+    straight_book = Greatest(_wrap(price - annual * age), ZERO, output_field=RATIO)
+    declining_book = _wrap(
+        price * Power(Greatest(_wrap(ONE - rate), ZERO, output_field=RATIO), age)
+    )
+    book = Case(
+        When(purchase_date__isnull=True, then=ZERO),
+        When(depreciation_method=DECLINING_BALANCE, then=declining_book),
+        default=straight_book,
+        output_field=RATIO,
+    )
+    monthly = Case(
+        When(purchase_date__isnull=True, then=ZERO),
+        When(
+            depreciation_method=DECLINING_BALANCE,
+            then=_wrap(declining_book * rate / Value(Decimal("12"))),
+        ),
+        default=Least(
+            _wrap(annual / Value(Decimal("12"))), straight_book, output_field=RATIO
+        ),
+        output_field=RATIO,
+    )
+
+    return {
+        "age_years": Round(age, 2, output_field=MONEY),
+        "book_value": Round(book, 2, output_field=MONEY),
+        "accumulated_depreciation": Round(_wrap(price - book), 2, output_field=MONEY),
+        "monthly_depreciation": Round(monthly, 2, output_field=MONEY),
+    }
+
+
+def annotate_depreciation(queryset, on_date=None):
+    """Додати до кожного рядка балансову вартість, знос та місячну суму"""
+    return queryset.annotate(**depreciation_expressions(on_date))
+
+
+def depreciation_totals(queryset, *group_by, on_date=None):
+    """
+    Підсумки амортизації одним агрегуючим запитом.
+    Без group_by — словник, з group_by — список словників по групах.
+    """
+    queryset = queryset.alias(**depreciation_expressions(on_date))
+    aggregates = {
+        "count": Count("id"),
+        "total_purchase": Coalesce(Sum("purchase_price"), ZERO, output_field=MONEY),
+        "total_book": Coalesce(Sum("book_value"), ZERO, output_field=MONEY),
+        "total_depreciation": Coalesce(
+            Sum("accumulated_depreciation"), ZERO, output_field=MONEY
+        ),
+        "total_monthly": Coalesce(
+            Sum("monthly_depreciation"), ZERO, output_field=MONEY
+        ),
+        "avg_rate": Avg("depreciation_rate"),
+    }
+    if group_by:
+        return list(
+            queryset.values(*group_by).annotate(**aggregates).order_by(*group_by)
+        )
+    return queryset.aggregate(**aggregates)
+
+
+def book_value(purchase_price, rate, method, purchase_date, on_date=None):
+    """Та сама формула в Python для окремого об'єкта без анотації"""
+    on_date = on_date or date.today()
+    if purchase_date is None:
+        return Decimal("0.00")
+    price = purchase_price or Decimal("0")
+    age = Decimal(max((on_date - purchase_date).days, 0)) / DAYS_IN_YEAR
+    rate = (rate or Decimal("0")) / 100
+    if method == DECLINING_BALANCE:
+        # 0 ** 0 у Decimal — помилка, тому нульовий вік окремо
+        value = price * max(1 - rate, Decimal("0")) ** age if age else price
+    else:
+        value = max(price - price * rate * age, Decimal("0"))
+    return value.quantize(Decimal("0.01"))
+
+
+# ============ MODELS ============
+
+
+class DepreciationSnapshot(models.Model):
+    """
+    Балансова вартість одиниці обладнання на кінець місяця.
+    Вхідні дані (ціна, норма, метод, дата покупки, категорія, локація)
+    зберігаються разом з результатом, щоб повторний знімок того ж місяця
+    перераховував лише змінені одиниці.
+    """
+
+    month = models.DateField(verbose_name="Місяць")
+    equipment = models.ForeignKey(
+        "inventory.Equipment",
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="depreciation_snapshots",
+        verbose_name="Обладнання",
+    )
+    name = models.CharField(max_length=255, verbose_name="Назва")
+    category = models.CharField(max_length=20, verbose_name="Категорія")
+    location = models.CharField(
+        max_length=255, null=True, blank=True, verbose_name="Місцезнаходження"
+    )
+    purchase_price = models.DecimalField(
+        max_digits=12, decimal_places=2, verbose_name="Ціна покупки"
+    )
+    depreciation_rate = models.DecimalField(
+        max_digits=5, decimal_places=2, verbose_name="Норма амортизації (%/рік)"
+    )
+    depreciation_method = models.CharField(
+        max_length=20,
+        choices=DEPRECIATION_METHOD_CHOICES,
+        verbose_name="Метод амортизації",
+    )
+    purchase_date = models.DateField(null=True, blank=True, verbose_name="Дата покупки")
+    age_years = models.DecimalField(max_digits=14, decimal_places=2)
+    book_value = models.DecimalField(max_digits=14, decimal_places=2)
+    accumulated_depreciation = models.DecimalField(max_digits=14, decimal_places=2)
+    monthly_depreciation = models.DecimalField(max_digits=14, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = "inventory"
+        verbose_name = "Знімок амортизації"
+        verbose_name_plural = "Знімки амортизації"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["month", "equipment"], name="uniq_depreciation_snapshot"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["month", "location"], name="idx_dep_snapshot_loc"),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.name}: {self.book_value}"
+
+
+class DepreciationCategorySnapshot(models.Model):
+    """Підсумки амортизації категорії на кінець місяця"""
+
+    month = models.DateField(verbose_name="Місяць")
+    category = models.CharField(max_length=20, verbose_name="Категорія")
+    count = models.PositiveIntegerField(default=0)
+    purchase_value = models.DecimalField(max_digits=16, decimal_places=2)
+    book_value = models.DecimalField(max_digits=16, decimal_places=2)
+    depreciation = models.DecimalField(max_digits=16, decimal_places=2)
+    monthly_depreciation = models.DecimalField(max_digits=16, decimal_places=2)
+    avg_rate = models.DecimalField(max_digits=7, decimal_places=2)
+
+    class Meta:
+        app_label = "inventory"
+        verbose_name = "Знімок амортизації категорії"
+        verbose_name_plural = "Знімки амортизації категорій"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["month", "category"], name="uniq_depreciation_category"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.category}: {self.book_value}"
+
+
+# ============ ЗНІМКИ ТА ЗВІТ ============
+
+# Поля, зміна яких вимагає перерахунку знімка одиниці
+SNAPSHOT_INPUTS = (
+    "name",
+    "category",
+    "location",
+    "purchase_price",
+    "depreciation_rate",
+    "depreciation_method",
+    "purchase_date",
+)
+SNAPSHOT_RESULTS = (
+    "age_years",
+    "book_value",
+    "accumulated_depreciation",
+    "monthly_depreciation",
+)
+REPORT_FIELDS = ("equipment_id",) + SNAPSHOT_INPUTS + SNAPSHOT_RESULTS
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def month_end(month):
+    return month.replace(day=calendar.monthrange(month.year, month.month)[1])
+
+
+def _snapshot_totals(queryset, *group_by):
+    """Ті самі ключі, що й у depreciation_totals, але з готових колонок знімка"""
+    return list(
+        queryset.values(*group_by)
+        .annotate(
+            count=Count("id"),
+            total_purchase=Sum("purchase_price"),
+            total_book=Sum("book_value"),
+            total_depreciation=Sum("accumulated_depreciation"),
+            total_monthly=Sum("monthly_depreciation"),
+            avg_rate=Avg("depreciation_rate"),
+        )
+        .order_by(*group_by)
+    )
+
+
+def _priced_equipment(on_date):
+    """Обладнання з ціною, що вже було придбане на on_date"""
+    from .models import Equipment
+
+    return Equipment.objects.filter(purchase_price__gt=0).filter(
+        models.Q(purchase_date__lte=on_date) | models.Q(purchase_date__isnull=True)
+    )
+
+
+class DepreciationSnapshotService:
+    """Інкрементні місячні знімки амортизації та звіт на їх основі"""
+
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def snapshot_month(month):
+        """
+        Зберегти знімок на кінець місяця. Перераховуються лише нові одиниці
+        та ті, чиї SNAPSHOT_INPUTS змінилися з попереднього знімка цього місяця;
+        одиниці, яких більше немає у вибірці, видаляються.
+        Закритий місяць, для якого знімок уже є, не змінюється.
+        """
+        month = month_start(month)
+        on_date = month_end(month)
+        if (
+            month < month_start(timezone.now().date())
+            and DepreciationCategorySnapshot.objects.filter(month=month).exists()
+        ):
+            logger.info(f"Знімок амортизації {month:%Y-%m}: місяць закрито, пропуск")
+            return {
+                "month": f"{month:%Y-%m}",
+                "closed": True,
+                "processed": 0,
+                "removed": 0,
+                "total": DepreciationSnapshot.objects.filter(month=month).count(),
+            }
+
+        source = _priced_equipment(on_date)
+
+        current = {row.pop("id"): row for row in source.values("id", *SNAPSHOT_INPUTS)}
+        stored = {
+            row.pop("equipment_id"): row
+            for row in DepreciationSnapshot.objects.filter(
+                month=month, equipment__isnull=False
+            ).values("equipment_id", *SNAPSHOT_INPUTS)
+        }
+        changed = [pk for pk, row in current.items() if stored.get(pk) != row]
+        removed = [pk for pk in stored if pk not in current]
+
+        with transaction.atomic():
+            for start in range(0, len(changed), DepreciationSnapshotService.BATCH_SIZE):
+                batch = changed[start : start + DepreciationSnapshotService.BATCH_SIZE]
+                rows = annotate_depreciation(
+                    source.filter(pk__in=batch).annotate(equipment_id=F("id")),
+                    on_date,
+                )
+                DepreciationSnapshot.objects.bulk_create(
+                    [
+                        DepreciationSnapshot(month=month, **row)
+                        for row in rows.values(*REPORT_FIELDS)
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["month", "equipment"],
+                    update_fields=list(SNAPSHOT_INPUTS + SNAPSHOT_RESULTS)
+                    + ["updated_at"],
+                )
+            if removed:
+                DepreciationSnapshot.objects.filter(
+                    month=month, equipment_id__in=removed
+                ).delete()
+
+            categories_exist = DepreciationCategorySnapshot.objects.filter(
+                month=month
+            ).exists()
+            if changed or removed or not categories_exist:
+                DepreciationSnapshotService._rebuild_categories(month)
+
+        logger.info(
+            f"Знімок амортизації {month:%Y-%m}: перераховано {len(changed)}, "
+            f"видалено {len(removed)}, всього {len(current)}"
+        )
+        return {
+            "month": f"{month:%Y-%m}",
+            "closed": False,
+            "processed": len(changed),
+            "removed": len(removed),
+            "total": len(current),
+        }
+
+    @staticmethod
+    def _rebuild_categories(month):
+        DepreciationCategorySnapshot.objects.filter(month=month).delete()
+        DepreciationCategorySnapshot.objects.bulk_create(
+            DepreciationCategorySnapshot(
+                month=month,
+                category=row["category"],
+                count=row["count"],
+                purchase_value=row["total_purchase"],
+                book_value=row["total_book"],
+                depreciation=row["total_depreciation"],
+                monthly_depreciation=row["total_monthly"],
+                avg_rate=row["avg_rate"],
+            )
+            for row in _snapshot_totals(
+                DepreciationSnapshot.objects.filter(month=month), "category"
+            )
+        )
+
+    @staticmethod
+    def report(month=None):
+        """
+        Дані звіту: {month, source, items, by_category, by_location}.
+        Закриті місяці зі знімком читаються з таблиць знімків, поточний місяць
+        (і місяці без знімка) рахуються наживо. Рядки items містять
+        REPORT_FIELDS, групи — count та total_* з depreciation_totals.
+        """
+        today = timezone.now().date()
+        month = month_start(month or today)
+
+        if month < month_start(today):
+            by_category = list(
+                DepreciationCategorySnapshot.objects.filter(month=month)
+                .values(
+                    "category",
+                    "count",
+                    "avg_rate",
+                    total_purchase=F("purchase_value"),
+                    total_book=F("book_value"),
+                    total_depreciation=F("depreciation"),
+                    total_monthly=F("monthly_depreciation"),
+                )
+                .order_by("category")
+            )
+            if by_category:
+                snapshots = DepreciationSnapshot.objects.filter(month=month)
+                return {
+                    "month": f"{month:%Y-%m}",
+                    "source": "snapshot",
+                    "items": list(
+                        snapshots.order_by("name", "id").values(*REPORT_FIELDS)
+                    ),
+                    "by_category": by_category,
+                    "by_location": _snapshot_totals(snapshots, "location"),
+                }
+
+        on_date = today if month == month_start(today) else month_end(month)
+        equipment = _priced_equipment(on_date)
+        return {
+            "month": f"{month:%Y-%m}",
+            "source": "live",
+            "items": list(
+                annotate_depreciation(equipment.annotate(equipment_id=F("id")), on_date)
+                .order_by("name", "id")
+                .values(*REPORT_FIELDS)
+            ),
+            "by_category": depreciation_totals(equipment, "category", on_date=on_date),
+            "by_location": depreciation_totals(equipment, "location", on_date=on_date),
+        }
@@ -0,0 +1,217 @@
+# inventory/fanout.py - Масове створення сповіщень для періодичних перевірок
+import logging
+
+from accounts.models import CustomUser
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection
+from django.utils import timezone
+
+from .models import Notification
+
+logger = logging.getLogger("inventory")
+
+BATCH_SIZE = 1000
+
+
+def dedup_key(kind, equipment_id=None, period=""):
+    """Стабільний ключ сповіщення: тип перевірки, обладнання та період"""
+    return f"{kind}:{equipment_id or '-'}:{period}"[:100]
+
+
+class NotificationFanout:
+    """
+    Сповіщення перевірок Celery без get_or_create на кожного отримувача.
+    Кандидати з ключем dedup_key збираються в пам'яті та вставляються пачками
+    через INSERT ... ON CONFLICT DO NOTHING: повтори відкидає частковий
+    унікальний індекс (user, dedup_key), тож повторний запуск нічого не
+    створює. Push і email відправляються після вставки, по одному
+    повідомленню на користувача.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.candidates = {}
+
+    def add(
+        self,
+        user_id,
+        equipment_id,
+        kind,
+        period,
+        title,
+        message,
+        notification_type="INFO",
+        priority="MEDIUM",
+    ):
+        """Додати кандидата; повтор того самого ключа ігнорується"""
+        if user_id is None:
+            return
+        key = dedup_key(kind, equipment_id, period)
+        self.candidates.setdefault(
+            (user_id, key),
+            Notification(
+                user_id=user_id,
+                equipment_id=equipment_id,
+                dedup_key=key,
+                title=title,
+                message=message,
+                notification_type=notification_type,
+                priority=priority,
+            ),
+        )
+
+    def create(self, push=True, email=False):
+        """
+        Вставити кандидатів; повертає список щойно створених сповіщень.
+        Нові рядки визначаються RETURNING самої вставки, тож паралельний
+        запуск з тими самими ключами не вважає їх своїми і не надсилає вдруге.
+        """
+        candidates = list(self.candidates.values())
+        self.candidates = {}
+        created = []
+        for start in range(0, len(candidates), self.batch_size):
+            created += _insert_new(candidates[start : start + self.batch_size])
+
+        if created and push:
+            push_notifications(created)
+        if created and email:
+            email_notifications(created)
+        return created
+
+
+def _insert_new(batch):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING за частковим індексом
+    (user, dedup_key): повертає лише вставлені цим запитом екземпляри з pk
+    """
+    fields = [f for f in Notification._meta.concrete_fields if not f.primary_key]
+    quote = connection.ops.quote_name
+    row = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    params = []
+    for notification in batch:
+        for field in fields:
+            value = field.pre_save(notification, True)
+            params.append(field.get_db_prep_save(value, connection))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(Notification._meta.db_table)}"
+            f" ({', '.join(quote(f.column) for f in fields)})"
+            f" VALUES {', '.join([row] * len(batch))}"
+            " ON CONFLICT (user_id, dedup_key) WHERE dedup_key IS NOT NULL"
+            " DO NOTHING RETURNING id, user_id, dedup_key",
+            params,
+        )
+        inserted = {(user, key): pk for pk, user, key in cursor.fetchall()}
+
+    created = []
+    for notification in batch:
+        pk = inserted.get((notification.user_id, notification.dedup_key))
+        if pk is not None:
+            notification.pk = pk
+            notification._state.adding = False
+            created.append(notification)
+    return created
+
+
+def _by_user(notifications):
+    grouped = {}
+    for notification in notifications:
+        grouped.setdefault(notification.user_id, []).append(notification)
+    return grouped
+
+
+# Скільки заголовків перелічувати у зведеному push-повідомленні
+PUSH_SUMMARY_TITLES = 3
+
+
+def _push_payload(items):
+    """
+    Поля сповіщення на верхньому рівні, як їх читає клієнт (title, message).
+    Для кількох сповіщень title/message — зведення, повний список — у notifications.
+    """
+    notifications = [
+        {
+            "id": n.pk,
+            "title": n.title,
+            "message": n.message,
+            "type": n.notification_type,
+            "priority": n.priority,
+            "equipment_id": n.equipment_id,
+        }
+        for n in items
+    ]
+    if len(notifications) == 1:
+        payload = dict(notifications[0])
+    else:
+        titles = [n["title"] for n in notifications[:PUSH_SUMMARY_TITLES]]
+        rest = len(notifications) - len(titles)
+        payload = {
+            "title": f"Нові сповіщення ({len(notifications)})",
+            "message": "; ".join(titles) + (f" та ще {rest}" if rest else ""),
+        }
+    payload.update(count=len(notifications), notifications=notifications)
+    return payload
+
+
+def push_notifications(notifications):
+    """Одне WebSocket-повідомлення на користувача з усіма його новими сповіщеннями"""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    timestamp = timezone.now().isoformat()
+    send = async_to_sync(layer.group_send)
+    for user_id, items in _by_user(notifications).items():
+        try:
+            send(
+                f"user_{user_id}",
+                {
+                    "type": "notification.message",
+                    "payload": _push_payload(items),
+                    "timestamp": timestamp,
+                },
+            )
+        except Exception as e:
+            logger.error(f"Помилка push-сповіщення користувачу {user_id}: {e}")
+
+
+def email_notifications(notifications):
+    """
+    Один лист на користувача (з урахуванням налаштувань) через одне
+    SMTP-з'єднання
+    """
+    grouped = _by_user(notifications)
+    users = CustomUser.objects.in_bulk(list(grouped))
+    messages = []
+    for user_id, items in grouped.items():
+        user = users.get(user_id)
+        if not user or not user.email:
+            continue
+        if not user.notification_preferences.get("email_notifications", True):
+            continue
+        lines = [f"Привіт {user.get_full_name() or user.username}!", ""]
+        for notification in items:
+            lines += [f"• {notification.title}", f"  {notification.message.strip()}"]
+        lines += ["", "---", "Система інвентаризації IT-обладнання"]
+        subject = (
+            f"[Inventory] {items[0].title}"
+            if len(items) == 1
+            else f"[Inventory] Нові сповіщення ({len(items)})"
+        )
+        messages.append(
+            EmailMessage(
+                subject, "\n".join(lines), settings.DEFAULT_FROM_EMAIL, [user.email]
+            )
+        )
+    if not messages:
+        return 0
+    try:
+        sent = get_connection().send_messages(messages) or 0
+    except Exception as e:
+        logger.error(f"Помилка пакетної відправки email сповіщень: {e}")
+        return 0
+    logger.info(f"Відправлено {sent} email сповіщень")
+    return sent
@@ -0,0 +1,172 @@
+# inventory/filter_compiler.py - Перевірка та компіляція JSON-фільтрів розширеного пошуку
+import hashlib
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from .models import Equipment, maintenance_due_q, warranty_expiring_q
+
+User = get_user_model()
+
+
+class FilterValidationError(ValueError):
+    """Фільтр не пройшов перевірку; errors — {назва фільтра: повідомлення}"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{k}: {v}" for k, v in errors.items()))
+
+
+# ============ ПАРСЕРИ ЗНАЧЕНЬ ============
+
+
+def _choices(model, field):
+    return {choice[0] for choice in model._meta.get_field(field).choices}
+
+
+def _choice_list(allowed):
+    def parse(value):
+        values = value if isinstance(value, list) else [value]
+        unknown = [v for v in values if v not in allowed]
+        if unknown:
+            raise ValueError(f"Недопустимі значення: {', '.join(map(str, unknown))}")
+        return values
+
+    return parse
+
+
+def _string_list(value):
+    values = value if isinstance(value, list) else [value]
+    if not all(isinstance(v, str) and v for v in values):
+        raise ValueError("Очікується список рядків")
+    return values
+
+
+def _int_list(value):
+    values = value if isinstance(value, list) else [value]
+    return [int(v) for v in values]
+
+
+def _string(value):
+    if not isinstance(value, str):
+        raise ValueError("Очікується рядок")
+    return value.strip()
+
+
+def _date(value):
+    return date.fromisoformat(str(value))
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value))
+    except InvalidOperation as e:
+        raise ValueError("Очікується число") from e
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 0:
+        raise ValueError("Очікується невід'ємне число")
+    return number
+
+
+def _flag(value):
+    if not isinstance(value, bool):
+        raise ValueError("Очікується true/false")
+    return value
+
+
+def _needs_maintenance(flag):
+    return maintenance_due_q() if flag else Q()
+
+
+# ============ СПЕЦИФІКАЦІЯ ============
+
+# Назва фільтра -> (lookup або функція, що будує Q; парсер значення).
+# Білий список закриває довільні lookup-и, але не гарантує індекс: status,
+# category, current_user, purchase_date, warranty_until та next_maintenance_date
+# мають індекси, а manufacturer, department (через join), ціна та location
+# (icontains з провідним шаблоном) перевіряються по рядках, що лишилися після
+# індексованих умов.
+EQUIPMENT_FILTERS = {
+    "status": ("status__in", _choice_list(_choices(Equipment, "status"))),
+    "category": ("category__in", _choice_list(_choices(Equipment, "category"))),
+    "manufacturer": ("manufacturer__in", _string_list),
+    "department": (
+        "current_user__department__in",
+        _choice_list(_choices(User, "department")),
+    ),
+    "current_user": ("current_user__in", _int_list),
+    "location": ("location__icontains", _string),
+    "purchase_date_from": ("purchase_date__gte", _date),
+    "purchase_date_to": ("purchase_date__lte", _date),
+    "warranty_expiring_days": (warranty_expiring_q, _positive_int),
+    "needs_maintenance": (_needs_maintenance, _flag),
+    "price_from": ("purchase_price__gte", _decimal),
+    "price_to": ("purchase_price__lte", _decimal),
+}
+
+# Поля сортування для keyset-пагінації: лише ті, що мають індекс (поле, id)
+EQUIPMENT_SORT_FIELDS = {
+    "name",
+    "serial_number",
+    "inventory_number",
+    "purchase_date",
+    "created_at",
+}
+
+
+def _is_empty(value):
+    return value is None or value == "" or value == [] or value is False
+
+
+def compile_filters(filters, spec=None):
+    """
+    Перетворити JSON-фільтри на Q. Невідомі фільтри та некоректні значення
+    збираються разом і повертаються одним FilterValidationError.
+    """
+    spec = spec or EQUIPMENT_FILTERS
+    if not isinstance(filters, dict):
+        raise FilterValidationError({"filters": "Очікується об'єкт"})
+
+    errors = {}
+    condition = Q()
+    for name, raw in filters.items():
+        if _is_empty(raw):
+            continue
+        if name not in spec:
+            errors[name] = "Невідомий фільтр"
+            continue
+        lookup, parse = spec[name]
+        try:
+            value = parse(raw)
+        except (TypeError, ValueError) as e:
+            errors[name] = str(e) or "Некоректне значення"
+            continue
+        condition &= lookup(value) if callable(lookup) else Q(**{lookup: value})
+
+    if errors:
+        raise FilterValidationError(errors)
+    return condition
+
+
+def compile_sort(sort_by, sort_order, allowed=None):
+    """(поле, descending) з перевіркою за білим списком"""
+    allowed = allowed or EQUIPMENT_SORT_FIELDS
+    if sort_by not in allowed:
+        raise FilterValidationError(
+            {"sort_by": f"Дозволені поля: {', '.join(sorted(allowed))}"}
+        )
+    if sort_order not in ("asc", "desc"):
+        raise FilterValidationError({"sort_order": "Очікується asc або desc"})
+    return sort_by, sort_order == "desc"
+
+
+def spec_cache_key(prefix, *parts):
+    """Стабільний ключ кешу для нормалізованої специфікації пошуку"""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return f"{prefix}:{hashlib.sha256(raw.encode()).hexdigest()}"
@@ -0,0 +1,223 @@
+# inventory/labels.py - Генерація аркушів етикеток зі штрих-кодами та QR-кодами
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from io import BytesIO
+from itertools import islice
+
+from reportlab.lib.pagesizes import A4, LETTER
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from django.conf import settings
+
+from .codes import CODE_KINDS, CodeRenderError, render_barcode, render_qrcode
+from .models import Equipment, PeripheralDevice
+
+logger = logging.getLogger("inventory")
+
+LABEL_MODELS = {
+    "equipment": Equipment,
+    "peripherals": PeripheralDevice,
+}
+
+# Поля, за якими дозволено відбирати записи для друку
+LABEL_FILTER_FIELDS = {
+    "equipment": ("status", "category", "location", "manufacturer", "current_user"),
+    "peripherals": ("type", "connected_to"),
+}
+
+# Розмітки аркушів: розмір сторінки, сітка та поля в міліметрах
+LABEL_LAYOUTS = {
+    "a4-3x8": {
+        "pagesize": A4,
+        "columns": 3,
+        "rows": 8,
+        "margin": 10,
+        "gap": 2,
+    },
+    "a4-2x7": {
+        "pagesize": A4,
+        "columns": 2,
+        "rows": 7,
+        "margin": 12,
+        "gap": 3,
+    },
+    "a4-4x10": {
+        "pagesize": A4,
+        "columns": 4,
+        "rows": 10,
+        "margin": 8,
+        "gap": 1.5,
+    },
+    "letter-3x10": {
+        "pagesize": LETTER,
+        "columns": 3,
+        "rows": 10,
+        "margin": 12,
+        "gap": 2,
+    },
+}
+DEFAULT_LABEL_LAYOUT = "a4-3x8"
+
+
+def _render_label_code(args):
+    """
+    Рендеринг одного коду; виконується в окремому процесі.
+    None, якщо значення не кодується, щоб один запис не зривав увесь аркуш.
+    """
+    kind, payload, size = args
+    renderer = render_barcode if kind == "barcode" else render_qrcode
+    try:
+        return renderer(payload, "png", size)
+    except CodeRenderError as e:
+        logger.warning(f"Етикетку пропущено: {e}")
+        return None
+
+
+def _label_font():
+    """Шрифт з кирилицею для підписів, якщо він доступний у системі"""
+    font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+    if os.path.exists(font_path):
+        if "DejaVuSans" not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
+        return "DejaVuSans"
+    return "Helvetica"
+
+
+def code_executor():
+    """Пул процесів для рендерингу кодів або nullcontext при LABEL_SHEET_WORKERS <= 1"""
+    workers = settings.LABEL_SHEET_WORKERS
+    if workers <= 1:
+        return nullcontext()
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def render_codes(tasks, executor=None, per_batch=1):
+    """Відрендерити PNG для послідовності (kind, payload, size) зі збереженням порядку"""
+    if executor is None:
+        return [_render_label_code(task) for task in tasks]
+    return list(executor.map(_render_label_code, tasks, chunksize=per_batch))
+
+
+class LabelSheetService:
+    """Потокова генерація багатосторінкових PDF з етикетками"""
+
+    @staticmethod
+    def get_queryset(model_key, ids=None, filters=None):
+        """Записи для друку за списком id та/або дозволеними фільтрами"""
+        LabelSheetService.validate_filters(model_key, filters)
+        queryset = LABEL_MODELS[model_key].objects.all()
+        if ids:
+            queryset = queryset.filter(pk__in=ids)
+        for field, value in (filters or {}).items():
+            queryset = queryset.filter(**{field: value})
+        return queryset.order_by("pk")
+
+    @staticmethod
+    def validate_filters(model_key, filters):
+        """ValueError для невідомої моделі чи фільтра, поки завдання не поставлено"""
+        if model_key not in LABEL_MODELS:
+            raise ValueError(f"Невідома модель: {model_key}")
+        if not isinstance(filters or {}, dict):
+            raise ValueError("filters має бути об'єктом")
+        for field in filters or {}:
+            if field not in LABEL_FILTER_FIELDS[model_key]:
+                raise ValueError(f"Фільтр не підтримується: {field}")
+
+    @staticmethod
+    def iter_labels(queryset, kind):
+        """(payload, підпис) для кожного запису без завантаження всієї вибірки"""
+        for obj in queryset.iterator(chunk_size=500):
+            payload = (
+                obj.get_code_value() if kind == "barcode" else obj.get_qrcode_data()
+            )
+            if not payload:
+                continue
+            yield payload, f"{obj.name} · {obj.get_code_value()}"
+
+    @staticmethod
+    def build(
+        labels,
+        output,
+        layout=DEFAULT_LABEL_LAYOUT,
+        kind="qrcode",
+        total=None,
+        progress=None,
+    ):
+        """
+        Записати PDF з етикетками у output.
+        labels — ітератор (payload, підпис); коди рендеряться пачками по
+        кілька сторінок у пулі процесів, тож у пам'яті тримається лише поточна пачка.
+        progress(done, total) викликається після кожної пачки.
+        Записи, значення яких не кодується обраним типом коду, пропускаються.
+        Повертає кількість надрукованих етикеток.
+        """
+        if layout not in LABEL_LAYOUTS:
+            raise ValueError(f"Невідома розмітка: {layout}")
+        if kind not in CODE_KINDS:
+            raise ValueError(f"Невідомий тип коду: {kind}")
+
+        spec = LABEL_LAYOUTS[layout]
+        page_width, page_height = spec["pagesize"]
+        columns, rows = spec["columns"], spec["rows"]
+        margin, gap = spec["margin"] * mm, spec["gap"] * mm
+        cell_width = (page_width - 2 * margin - (columns - 1) * gap) / columns
+        cell_height = (page_height - 2 * margin - (rows - 1) * gap) / rows
+        caption_height = 3 * mm
+        per_page = columns * rows
+
+        pdf = canvas.Canvas(output, pagesize=spec["pagesize"])
+        font_name = _label_font()
+        chunk_size = per_page * settings.LABEL_SHEET_PAGES_PER_CHUNK
+        size = settings.LABEL_SHEET_CODE_SIZE
+
+        labels = iter(labels)
+        done = skipped = 0
+        with code_executor() as executor:
+            while True:
+                chunk = list(islice(labels, chunk_size))
+                if not chunk:
+                    break
+                images = render_codes(
+                    [(kind, payload, size) for payload, _ in chunk],
+                    executor,
+                    per_batch=per_page,
+                )
+
+                for (_, caption), image in zip(chunk, images):
+                    if image is None:
+                        skipped += 1
+                        continue
+                    slot = done % per_page
+                    if slot == 0 and done:
+                        pdf.showPage()
+                    column, row = slot % columns, slot // columns
+                    x = margin + column * (cell_width + gap)
+                    y = page_height - margin - (row + 1) * cell_height - row * gap
+
+                    pdf.drawImage(
+                        ImageReader(BytesIO(image)),
+                        x,
+                        y + caption_height,
+                        width=cell_width,
+                        height=cell_height - caption_height,
+                        preserveAspectRatio=True,
+                        anchor="c",
+                    )
+                    pdf.setFont(font_name, 6)
+                    pdf.drawCentredString(x + cell_width / 2, y + 1 * mm, caption[:60])
+                    done += 1
+
+                if progress:
+                    progress(done + skipped, total)
+
+        pdf.save()
+        logger.info(f"Сформовано аркуш етикеток: {done} шт., розмітка {layout}")
+        if skipped:
+            logger.warning(f"Пропущено {skipped} етикеток, які не вдалося закодувати")
+        return done
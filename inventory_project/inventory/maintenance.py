@@ -151,6 +151,7 @@ class MaintenanceRequest(models.Model):
             models.Index(fields=["equipment", "status"]),
             models.Index(fields=["assigned_technician", "status"]),
             models.Index(fields=["scheduled_date"]),
+            models.Index(fields=["requested_date", "id"], name="idx_mr_requested_id"),
         ]
 
     def __str__(self):
@@ -0,0 +1,65 @@
+# inventory/management/commands/generate_missing_codes.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from inventory.models import Equipment, PeripheralDevice
+
+MODELS = {
+    "equipment": Equipment,
+    "peripherals": PeripheralDevice,
+}
+
+
+class Command(BaseCommand):
+    help = "Згенерувати відсутні штрих-коди та QR-коди для обладнання і периферії"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            choices=["all", *MODELS],
+            default="all",
+            help="Для яких записів генерувати коди",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Кількість записів в одному bulk_update",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        selected = MODELS if options["model"] == "all" else [options["model"]]
+
+        for key in selected:
+            model = MODELS[key]
+            missing = Q(barcode_image="") | Q(barcode_image__isnull=True)
+            missing |= Q(qrcode_image="") | Q(qrcode_image__isnull=True)
+            queryset = model.objects.filter(missing).order_by("pk")
+
+            total = queryset.count()
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {total} без кодів")
+
+            processed = 0
+            batch = []
+            for obj in queryset.iterator(chunk_size=batch_size):
+                obj.refresh_codes_if_needed()
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    processed += self._flush(model, batch)
+                    batch = []
+            processed += self._flush(model, batch)
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model._meta.verbose_name_plural}: згенеровано коди для {processed} записів"
+                )
+            )
+
+    @staticmethod
+    def _flush(model, batch):
+        if not batch:
+            return 0
+        model.objects.bulk_update(batch, ["barcode_image", "qrcode_image"])
+        return len(batch)
@@ -0,0 +1,31 @@
+# inventory/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+
+from inventory.search import SEARCH_SOURCES, SearchService
+
+
+class Command(BaseCommand):
+    help = "Перебудувати пошуковий індекс (обладнання, користувачі, договори, ПЗ)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind",
+            choices=["all", *SEARCH_SOURCES],
+            default="all",
+            help="Яку частину індексу перебудувати",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Кількість документів в одному INSERT",
+        )
+
+    def handle(self, *args, **options):
+        kinds = None if options["kind"] == "all" else [options["kind"]]
+        counts = SearchService.rebuild(
+            kinds=kinds, batch_size=max(options["batch_size"], 1)
+        )
+        for kind, total in counts.items():
+            self.stdout.write(self.style.SUCCESS(f"{kind}: проіндексовано {total}"))
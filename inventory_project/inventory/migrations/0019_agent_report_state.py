@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0018_sparepart_item_type_alter_sparepart_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentReportState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "serial_number",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Серійний номер"
+                    ),
+                ),
+                (
+                    "hardware_hash",
+                    models.CharField(blank=True, default="", max_length=64),
+                ),
+                (
+                    "software_hash",
+                    models.CharField(blank=True, default="", max_length=64),
+                ),
+                (
+                    "peripherals_hash",
+                    models.CharField(blank=True, default="", max_length=64),
+                ),
+                (
+                    "last_seen_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Останній звіт"
+                    ),
+                ),
+                (
+                    "equipment",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="agent_report_state",
+                        to="inventory.equipment",
+                        verbose_name="Обладнання",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Стан звіту агента",
+                "verbose_name_plural": "Стани звітів агентів",
+            },
+        ),
+    ]
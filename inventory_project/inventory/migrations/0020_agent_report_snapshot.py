@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0019_agent_report_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentreportstate",
+            name="revision",
+            field=models.PositiveIntegerField(default=0, verbose_name="Ревізія"),
+        ),
+        migrations.AddField(
+            model_name="agentreportstate",
+            name="snapshot",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="Останній підтверджений звіт"
+            ),
+        ),
+    ]
@@ -0,0 +1,198 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+FTS_TABLE = "inventory_searchdocument_fts"
+
+POSTGRES_INSTALL_SQL = [
+    "ALTER TABLE inventory_searchdocument ADD COLUMN search_vector tsvector"
+    " GENERATED ALWAYS AS (setweight(to_tsvector('simple', title), 'A')"
+    " || setweight(to_tsvector('simple', body), 'B')) STORED",
+    "CREATE INDEX inventory_searchdoc_vector_idx"
+    " ON inventory_searchdocument USING gin (search_vector)",
+]
+# pg_trgm є не в усіх збірках PostgreSQL; без нього пошук працює лише по tsvector
+POSTGRES_TRGM_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX inventory_searchdoc_body_trgm_idx"
+    " ON inventory_searchdocument USING gin (body gin_trgm_ops)",
+]
+POSTGRES_UNINSTALL_SQL = [
+    "DROP INDEX IF EXISTS inventory_searchdoc_body_trgm_idx",
+    "DROP INDEX IF EXISTS inventory_searchdoc_vector_idx",
+    "ALTER TABLE inventory_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL_SQL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, body,"
+    " content='inventory_searchdocument', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER inventory_searchdoc_ai AFTER INSERT ON inventory_searchdocument BEGIN"
+    f" INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    f"CREATE TRIGGER inventory_searchdoc_ad AFTER DELETE ON inventory_searchdocument BEGIN"
+    f" INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)"
+    " VALUES ('delete', old.id, old.title, old.body); END",
+    f"CREATE TRIGGER inventory_searchdoc_au AFTER UPDATE ON inventory_searchdocument BEGIN"
+    f" INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)"
+    " VALUES ('delete', old.id, old.title, old.body);"
+    f" INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+SQLITE_UNINSTALL_SQL = [
+    "DROP TRIGGER IF EXISTS inventory_searchdoc_au",
+    "DROP TRIGGER IF EXISTS inventory_searchdoc_ad",
+    "DROP TRIGGER IF EXISTS inventory_searchdoc_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def install_search_backend(apps, schema_editor):
+    """GIN/trigram-індекси на PostgreSQL або FTS5-таблиця на SQLite"""
+    vendor = schema_editor.connection.vendor
+    statements = {
+        "postgresql": POSTGRES_INSTALL_SQL,
+        "sqlite": SQLITE_INSTALL_SQL,
+    }.get(vendor, [])
+    if vendor == "postgresql":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+            )
+            if cursor.fetchone():
+                statements = statements + POSTGRES_TRGM_SQL
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def uninstall_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {
+        "postgresql": POSTGRES_UNINSTALL_SQL,
+        "sqlite": SQLITE_UNINSTALL_SQL,
+    }.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def _join(*parts):
+    return " ".join(str(part) for part in parts if part).lower()
+
+
+def _sources(apps):
+    """kind -> (модель, побудова документа), як SEARCH_SOURCES у search.py"""
+    Equipment = apps.get_model("inventory", "Equipment")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Contract = apps.get_model("inventory", "Contract")
+    Software = apps.get_model("inventory", "Software")
+    return {
+        "equipment": (
+            Equipment,
+            lambda e: {
+                "title": e.name,
+                "subtitle": f'{e.get_category_display()} • {e.serial_number or "—"}',
+                "url": f"/equipment/{e.id}",
+                "body": _join(
+                    e.name,
+                    e.serial_number,
+                    e.inventory_number,
+                    e.model,
+                    e.manufacturer,
+                    e.location,
+                    e.notes,
+                ),
+            },
+        ),
+        "users": (
+            User,
+            lambda u: {
+                "title": f"{u.first_name} {u.last_name}".strip() or u.username,
+                "subtitle": u.email,
+                "url": f"/users/{u.id}",
+                "body": _join(u.first_name, u.last_name, u.username, u.email, u.phone),
+            },
+        ),
+        "contracts": (
+            Contract,
+            lambda c: {
+                "title": c.title,
+                "subtitle": f"{c.contract_number} • {c.counterparty}",
+                "url": "/contracts",
+                "body": _join(
+                    c.title, c.contract_number, c.counterparty, c.description
+                ),
+            },
+        ),
+        "software": (
+            Software,
+            lambda s: {
+                "title": f"{s.name} v{s.version}",
+                "subtitle": s.vendor,
+                "url": "/software",
+                "body": _join(s.name, s.vendor, s.version),
+            },
+        ),
+    }
+
+
+def backfill_search_index(apps, schema_editor):
+    """Проіндексувати наявні записи (те саме, що SearchService.rebuild)"""
+    SearchDocument = apps.get_model("inventory", "SearchDocument")
+    for kind, (model, build) in _sources(apps).items():
+        batch = []
+        for obj in model.objects.order_by("pk").iterator(chunk_size=500):
+            batch.append(SearchDocument(kind=kind, object_id=obj.pk, **build(obj)))
+            if len(batch) >= 500:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("inventory", "0020_agent_report_snapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=20, verbose_name="Тип")),
+                (
+                    "object_id",
+                    models.PositiveBigIntegerField(verbose_name="ID об'єкта"),
+                ),
+                ("title", models.CharField(max_length=255, verbose_name="Заголовок")),
+                ("subtitle", models.CharField(blank=True, default="", max_length=255)),
+                ("url", models.CharField(blank=True, default="", max_length=255)),
+                (
+                    "body",
+                    models.TextField(
+                        blank=True, default="", verbose_name="Текст для пошуку"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Документ пошукового індексу",
+                "verbose_name_plural": "Пошуковий індекс",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "object_id"), name="uniq_search_document"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(install_search_backend, uninstall_search_backend),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
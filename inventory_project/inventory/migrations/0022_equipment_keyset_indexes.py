@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0021_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(fields=["name", "id"], name="idx_equipment_name_id"),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["status", "name", "id"], name="idx_equipment_status_name"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0022_equipment_keyset_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="maintenancerequest",
+            index=models.Index(
+                fields=["requested_date", "id"], name="idx_mr_requested_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sparepartmovement",
+            index=models.Index(
+                fields=["performed_at", "id"], name="idx_movement_performed_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="useractivity",
+            index=models.Index(
+                fields=["timestamp", "id"], name="idx_activity_timestamp_id"
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0023_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="equipment",
+            name="depreciation_method",
+            field=models.CharField(
+                choices=[
+                    ("STRAIGHT_LINE", "Прямолінійний"),
+                    ("DECLINING_BALANCE", "Зменшуваного залишку"),
+                ],
+                default="STRAIGHT_LINE",
+                max_length=20,
+                verbose_name="Метод амортизації",
+            ),
+        ),
+        migrations.AddField(
+            model_name="historicalequipment",
+            name="depreciation_method",
+            field=models.CharField(
+                choices=[
+                    ("STRAIGHT_LINE", "Прямолінійний"),
+                    ("DECLINING_BALANCE", "Зменшуваного залишку"),
+                ],
+                default="STRAIGHT_LINE",
+                max_length=20,
+                verbose_name="Метод амортизації",
+            ),
+        ),
+    ]
@@ -0,0 +1,143 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0024_equipment_depreciation_method"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DepreciationCategorySnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(verbose_name="Місяць")),
+                ("category", models.CharField(max_length=20, verbose_name="Категорія")),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "purchase_value",
+                    models.DecimalField(decimal_places=2, max_digits=16),
+                ),
+                ("book_value", models.DecimalField(decimal_places=2, max_digits=16)),
+                ("depreciation", models.DecimalField(decimal_places=2, max_digits=16)),
+                (
+                    "monthly_depreciation",
+                    models.DecimalField(decimal_places=2, max_digits=16),
+                ),
+                ("avg_rate", models.DecimalField(decimal_places=2, max_digits=7)),
+            ],
+            options={
+                "verbose_name": "Знімок амортизації категорії",
+                "verbose_name_plural": "Знімки амортизації категорій",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("month", "category"), name="uniq_depreciation_category"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="DepreciationSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(verbose_name="Місяць")),
+                ("name", models.CharField(max_length=255, verbose_name="Назва")),
+                ("category", models.CharField(max_length=20, verbose_name="Категорія")),
+                (
+                    "location",
+                    models.CharField(
+                        blank=True,
+                        max_length=255,
+                        null=True,
+                        verbose_name="Місцезнаходження",
+                    ),
+                ),
+                (
+                    "purchase_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=12, verbose_name="Ціна покупки"
+                    ),
+                ),
+                (
+                    "depreciation_rate",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=5,
+                        verbose_name="Норма амортизації (%/рік)",
+                    ),
+                ),
+                (
+                    "depreciation_method",
+                    models.CharField(
+                        choices=[
+                            ("STRAIGHT_LINE", "Прямолінійний"),
+                            ("DECLINING_BALANCE", "Зменшуваного залишку"),
+                        ],
+                        max_length=20,
+                        verbose_name="Метод амортизації",
+                    ),
+                ),
+                (
+                    "purchase_date",
+                    models.DateField(
+                        blank=True, null=True, verbose_name="Дата покупки"
+                    ),
+                ),
+                ("age_years", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("book_value", models.DecimalField(decimal_places=2, max_digits=14)),
+                (
+                    "accumulated_depreciation",
+                    models.DecimalField(decimal_places=2, max_digits=14),
+                ),
+                (
+                    "monthly_depreciation",
+                    models.DecimalField(decimal_places=2, max_digits=14),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "equipment",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="depreciation_snapshots",
+                        to="inventory.equipment",
+                        verbose_name="Обладнання",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Знімок амортизації",
+                "verbose_name_plural": "Знімки амортизації",
+                "indexes": [
+                    models.Index(
+                        fields=["month", "location"], name="idx_dep_snapshot_loc"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("month", "equipment"), name="uniq_depreciation_snapshot"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:58
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+COUNTER_FIELDS = (
+    "status",
+    "category",
+    "location",
+    "current_user_id",
+    "responsible_person_id",
+)
+
+
+def counter_keys(values):
+    """Заморожена копія inventory.counters.counter_keys на момент міграції"""
+    status = values["status"]
+    keys = [
+        ("total", ""),
+        ("status", status),
+        ("category", values["category"]),
+        ("location", values["location"] or ""),
+    ]
+    user = values["current_user_id"]
+    if user is not None:
+        keys += [("user", str(user)), ("user_status", f"{user}:{status}")]
+    responsible = values["responsible_person_id"]
+    if responsible is not None:
+        keys += [
+            ("responsible", str(responsible)),
+            ("responsible_status", f"{responsible}:{status}"),
+        ]
+    return keys
+
+
+def fill_counters(apps, schema_editor):
+    """Початкові значення лічильників з наявного обладнання"""
+    Equipment = apps.get_model("inventory", "Equipment")
+    EquipmentCounter = apps.get_model("inventory", "EquipmentCounter")
+    totals = Counter()
+    cells = Equipment.objects.values(*COUNTER_FIELDS).annotate(total=Count("id"))
+    for cell in cells.order_by():
+        for key in counter_keys(cell):
+            totals[key] += cell["total"]
+    EquipmentCounter.objects.bulk_create(
+        [
+            EquipmentCounter(dimension=dimension, value=value, count=count)
+            for (dimension, value), count in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0025_depreciation_snapshots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EquipmentCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dimension", models.CharField(max_length=30, verbose_name="Вимір")),
+                ("value", models.CharField(blank=True, default="", max_length=255)),
+                ("count", models.BigIntegerField(default=0, verbose_name="Кількість")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Лічильник обладнання",
+                "verbose_name_plural": "Лічильники обладнання",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "value"), name="uniq_equipment_counter"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0026_equipment_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["status", "last_maintenance_date"],
+                name="idx_equipment_maintenance",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["status", "updated_at"], name="idx_equipment_status_upd"
+            ),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:07
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+# Заголовки перевірок до появи dedup_key (дедуплікація була за title) і тип
+# перевірки з кількістю днів. Заморожена копія схеми ключів із tasks.py.
+EXPIRY_SUFFIXES = {
+    "закінчується через 30 днів": 30,
+    "закінчується через тиждень": 7,
+    "закінчується завтра": 1,
+    "закінчилося сьогодні": 0,
+}
+WARRANTY_SUFFIXES = {
+    "закінчується через 30 днів": 30,
+    "закінчується через тиждень": 7,
+}
+
+
+def _dedup_key(kind, equipment_id, period):
+    return f"{kind}:{equipment_id or '-'}:{period}"[:100]
+
+
+def _key(title, equipment_id, expiry, warranty, next_due, last_done, updated_at):
+    """Ключ, який сьогоднішня перевірка дала б тому самому сповіщенню"""
+    for suffix, days in EXPIRY_SUFFIXES.items():
+        if title == f"Термін служби обладнання {suffix}" and expiry:
+            return _dedup_key("expiry", equipment_id, f"{days}d:{expiry}")
+    for suffix, days in WARRANTY_SUFFIXES.items():
+        if title == f"Гарантія на обладнання {suffix}" and warranty:
+            return _dedup_key("warranty", equipment_id, f"{days}d:{warranty}")
+    if title == "Потрібне обслуговування обладнання" and (next_due or last_done):
+        return _dedup_key("maintenance_overdue", equipment_id, next_due or last_done)
+    if title == "Планове обслуговування через тиждень" and next_due:
+        return _dedup_key("maintenance_upcoming", equipment_id, next_due)
+    if title == "Обладнання не відповідає":
+        return _dedup_key("stale_7d", equipment_id, timezone.localdate(updated_at))
+    return None
+
+
+def backfill_dedup_keys(apps, schema_editor):
+    """
+    Проставити dedup_key наявним сповіщенням перевірок, щоб перший запуск
+    після оновлення не повторив уже надіслані попередження
+    """
+    Notification = apps.get_model("inventory", "Notification")
+    rows = (
+        Notification.objects.filter(equipment__isnull=False, dedup_key__isnull=True)
+        .order_by("-created_at", "-pk")
+        .values_list(
+            "pk",
+            "user_id",
+            "title",
+            "equipment_id",
+            "equipment__expiry_date",
+            "equipment__warranty_until",
+            "equipment__next_maintenance_date",
+            "equipment__last_maintenance_date",
+            "equipment__updated_at",
+        )
+    )
+    seen = set()
+    batch = []
+    for pk, user_id, *values in rows.iterator(chunk_size=BATCH_SIZE):
+        key = _key(*values)
+        # Дублікати з минулих гонок get_or_create: ключ отримує найновіший
+        if key is None or (user_id, key) in seen:
+            continue
+        seen.add((user_id, key))
+        batch.append(Notification(pk=pk, dedup_key=key))
+        if len(batch) >= BATCH_SIZE:
+            Notification.objects.bulk_update(batch, ["dedup_key"])
+            batch = []
+    if batch:
+        Notification.objects.bulk_update(batch, ["dedup_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0027_equipment_attention_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="dedup_key",
+            field=models.CharField(
+                blank=True, max_length=100, null=True, verbose_name="Ключ дедуплікації"
+            ),
+        ),
+        migrations.RunPython(backfill_dedup_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("dedup_key__isnull", False)),
+                fields=("user", "dedup_key"),
+                name="uniq_notification_dedup",
+            ),
+        ),
+    ]
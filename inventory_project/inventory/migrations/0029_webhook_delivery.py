@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0028_notification_dedup_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookconfig",
+            name="batch_size",
+            field=models.PositiveSmallIntegerField(
+                default=1,
+                help_text="Більше 1 — ендпоінт приймає JSON-масив подій",
+                verbose_name="Подій в одному запиті",
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhookconfig",
+            name="max_concurrency",
+            field=models.PositiveSmallIntegerField(
+                default=2, verbose_name="Одночасних запитів"
+            ),
+        ),
+        migrations.CreateModel(
+            name="WebhookDelivery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("event", models.CharField(max_length=100)),
+                ("payload", models.JSONField(default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Очікує"),
+                            ("SENDING", "Відправляється"),
+                            ("DELIVERED", "Доставлено"),
+                            ("DEAD", "Не доставлено"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("delivered_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "webhook",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deliveries",
+                        to="inventory.webhookconfig",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Доставка Webhook",
+                "verbose_name_plural": "Доставки Webhooks",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="idx_webhook_delivery_due",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0029_webhook_delivery"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhooklog",
+            name="duration_ms",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="Тривалість, мс"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="webhooklog",
+            index=models.Index(
+                fields=["webhook", "-sent_at"], name="idx_webhook_log_recent"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="webhooklog",
+            index=models.Index(fields=["sent_at"], name="idx_webhook_log_sent"),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0030_webhook_log_retention"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="automationrule",
+            name="watermark",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Оброблено до"
+            ),
+        ),
+        migrations.AddField(
+            model_name="automationrule",
+            name="watermark_key",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.CreateModel(
+            name="AutomationFiring",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fired_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "equipment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="automation_firings",
+                        to="inventory.equipment",
+                    ),
+                ),
+                (
+                    "rule",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="firings",
+                        to="inventory.automationrule",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Спрацювання правила",
+                "verbose_name_plural": "Спрацювання правил",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("rule", "equipment"), name="uniq_automation_firing"
+                    )
+                ],
+            },
+        ),
+    ]
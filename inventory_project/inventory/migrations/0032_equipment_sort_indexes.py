@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0031_automation_watermark"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="equipment",
+            name="inventory_e_purchas_e330c3_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="equipment",
+            name="idx_equipment_created_at",
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["serial_number", "id"], name="idx_equipment_serial_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["inventory_number", "id"], name="idx_equipment_invnum_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["purchase_date", "id"], name="idx_equipment_purchase_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipment",
+            index=models.Index(
+                fields=["created_at", "id"], name="idx_equipment_created_id"
+            ),
+        ),
+    ]
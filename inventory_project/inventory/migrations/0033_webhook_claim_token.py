@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0032_equipment_sort_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookdelivery",
+            name="claim_token",
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
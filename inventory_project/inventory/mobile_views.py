@@ -11,6 +11,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from .counters import EquipmentCounterService
 from .models import Equipment, Notification
 from .serializers import EquipmentSerializer
 
@@ -478,27 +479,18 @@ def mobile_dashboard(request):
         today = timezone.now().date()
 
         # Статистика користувача
-        user_equipment_count = Equipment.objects.filter(current_user=user).count()
-        responsible_equipment_count = Equipment.objects.filter(
-            responsible_person=user
-        ).count()
-
-        # Обладнання що потребує уваги
-        user_equipment = Equipment.objects.filter(
-            Q(current_user=user) | Q(responsible_person=user)
-        ).distinct()
+        counts = EquipmentCounterService.many(
+            [("user", user.pk), ("responsible", user.pk)]
+        )
+        user_equipment_count = counts[("user", str(user.pk))]
+        responsible_equipment_count = counts[("responsible", str(user.pk))]
 
+        # Обладнання що потребує уваги — один агрегуючий запит
+        attention = Equipment.objects.for_user(user).attention_counts(today)
         needs_attention = {
-            "expiring_soon": user_equipment.filter(
-                expiry_date__lte=today + timedelta(days=30), expiry_date__gte=today
-            ).count(),
-            "needs_maintenance": len(
-                [eq for eq in user_equipment if eq.needs_maintenance()]
-            ),
-            "warranty_expiring": user_equipment.filter(
-                warranty_until__lte=today + timedelta(days=30),
-                warranty_until__gte=today,
-            ).count(),
+            "expiring_soon": attention["expiring_soon"],
+            "needs_maintenance": attention["needs_maintenance"],
+            "warranty_expiring": attention["warranty_expiring"],
         }
 
         # Останні уведомлення
@@ -519,7 +511,7 @@ def mobile_dashboard(request):
             "equipment_stats": {
                 "assigned_to_me": user_equipment_count,
                 "responsible_for": responsible_equipment_count,
-                "total_under_control": user_equipment.count(),
+                "total_under_control": attention["total"],
             },
             "attention_needed": needs_attention,
             "notifications": {
@@ -1,21 +1,28 @@
 # inventory/models.py (покращена версія)
+import copy
 import logging
+from datetime import datetime, time, timedelta
 from decimal import Decimal
-from io import BytesIO
 
-import barcode
-import qrcode
-from barcode.writer import ImageWriter
 from licenses.models import License
 from simple_history.models import HistoricalRecords
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
-from django.db import models
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .codes import render_barcode, render_qrcode
+from .depreciation import (
+    DEPRECIATION_METHOD_CHOICES,
+    STRAIGHT_LINE,
+    DaysSince,
+    book_value,
+)
 from .validators import (
     validate_equipment_name,
     validate_future_date,
@@ -33,34 +40,282 @@ logger = logging.getLogger("inventory")
 User = get_user_model()
 
 
-class EquipmentManager(models.Manager):
-    """Менеджер для моделі Equipment з додатковими методами"""
+def _replace_code_image(field_file, filename, content):
+    """
+    Зберегти зображення коду, спершу видаливши попередній файл цього ж поля,
+    щоб сховище не додавало випадковий суфікс (_1u1dXsH.png).
+    """
+    if field_file.name and field_file.storage.exists(field_file.name):
+        field_file.storage.delete(field_file.name)
+    field_file.save(filename, content, save=False)
+
+
+def _snapshot_value(value):
+    """Копія значення поля, яку не змінять подальші мутації екземпляра"""
+    if isinstance(value, FieldFile):
+        return value.name
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+class DirtyFieldsMixin:
+    """
+    Відстеження змінених полів без повторного запиту до БД.
+    Початкові значення запам'ятовуються при завантаженні з БД та після save().
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_original_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(
+            using=using, fields=fields, from_queryset=from_queryset
+        )
+        self._remember_original_values(fields)
+
+    def _remember_original_values(self, fields=None):
+        """Запам'ятати поточні значення (усіх або лише вказаних) полів як збережені"""
+        if fields is None or not self.is_tracked():
+            attnames = [f.attname for f in self._meta.concrete_fields]
+            self._original_values = {}
+        else:
+            attnames = [self._meta.get_field(name).attname for name in fields]
+
+        for attname in attnames:
+            if attname in self.__dict__:
+                self._original_values[attname] = _snapshot_value(
+                    self.__dict__[attname]
+                )
+
+    def is_tracked(self):
+        """Чи відомі збережені значення (екземпляр завантажено з БД або збережено)"""
+        return getattr(self, "_original_values", None) is not None
+
+    def changed_fields(self):
+        """{attname: (збережене значення, поточне значення)} для змінених полів"""
+        if not self.is_tracked():
+            return {}
+        changed = {}
+        for attname, old in self._original_values.items():
+            if attname not in self.__dict__:
+                continue
+            new = _snapshot_value(self.__dict__[attname])
+            if new != old:
+                changed[attname] = (old, new)
+        return changed
+
+    def get_dirty_update_fields(self):
+        """update_fields для save(): змінені поля разом з полями auto_now"""
+        names = set(self.changed_fields())
+        if names:
+            names.update(
+                f.attname
+                for f in self._meta.concrete_fields
+                if getattr(f, "auto_now", False)
+            )
+        return names
+
+
+class CodeImagesMixin(DirtyFieldsMixin):
+    """
+    Перегенерація штрих-коду та QR-коду лише при зміні даних, з яких вони
+    будуються. Зміни визначаються через DirtyFieldsMixin.
+    """
+
+    BARCODE_SOURCE_FIELDS = ()
+    QRCODE_SOURCE_FIELDS = ()
+
+    def _code_source_changed(self, fields):
+        if not self.is_tracked():
+            return True
+        changed = self.changed_fields()
+        return any(f in changed for f in fields)
+
+    def refresh_codes_if_needed(self, update_fields=None):
+        """
+        Згенерувати коди, яких немає або дані яких змінились.
+        Повертає update_fields, доповнені полями перегенерованих зображень.
+        """
+        regenerated = set()
+        if not self.barcode_image or self._code_source_changed(
+            self.BARCODE_SOURCE_FIELDS
+        ):
+            self.generate_barcode()
+            regenerated.add("barcode_image")
+        if not self.qrcode_image or self._code_source_changed(
+            self.QRCODE_SOURCE_FIELDS
+        ):
+            self.generate_qrcode()
+            regenerated.add("qrcode_image")
+
+        if update_fields is not None and regenerated:
+            return set(update_fields) | regenerated
+        return update_fields
+
+
+# ============ ПРЕДИКАТИ ОБЛАДНАННЯ ============
+
+# Обслуговування потрібне, якщо його не було або з останнього минув цей строк
+MAINTENANCE_INTERVAL_DAYS = 365
+# Обладнання без звітів агента та змін довше цього строку вважається неактивним
+STALE_HEARTBEAT_DAYS = 3
+
+
+def _today(today=None):
+    return today or timezone.now().date()
+
+
+def maintenance_due_q(today=None):
+    """Потребує ТО (те саме правило, що Equipment.needs_maintenance())"""
+    due = _today(today) - timedelta(days=MAINTENANCE_INTERVAL_DAYS)
+    return models.Q(last_maintenance_date__isnull=True) | models.Q(
+        last_maintenance_date__lte=due
+    )
+
+
+def warranty_expiring_q(days=30, today=None):
+    """Гарантія закінчується протягом days днів"""
+    today = _today(today)
+    return models.Q(
+        warranty_until__gte=today, warranty_until__lte=today + timedelta(days=days)
+    )
+
+
+def expiring_soon_q(days=30, today=None):
+    """Строк служби закінчується протягом days днів"""
+    today = _today(today)
+    return models.Q(
+        expiry_date__gte=today, expiry_date__lte=today + timedelta(days=days)
+    )
+
+
+def end_of_life_q(today=None):
+    """Строк служби вже минув"""
+    return models.Q(expiry_date__lt=_today(today))
+
+
+def stale_heartbeat_q(days=STALE_HEARTBEAT_DAYS, today=None):
+    """
+    Не оновлювалось (звіт агента оновлює updated_at) з дня today - days.
+    Межа — початок дня, а не updated_at__date, щоб працював індекс.
+    """
+    cutoff = _today(today) - timedelta(days=days)
+    return models.Q(
+        updated_at__lt=timezone.make_aware(datetime.combine(cutoff, time.min))
+    )
+
+
+def days_overdue_expression(today=None):
+    """
+    Скільки днів прострочено ТО: від дати, коли воно мало відбутися, або від
+    покупки, якщо обслуговування не було; 999, якщо невідомо жодне
+    """
+    today = _today(today)
+    return models.Case(
+        models.When(
+            last_maintenance_date__isnull=False,
+            then=DaysSince("last_maintenance_date", today) - MAINTENANCE_INTERVAL_DAYS,
+        ),
+        models.When(
+            purchase_date__isnull=False, then=DaysSince("purchase_date", today)
+        ),
+        default=models.Value(999),
+        output_field=models.IntegerField(),
+    )
+
+
+class EquipmentQuerySet(models.QuerySet):
+    """Вибірки обладнання з правилами уваги, що виконуються в SQL"""
 
     def working(self):
         """Повертає тільки працююче обладнання"""
         return self.filter(status="WORKING")
 
-    def needs_maintenance(self):
-        """Обладнання що потребує обслуговування"""
-        from datetime import timedelta
-
-        maintenance_due = timezone.now().date() - timedelta(days=365)
+    def for_user(self, user):
+        """Обладнання, яким користувач користується або за яке відповідає"""
         return self.filter(
-            models.Q(last_maintenance_date__lt=maintenance_due)
-            | models.Q(last_maintenance_date__isnull=True),
-            status="WORKING",
+            models.Q(current_user=user) | models.Q(responsible_person=user)
         )
 
-    def expiring_soon(self, days=30):
-        """Обладнання що скоро закінчується"""
-        from datetime import timedelta
+    def maintenance_due(self, today=None):
+        """Обладнання будь-якого статусу, що потребує ТО"""
+        return self.filter(maintenance_due_q(today))
+
+    def needs_maintenance(self, today=None):
+        """Працююче обладнання що потребує обслуговування"""
+        return self.working().maintenance_due(today)
+
+    def expiring_soon(self, days=30, today=None):
+        """Працююче обладнання, строк служби якого скоро закінчується"""
+        return self.working().filter(expiring_soon_q(days, today))
+
+    def warranty_expiring(self, days=30, today=None):
+        """Обладнання, гарантія якого закінчується протягом days днів"""
+        return self.filter(warranty_expiring_q(days, today))
+
+    def end_of_life(self, today=None):
+        """Обладнання з минулим строком служби"""
+        return self.filter(end_of_life_q(today))
+
+    def stale_heartbeat(self, days=STALE_HEARTBEAT_DAYS, today=None):
+        """Працююче обладнання без оновлень довше days днів"""
+        return self.working().filter(stale_heartbeat_q(days, today))
+
+    def with_days_overdue(self, today=None):
+        """Анотація days_overdue (див. days_overdue_expression)"""
+        return self.annotate(days_overdue=days_overdue_expression(today))
+
+    def attention_counts(self, today=None, days=30):
+        """Кількості для віджетів уваги одним агрегуючим запитом"""
+        return self.aggregate(
+            total=models.Count("id"),
+            needs_maintenance=models.Count("id", filter=maintenance_due_q(today)),
+            warranty_expiring=models.Count(
+                "id", filter=warranty_expiring_q(days, today)
+            ),
+            expiring_soon=models.Count(
+                "id",
+                filter=expiring_soon_q(days, today) & models.Q(status="WORKING"),
+            ),
+        )
 
-        expiry_date = timezone.now().date() + timedelta(days=days)
-        return self.filter(
-            expiry_date__lte=expiry_date,
-            expiry_date__gte=timezone.now().date(),
-            status="WORKING",
+    def attention_by_user(self, user_ids, today=None, days=30):
+        """
+        {id користувача: {total, needs_maintenance, warranty_expiring}} для
+        багатьох користувачів одним проходом. Одиниця рахується один раз,
+        навіть якщо користувач і працює з нею, і відповідає за неї.
+        """
+        user_ids = set(user_ids)
+        rows = (
+            self.filter(
+                models.Q(current_user__in=user_ids)
+                | models.Q(responsible_person__in=user_ids)
+            )
+            .annotate(
+                due=models.ExpressionWrapper(
+                    maintenance_due_q(today), output_field=models.BooleanField()
+                ),
+                warranty=models.ExpressionWrapper(
+                    warranty_expiring_q(days, today),
+                    output_field=models.BooleanField(),
+                ),
+            )
+            .values_list("current_user_id", "responsible_person_id", "due", "warranty")
         )
+        counts = {}
+        for current, responsible, due, warranty in rows.iterator(chunk_size=2000):
+            for owner in {current, responsible} & user_ids:
+                bucket = counts.setdefault(
+                    owner, {"total": 0, "needs_maintenance": 0, "warranty_expiring": 0}
+                )
+                bucket["total"] += 1
+                bucket["needs_maintenance"] += bool(due)
+                bucket["warranty_expiring"] += bool(warranty)
+        return counts
 
     def by_location(self, location):
         """Обладнання за місцезнаходженням"""
@@ -72,8 +327,31 @@ class EquipmentManager(models.Manager):
             "0.00"
         )
 
+    def update_tracked(self, **values):
+        """
+        update() для масових змін в обхід save(): лічильники KPI, підказки
+        пошуку та кеш аналітики оновлюються так само, як сигналами save(), а
+        updated_at — як auto_now, щоб інкрементні правила автоматизації бачили
+        зміну. values — attname полів. Повертає кількість оновлених рядків.
+        """
+        from .analytics_cache import AnalyticsCache
+        from .counters import EquipmentCounterService
+        from .suggestions import SUGGESTION_FIELDS, SuggestionService
+
+        values.setdefault("updated_at", timezone.now())
+        updated = EquipmentCounterService.update(self, **values)
+        if updated:
+            if set(values) & set(SUGGESTION_FIELDS):
+                transaction.on_commit(SuggestionService.invalidate)
+            transaction.on_commit(lambda: AnalyticsCache.bump("equipment"))
+        return updated
+
+
+class EquipmentManager(models.Manager.from_queryset(EquipmentQuerySet)):
+    """Менеджер для моделі Equipment з додатковими методами"""
+
 
-class Equipment(models.Model):
+class Equipment(CodeImagesMixin, models.Model):
     CATEGORY_CHOICES = [
         ("PC", "Стаціонарний ПК"),
         ("WORK", "Робоча станція"),
@@ -252,6 +530,12 @@ class Equipment(models.Model):
         default=Decimal("20.00"),
         verbose_name="Норма амортизації (%/рік)",
     )
+    depreciation_method = models.CharField(
+        max_length=20,
+        choices=DEPRECIATION_METHOD_CHOICES,
+        default=STRAIGHT_LINE,
+        verbose_name="Метод амортизації",
+    )
 
     # Технічні характеристики
     cpu = models.CharField(
@@ -333,6 +617,10 @@ class Equipment(models.Model):
     # Менеджер
     objects = EquipmentManager()
 
+    # Поля, від яких залежать штрих-код (код) та QR-код (код, назва, розташування)
+    BARCODE_SOURCE_FIELDS = ("inventory_number", "serial_number")
+    QRCODE_SOURCE_FIELDS = ("inventory_number", "serial_number", "name", "location")
+
     class Meta:
         verbose_name = "Обладнання"
         verbose_name_plural = "Обладнання"
@@ -341,7 +629,6 @@ class Equipment(models.Model):
             models.Index(fields=["category", "status"]),
             models.Index(fields=["location", "status"]),
             models.Index(fields=["current_user", "status"]),
-            models.Index(fields=["purchase_date"]),
             models.Index(fields=["warranty_until", "status"]),
             models.Index(fields=["purchase_date", "status"]),
             models.Index(fields=["next_maintenance_date"]),
@@ -352,12 +639,36 @@ class Equipment(models.Model):
                 fields=["building", "floor", "room"],
                 name="idx_equipment_building",
             ),
-            models.Index(fields=["created_at"], name="idx_equipment_created_at"),
             models.Index(
                 fields=["status", "category"], name="idx_equipment_status_cat"
             ),
             models.Index(fields=["warranty_until"], name="idx_equipment_warranty"),
             models.Index(fields=["expiry_date"], name="idx_equipment_expiry"),
+            # Keyset-пагінація розширеного пошуку: сортування (поле, id)
+            models.Index(fields=["name", "id"], name="idx_equipment_name_id"),
+            models.Index(
+                fields=["serial_number", "id"], name="idx_equipment_serial_id"
+            ),
+            models.Index(
+                fields=["inventory_number", "id"], name="idx_equipment_invnum_id"
+            ),
+            models.Index(
+                fields=["purchase_date", "id"], name="idx_equipment_purchase_id"
+            ),
+            models.Index(
+                fields=["created_at", "id"], name="idx_equipment_created_id"
+            ),
+            models.Index(
+                fields=["status", "name", "id"], name="idx_equipment_status_name"
+            ),
+            # Предикати уваги: потребує ТО та неактивне обладнання
+            models.Index(
+                fields=["status", "last_maintenance_date"],
+                name="idx_equipment_maintenance",
+            ),
+            models.Index(
+                fields=["status", "updated_at"], name="idx_equipment_status_upd"
+            ),
         ]
 
     def clean(self):
@@ -396,10 +707,6 @@ class Equipment(models.Model):
                 )
 
     def save(self, *args, **kwargs):
-        # Генерація кодів
-        self.generate_barcode()
-        self.generate_qrcode()
-
         # Автоматичне встановлення наступного обслуговування
         if self.last_maintenance_date and not self.next_maintenance_date:
             from datetime import timedelta
@@ -408,66 +715,106 @@ class Equipment(models.Model):
                 days=365
             )
 
+        # Для завантажених з БД записів зберігаються лише змінені поля
+        changes = self.changed_fields()
+        if (
+            self.pk
+            and self.is_tracked()
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = self.get_dirty_update_fields()
+
+        # Генерація кодів лише для нових записів або при зміні даних коду
+        if settings.CODE_IMAGES_ON_SAVE:
+            kwargs["update_fields"] = self.refresh_codes_if_needed(
+                kwargs.get("update_fields")
+            )
+
+        update_fields = kwargs.get("update_fields")
+        status_change = changes.get("status")
+        if update_fields is not None and "status" not in update_fields:
+            status_change = None
+
         # Логування змін
-        if self.pk:
-            try:
-                old_obj = Equipment.objects.get(pk=self.pk)
-                if old_obj.status != self.status:
-                    logger.info(
-                        f"Статус обладнання {self.name} ({self.serial_number})"
-                        f" змінено з {old_obj.status} на {self.status}"
-                    )
-            except Equipment.DoesNotExist:
-                pass
-        else:
+        if status_change:
+            logger.info(
+                f"Статус обладнання {self.name} ({self.serial_number})"
+                f" змінено з {status_change[0]} на {status_change[1]}"
+            )
+        elif not self.pk:
             logger.info(f"Створено нове обладнання: {self.name} ({self.serial_number})")
 
-        super().save(*args, **kwargs)
+        # Лічильники (inventory/counters.py) оновлюються сигналом, а webhook
+        # ставиться в чергу доставки в тій самій транзакції, що й рядок обладнання
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if status_change:
+                self._notify_status_changed(*status_change)
+        self._remember_original_values(update_fields)
+
+    def _notify_status_changed(self, old_status, new_status):
+        """Webhook equipment.status_changed у черзі доставки (inventory/webhooks.py)"""
+        from .webhooks import WebhookService
+
+        payload = {
+            "equipment_id": self.pk,
+            "name": self.name,
+            "serial_number": self.serial_number,
+            "old_status": old_status,
+            "new_status": new_status,
+            "title": f"Змінено статус: {self.name}",
+            "message": (
+                f"Статус обладнання {self.name} ({self.serial_number})"
+                f" змінено з {old_status} на {new_status}"
+            ),
+        }
+
+        try:
+            with transaction.atomic():
+                WebhookService.send_webhook("equipment.status_changed", payload)
+        except Exception as e:
+            logger.error(f"Webhook error: {e}")
+
+    def get_code_value(self):
+        """Значення, що кодується штрих-кодом"""
+        return self.inventory_number or self.serial_number
+
+    def get_qrcode_data(self):
+        """Текст, що кодується QR-кодом"""
+        return (
+            f"Equipment: {self.name}\nInventory: {self.get_code_value()}"
+            f"\nLocation: {self.location}"
+        )
 
     def generate_barcode(self):
         """Генерація штрих-коду з інвентарного номера"""
-        code = self.inventory_number or self.serial_number
+        code = self.get_code_value()
         if code:
             try:
-                barcode_format = barcode.get("code128", code, writer=ImageWriter())
-                buffer = BytesIO()
-                barcode_format.write(buffer)
                 safe_name = code.replace("/", "_").replace("\\", "_")
-                self.barcode_image.save(
+                _replace_code_image(
+                    self.barcode_image,
                     f"{safe_name}_barcode.png",
-                    ContentFile(buffer.getvalue()),
-                    save=False,
+                    ContentFile(render_barcode(code)),
                 )
-                buffer.close()
             except Exception as e:
                 logger.error(f"Помилка генерації штрих-коду для {code}: {e}")
 
-    def generate_qrcode(self):
-        """Генерація QR-коду з інвентарного номера"""
-        code = self.inventory_number or self.serial_number
+    def generate_qrcode(self, content=None):
+        """
+        Генерація QR-коду з інвентарного номера.
+        content — вже відрендерений PNG (наприклад, з пулу процесів у адмінці).
+        """
+        code = self.get_code_value()
         if code:
             try:
-                qr_data = f"Equipment: {self.name}\nInventory: {code}\nLocation: {self.location}"
-
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=qrcode.constants.ERROR_CORRECT_L,
-                    box_size=10,
-                    border=4,
-                )
-                qr.add_data(qr_data)
-                qr.make(fit=True)
-
-                img = qr.make_image(fill_color="black", back_color="white")
-                buffer = BytesIO()
-                img.save(buffer, format="PNG")
                 safe_name = code.replace("/", "_").replace("\\", "_")
-                self.qrcode_image.save(
+                _replace_code_image(
+                    self.qrcode_image,
                     f"{safe_name}_qrcode.png",
-                    ContentFile(buffer.getvalue()),
-                    save=False,
+                    ContentFile(content or render_qrcode(self.get_qrcode_data())),
                 )
-                buffer.close()
             except Exception as e:
                 logger.error(f"Помилка генерації QR-коду для {code}: {e}")
 
@@ -476,17 +823,16 @@ class Equipment(models.Model):
         if not self.purchase_price or not self.purchase_date:
             return None
 
-        from datetime import date
+        # Значення з annotate_depreciation(), якщо об'єкт завантажено з ним
+        if hasattr(self, "book_value"):
+            return self.book_value
 
-        years_old = (date.today() - self.purchase_date).days / 365.25
-        depreciation_amount = (
-            self.purchase_price
-            * (self.depreciation_rate / 100)
-            * Decimal(str(years_old))
+        return book_value(
+            self.purchase_price,
+            self.depreciation_rate,
+            self.depreciation_method,
+            self.purchase_date,
         )
-        current_value = self.purchase_price - depreciation_amount
-
-        return max(current_value, Decimal("0.00"))
 
     def get_age_in_years(self):
         """Вік обладнання в роках"""
@@ -511,9 +857,11 @@ class Equipment(models.Model):
         if not self.last_maintenance_date:
             return True
 
-        from datetime import date, timedelta
+        from datetime import date
 
-        maintenance_due = self.last_maintenance_date + timedelta(days=365)
+        maintenance_due = self.last_maintenance_date + timedelta(
+            days=MAINTENANCE_INTERVAL_DAYS
+        )
         return date.today() >= maintenance_due
 
     def days_until_expiry(self):
@@ -570,6 +918,11 @@ class Notification(models.Model):
     expires_at = models.DateTimeField(
         null=True, blank=True, verbose_name="Закінчується"
     )
+    # Тип перевірки + обладнання + період (див. inventory/fanout.py): одне
+    # сповіщення на користувача для кожного ключа
+    dedup_key = models.CharField(
+        max_length=100, null=True, blank=True, verbose_name="Ключ дедуплікації"
+    )
 
     class Meta:
         verbose_name = "Уведомлення"
@@ -579,6 +932,13 @@ class Notification(models.Model):
             models.Index(fields=["user", "read"]),
             models.Index(fields=["created_at"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "dedup_key"],
+                condition=models.Q(dedup_key__isnull=False),
+                name="uniq_notification_dedup",
+            ),
+        ]
 
     def mark_as_read(self):
         """Позначити як прочитане"""
@@ -616,7 +976,7 @@ class Software(models.Model):
         return f"{self.name} v{self.version}"
 
 
-class PeripheralDevice(models.Model):
+class PeripheralDevice(CodeImagesMixin, models.Model):
     name = models.CharField(max_length=255, verbose_name="Назва пристрою")
     type = models.CharField(max_length=255, verbose_name="Тип пристрою")
     serial_number = models.CharField(
@@ -649,56 +1009,54 @@ class PeripheralDevice(models.Model):
         verbose_name_plural = "Периферійні пристрої"
         ordering = ["name"]
 
+    # Поля, від яких залежать штрих-код та QR-код
+    BARCODE_SOURCE_FIELDS = ("inventory_number", "serial_number")
+    QRCODE_SOURCE_FIELDS = ("inventory_number", "serial_number", "name", "type")
+
     def __str__(self):
         return f"{self.name} ({self.serial_number})"
 
     def save(self, *args, **kwargs):
-        self.generate_barcode()
-        self.generate_qrcode()
+        if settings.CODE_IMAGES_ON_SAVE:
+            kwargs["update_fields"] = self.refresh_codes_if_needed(
+                kwargs.get("update_fields")
+            )
+
         super().save(*args, **kwargs)
+        self._remember_original_values(kwargs.get("update_fields"))
+
+    def get_code_value(self):
+        return self.inventory_number or self.serial_number
+
+    def get_qrcode_data(self):
+        return (
+            f"Peripheral: {self.name}\nInventory: {self.get_code_value()}"
+            f"\nType: {self.type}"
+        )
 
     def generate_barcode(self):
-        code = self.inventory_number or self.serial_number
+        code = self.get_code_value()
         if code:
             try:
-                barcode_format = barcode.get("code128", code, writer=ImageWriter())
-                buffer = BytesIO()
-                barcode_format.write(buffer)
                 safe_name = code.replace("/", "_").replace("\\", "_")
-                self.barcode_image.save(
+                _replace_code_image(
+                    self.barcode_image,
                     f"{safe_name}_barcode.png",
-                    ContentFile(buffer.getvalue()),
-                    save=False,
+                    ContentFile(render_barcode(code)),
                 )
-                buffer.close()
             except Exception as e:
                 logger.error(f"Помилка генерації штрих-коду для периферії {code}: {e}")
 
     def generate_qrcode(self):
-        code = self.inventory_number or self.serial_number
+        code = self.get_code_value()
         if code:
             try:
-                qr_data = (
-                    f"Peripheral: {self.name}\nInventory: {code}\nType: {self.type}"
-                )
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=qrcode.constants.ERROR_CORRECT_L,
-                    box_size=10,
-                    border=4,
-                )
-                qr.add_data(qr_data)
-                qr.make(fit=True)
-                img = qr.make_image(fill_color="black", back_color="white")
-                buffer = BytesIO()
-                img.save(buffer, format="PNG")
                 safe_name = code.replace("/", "_").replace("\\", "_")
-                self.qrcode_image.save(
+                _replace_code_image(
+                    self.qrcode_image,
                     f"{safe_name}_qrcode.png",
-                    ContentFile(buffer.getvalue()),
-                    save=False,
+                    ContentFile(render_qrcode(self.get_qrcode_data())),
                 )
-                buffer.close()
             except Exception as e:
                 logger.error(f"Помилка генерації QR-коду для периферії {code}: {e}")
 
@@ -935,6 +1293,7 @@ class UserActivity(models.Model):
         indexes = [
             models.Index(fields=["user", "action_type"]),
             models.Index(fields=["timestamp"]),
+            models.Index(fields=["timestamp", "id"], name="idx_activity_timestamp_id"),
         ]
 
     def __str__(self):
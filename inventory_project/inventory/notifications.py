@@ -6,7 +6,7 @@ from accounts.models import CustomUser
 
 from django.conf import settings
 from django.core.mail import send_mail
-from django.db.models import Q
+from django.db.models import Count
 from django.template.loader import render_to_string
 from django.utils import timezone
 
@@ -176,21 +176,14 @@ class NotificationService:
         today = timezone.now().date()
         notifications_created = 0
 
-        equipment_needing_maintenance = []
-        for equipment in Equipment.objects.filter(status="WORKING"):
-            if equipment.needs_maintenance():
-                equipment_needing_maintenance.append(equipment)
+        equipment_needing_maintenance = (
+            Equipment.objects.needs_maintenance(today)
+            .with_days_overdue(today)
+            .select_related("responsible_person")
+        )
 
         for equipment in equipment_needing_maintenance:
-            # Визначити скільки днів прострочено
-            if equipment.last_maintenance_date:
-                days_overdue = (today - equipment.last_maintenance_date).days - 365
-            else:
-                days_overdue = (
-                    (today - equipment.purchase_date).days
-                    if equipment.purchase_date
-                    else 999
-                )
+            days_overdue = equipment.days_overdue
 
             # Знайти користувачів для сповіщення
             users_to_notify = []
@@ -324,28 +317,29 @@ class NotificationService:
 
         digests_sent = 0
 
-        for user in users:
-            # Збираємо статистику для користувача
-            user_equipment = Equipment.objects.filter(
-                Q(current_user=user) | Q(responsible_person=user)
-            ).distinct()
+        # Статистика всіх отримувачів двома запитами замість проходу по
+        # всьому обладнанню для кожного користувача
+        users = list(users)
+        user_ids = [user.pk for user in users]
+        attention = Equipment.objects.attention_by_user(user_ids, today)
+        unread_by_user = dict(
+            Notification.objects.filter(
+                user__in=user_ids, read=False, created_at__date=today
+            )
+            .values_list("user")
+            .annotate(total=Count("id"))
+            .order_by()
+        )
 
-            if not user_equipment.exists():
+        for user in users:
+            stats = attention.get(user.pk)
+            if not stats:
                 continue  # Немає обладнання - немає дайджесту
 
-            # Статистика
-            total_equipment = user_equipment.count()
-            needs_maintenance = len(
-                [eq for eq in user_equipment if eq.needs_maintenance()]
-            )
-            warranty_expiring = user_equipment.filter(
-                warranty_until__lte=today + timedelta(days=30),
-                warranty_until__gte=today,
-            ).count()
-
-            unread_notifications = Notification.objects.filter(
-                user=user, read=False, created_at__date=today
-            ).count()
+            total_equipment = stats["total"]
+            needs_maintenance = stats["needs_maintenance"]
+            warranty_expiring = stats["warranty_expiring"]
+            unread_notifications = unread_by_user.get(user.pk, 0)
 
             # Відправляємо дайджест тільки якщо є що розповісти
             if (
@@ -275,8 +275,8 @@ class OfflineDataManager:
             elif action_type == "update_equipment_status":
                 equipment_id = action_data.get("equipment_id")
                 new_status = action_data.get("status")
-                Equipment.objects.filter(id=equipment_id).update(
-                    status=new_status, updated_at=timezone.now()
+                Equipment.objects.filter(id=equipment_id).update_tracked(
+                    status=new_status
                 )
                 return True
 
@@ -1,6 +1,308 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# ============ KEYSET (CURSOR) ПАГІНАЦІЯ ============
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder обрізає мікросекунди, а курсору потрібна повна точність"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(data: dict) -> str:
+    """Непрозорий курсор: base64 від JSON"""
+    raw = json.dumps(data, cls=CursorJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Розібрати курсор; ValueError, якщо він пошкоджений"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Невірний курсор") from e
+    if not isinstance(data, dict) or "pk" not in data:
+        raise ValueError("Невірний курсор")
+    return data
+
+
+def _after(field, value, pk, descending):
+    """Умова "рядок після (value, pk)" для порядку field, pk з NULL в кінці"""
+    after_pk = Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+    if value is None:
+        return Q(**{f"{field}__isnull": True}) & after_pk
+    beyond = Q(**{f"{field}__lt" if descending else f"{field}__gt": value})
+    return beyond | Q(**{f"{field}__isnull": True}) | (Q(**{field: value}) & after_pk)
+
+
+def _before(field, value, pk, descending):
+    """Умова "рядок перед (value, pk)" для того ж порядку"""
+    before_pk = Q(pk__gt=pk) if descending else Q(pk__lt=pk)
+    if value is None:
+        return Q(**{f"{field}__isnull": False}) | (
+            Q(**{f"{field}__isnull": True}) & before_pk
+        )
+    closer = Q(**{f"{field}__gt" if descending else f"{field}__lt": value})
+    return closer | (Q(**{field: value}) & before_pk)
+
+
+def _ordered(queryset, field, descending, backwards=False):
+    """order_by(field, pk) з NULL в кінці; backwards — той самий порядок навпаки"""
+    if backwards:
+        order = (
+            F(field).asc(nulls_first=True)
+            if descending
+            else F(field).desc(nulls_first=True)
+        )
+        return queryset.order_by(order, "pk" if descending else "-pk")
+    order = (
+        F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+    )
+    return queryset.order_by(order, "-pk" if descending else "pk")
+
+
+def _position(obj, field, backwards=False):
+    """Курсор, що вказує на obj"""
+    attname = "pk" if field == "pk" else obj._meta.get_field(field).attname
+    data = {"v": getattr(obj, attname), "pk": obj.pk}
+    if backwards:
+        data["r"] = 1
+    return encode_cursor(data)
+
+
+def keyset_page(queryset, field, descending=False, page_size=25, cursor=None):
+    """
+    Сторінка за ключем (field, pk) замість OFFSET: вартість не залежить від
+    глибини сторінки. Курсор з "r" веде назад (на попередню сторінку).
+    Повертає (об'єкти, наступний курсор, попередній курсор).
+    """
+    data = decode_cursor(cursor) if cursor else None
+    backwards = bool(data and data.get("r"))
+
+    queryset = _ordered(queryset, field, descending, backwards)
+    if data:
+        condition = _before if backwards else _after
+        queryset = queryset.filter(
+            condition(field, data.get("v"), data["pk"], descending)
+        )
+
+    items = list(queryset[: page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if backwards:
+        items.reverse()
+    if not items:
+        return items, None, None
+
+    if backwards:
+        next_cursor = _position(items[-1], field)
+        previous_cursor = _position(items[0], field, True) if has_more else None
+    else:
+        next_cursor = _position(items[-1], field) if has_more else None
+        previous_cursor = _position(items[0], field, True) if data else None
+    return items, next_cursor, previous_cursor
+
+
+def keyset_paginate(queryset, field, descending=False, page_size=25, cursor=None):
+    """Лише вперед: (об'єкти, курсор наступної сторінки або None)"""
+    items, next_cursor, _ = keyset_page(queryset, field, descending, page_size, cursor)
+    return items, next_cursor
+
+
+def estimated_count(queryset):
+    """
+    (кількість, чи це оцінка). Для нефільтрованої вибірки з великої таблиці на
+    PostgreSQL береться reltuples з pg_class замість повного COUNT(*).
+    """
+    query = queryset.query
+    connection = connections[queryset.db]
+    if (
+        connection.vendor == "postgresql"
+        and not query.where
+        and not query.distinct
+        and not query.combinator
+        and query.group_by is None
+        and not query.is_sliced
+    ):
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= settings.PAGINATION_ESTIMATE_THRESHOLD:
+            return row[0], True
+    return queryset.count(), False
+
+
+def _keyset_ordering(queryset):
+    """Перше поле сортування вибірки, придатне для курсора, або pk"""
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    first = ordering[0] if ordering else "pk"
+    if not isinstance(first, str) or "__" in first or first.lstrip("-") == "?":
+        return "pk"
+    return first
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорна пагінація за стабільним індексованим порядком (field, pk).
+
+    ?cursor=<курсор> — наступна/попередня сторінка (порожній курсор — перша);
+    ?page=N — сумісність зі старими клієнтами (OFFSET, лише для глибини до N);
+    ?count=exact|estimate|none — як рахувати загальну кількість. За
+    замовчуванням кількість оцінюється без курсора і не рахується з курсором.
+    """
+
+    page_size = 25
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    ordering = "-pk"
+
+    def __init__(self, ordering=None, page_size=None, max_page_size=None):
+        if ordering:
+            self.ordering = ordering
+        if page_size:
+            self.page_size = page_size
+        if max_page_size:
+            self.max_page_size = max_page_size
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_count(self, queryset, request, cursor_mode):
+        mode = request.query_params.get(self.count_query_param)
+        if mode is None:
+            mode = "none" if cursor_mode else "estimate"
+        if mode == "exact":
+            return queryset.count(), False
+        if mode == "estimate":
+            return estimated_count(queryset)
+        return None, False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = getattr(view, "keyset_ordering", None) or self.ordering
+        field, descending = ordering.lstrip("-"), ordering.startswith("-")
+        size = self.get_page_size(request)
+        cursor_mode = self.cursor_query_param in request.query_params
+        self.count, self.count_is_estimate = self.get_count(
+            queryset, request, cursor_mode
+        )
+        self.page_size_used = size
+        self.page_number = None
+
+        if cursor_mode:
+            try:
+                items, self.next_cursor, self.previous_cursor = keyset_page(
+                    queryset,
+                    field,
+                    descending,
+                    size,
+                    request.query_params[self.cursor_query_param],
+                )
+            except ValueError:
+                raise NotFound("Невірний курсор")
+            return items
+
+        # Номер сторінки: OFFSET для старих клієнтів, далі можна йти курсором
+        try:
+            self.page_number = max(int(request.query_params.get("page", 1)), 1)
+        except ValueError:
+            self.page_number = 1
+        offset = (self.page_number - 1) * size
+        items = list(_ordered(queryset, field, descending)[offset : offset + size + 1])
+        has_more = len(items) > size
+        items = items[:size]
+        self.next_cursor = _position(items[-1], field) if has_more else None
+        self.previous_cursor = None
+        return items
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_previous_link(self):
+        url = self.request.build_absolute_uri()
+        if self.page_number and self.page_number > 1:
+            return replace_query_param(url, "page", self.page_number - 1)
+        if not self.previous_cursor:
+            return None
+        return replace_query_param(url, self.cursor_query_param, self.previous_cursor)
+
+    def get_pagination_meta(self):
+        """Метадані сторінки для view з власним форматом відповіді"""
+        return {
+            "page": self.page_number,
+            "page_size": self.page_size_used,
+            "total": self.count,
+            "total_is_estimate": self.count_is_estimate,
+            "has_next": self.next_cursor is not None,
+            "next_cursor": self.next_cursor,
+            "previous_cursor": self.previous_cursor,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.count,
+                "count_is_estimate": self.count_is_estimate,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "next_cursor": self.next_cursor,
+                "previous_cursor": self.previous_cursor,
+                "results": data,
+            }
+        )
 
 
 class FlexiblePagination(PageNumberPagination):
+    """
+    Пагінація за замовчуванням. ?page=N працює як і раніше (з точним count),
+    а з параметром ?cursor переходить на KeysetPagination за першим полем
+    сортування вибірки.
+    """
+
     page_size_query_param = "page_size"
-    max_page_size = 1000
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination(
+                ordering=_keyset_ordering(queryset),
+                page_size=self.get_page_size(request),
+                max_page_size=self.max_page_size,
+            )
+            return self.keyset.paginate_queryset(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
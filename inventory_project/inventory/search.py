@@ -0,0 +1,342 @@
+# inventory/search.py - Повнотекстовий індекс для обладнання, користувачів, договорів та ПЗ
+import logging
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection, models
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+from rest_framework.filters import SearchFilter
+
+from .advanced_views import Contract
+from .models import Equipment, Software
+
+logger = logging.getLogger("inventory")
+User = get_user_model()
+
+FTS_TABLE = "inventory_searchdocument_fts"
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ============ MODELS ============
+
+
+class SearchDocument(models.Model):
+    """
+    Денормалізований документ пошукового індексу.
+    На PostgreSQL таблиця має згенеровану колонку search_vector (GIN) та
+    trigram-індекс по body; на SQLite — зовнішню FTS5-таблицю (див. міграцію).
+    """
+
+    kind = models.CharField(max_length=20, verbose_name="Тип")
+    object_id = models.PositiveBigIntegerField(verbose_name="ID об'єкта")
+    title = models.CharField(max_length=255, verbose_name="Заголовок")
+    subtitle = models.CharField(max_length=255, blank=True, default="")
+    url = models.CharField(max_length=255, blank=True, default="")
+    body = models.TextField(blank=True, default="", verbose_name="Текст для пошуку")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = "inventory"
+        verbose_name = "Документ пошукового індексу"
+        verbose_name_plural = "Пошуковий індекс"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"], name="uniq_search_document"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.title}"
+
+
+# ============ ДЖЕРЕЛА ІНДЕКСУ ============
+
+
+def _join(*parts):
+    return " ".join(str(part) for part in parts if part).lower()
+
+
+def _equipment_document(e):
+    return {
+        "title": e.name,
+        "subtitle": f'{e.get_category_display()} • {e.serial_number or "—"}',
+        "url": f"/equipment/{e.id}",
+        "body": _join(
+            e.name,
+            e.serial_number,
+            e.inventory_number,
+            e.model,
+            e.manufacturer,
+            e.location,
+            e.notes,
+        ),
+    }
+
+
+def _user_document(u):
+    return {
+        "title": u.get_full_name() or u.username,
+        "subtitle": u.email,
+        "url": f"/users/{u.id}",
+        "body": _join(u.first_name, u.last_name, u.username, u.email, u.phone),
+    }
+
+
+def _contract_document(c):
+    return {
+        "title": c.title,
+        "subtitle": f"{c.contract_number} • {c.counterparty}",
+        "url": "/contracts",
+        "body": _join(c.title, c.contract_number, c.counterparty, c.description),
+    }
+
+
+def _software_document(s):
+    return {
+        "title": str(s),
+        "subtitle": s.vendor,
+        "url": "/software",
+        "body": _join(s.name, s.vendor, s.version),
+    }
+
+
+# kind -> (модель, поля-джерела, побудова документа, type у відповіді API)
+SEARCH_SOURCES = {
+    "equipment": (
+        Equipment,
+        (
+            "name",
+            "category",
+            "serial_number",
+            "inventory_number",
+            "model",
+            "manufacturer",
+            "location",
+            "notes",
+        ),
+        _equipment_document,
+        "equipment",
+    ),
+    "users": (
+        User,
+        ("first_name", "last_name", "username", "email", "phone"),
+        _user_document,
+        "user",
+    ),
+    "contracts": (
+        Contract,
+        ("title", "contract_number", "counterparty", "description"),
+        _contract_document,
+        "contract",
+    ),
+    "software": (
+        Software,
+        ("name", "vendor", "version"),
+        _software_document,
+        "software",
+    ),
+}
+
+
+def _like_pattern(text):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+_trigram_available = {}
+
+
+def _has_trigram():
+    """Чи встановлено pg_trgm (перевіряється один раз на процес)"""
+    if connection.alias not in _trigram_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available[connection.alias] = cursor.fetchone() is not None
+    return _trigram_available[connection.alias]
+
+
+def _match_expressions(query):
+    """
+    (умова, ранг) для поточної СУБД.
+    PostgreSQL: префіксний tsquery, підрядок через trigram-індекс та
+    word_similarity для опечаток. SQLite: FTS5 MATCH з префіксами та bm25.
+    """
+    words = WORD_RE.findall(query.lower())
+    needle = query.lower()
+    like = _like_pattern(needle)
+
+    if connection.vendor == "postgresql" and words:
+        tsquery = " & ".join(f"{word}:*" for word in words)
+        if _has_trigram():
+            match_sql = (
+                "(search_vector @@ to_tsquery('simple', %s) OR body LIKE %s"
+                " OR %s <%% body)"
+            )
+            match_params = [tsquery, like, needle]
+            rank_sql = (
+                "ts_rank(search_vector, to_tsquery('simple', %s))"
+                " + word_similarity(%s, body)"
+            )
+            rank_params = [tsquery, needle]
+        else:
+            match_sql = "(search_vector @@ to_tsquery('simple', %s) OR body LIKE %s)"
+            match_params = [tsquery, like]
+            rank_sql = "ts_rank(search_vector, to_tsquery('simple', %s))"
+            rank_params = [tsquery]
+        return (
+            RawSQL(match_sql, match_params, output_field=BooleanField()),
+            RawSQL(rank_sql, rank_params, output_field=FloatField()),
+        )
+
+    if connection.vendor == "sqlite" and words:
+        fts_query = " ".join(f'"{word}"*' for word in words)
+        match = RawSQL(
+            f"(inventory_searchdocument.id IN (SELECT rowid FROM {FTS_TABLE}"
+            f" WHERE {FTS_TABLE} MATCH %s) OR body LIKE %s ESCAPE '\\')",
+            [fts_query, like],
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"COALESCE((SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE}"
+            f" WHERE {FTS_TABLE} MATCH %s AND rowid = inventory_searchdocument.id), 0)",
+            [fts_query],
+            output_field=FloatField(),
+        )
+        return match, rank
+
+    return models.Q(body__contains=needle), models.Value(0.0)
+
+
+# ============ SERVICE ============
+
+
+class SearchService:
+    """Підтримка індексу та ранжований пошук по ньому"""
+
+    @staticmethod
+    def index_objects(kind, objects):
+        """Додати або оновити документи одним INSERT ... ON CONFLICT"""
+        build = SEARCH_SOURCES[kind][2]
+        documents = [
+            SearchDocument(kind=kind, object_id=obj.pk, **build(obj)) for obj in objects
+        ]
+        if documents:
+            SearchDocument.objects.bulk_create(
+                documents,
+                update_conflicts=True,
+                unique_fields=["kind", "object_id"],
+                update_fields=["title", "subtitle", "url", "body", "updated_at"],
+            )
+        return len(documents)
+
+    @staticmethod
+    def remove_object(kind, object_id):
+        SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+    @staticmethod
+    def rebuild(kinds=None, batch_size=500):
+        """Повністю перебудувати індекс; повертає {kind: кількість документів}"""
+        counts = {}
+        for kind in kinds or SEARCH_SOURCES:
+            model = SEARCH_SOURCES[kind][0]
+            SearchDocument.objects.filter(kind=kind).delete()
+            batch, total = [], 0
+            for obj in model.objects.order_by("pk").iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    total += SearchService.index_objects(kind, batch)
+                    batch = []
+            total += SearchService.index_objects(kind, batch)
+            counts[kind] = total
+        return counts
+
+    @staticmethod
+    def documents(kind, query):
+        """Документи, що відповідають запиту, впорядковані за релевантністю"""
+        match, rank = _match_expressions(query)
+        return (
+            SearchDocument.objects.filter(kind=kind)
+            .filter(match)
+            .annotate(rank=rank)
+            .order_by("-rank", "object_id")
+        )
+
+    @staticmethod
+    def matching_ids(kind, query):
+        """Підзапит з id об'єктів для filter(pk__in=...)"""
+        match, _ = _match_expressions(query)
+        return (
+            SearchDocument.objects.filter(kind=kind).filter(match).values("object_id")
+        )
+
+    @staticmethod
+    def search(query, kinds=None, limit=5):
+        """{kind: [{type, id, title, subtitle, url}]} для глобального пошуку"""
+        results = {}
+        for kind in kinds or SEARCH_SOURCES:
+            result_type = SEARCH_SOURCES[kind][3]
+            documents = SearchService.documents(kind, query)[:limit]
+            items = [
+                {
+                    "type": result_type,
+                    "id": doc.object_id,
+                    "title": doc.title,
+                    "subtitle": doc.subtitle,
+                    "url": doc.url,
+                }
+                for doc in documents
+            ]
+            if items:
+                results[kind] = items
+        return results
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    SearchFilter, що шукає через SearchDocument замість icontains по кожному
+    полю. Використовується, якщо у view задано search_kind.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        kind = getattr(view, "search_kind", None)
+        terms = self.get_search_terms(request)
+        if kind is None or not terms:
+            return super().filter_queryset(request, queryset, view)
+        return queryset.filter(pk__in=SearchService.matching_ids(kind, " ".join(terms)))
+
+
+# ============ SIGNALS ============
+
+
+def _reindex_on_save(sender, instance, update_fields=None, **kwargs):
+    for kind, (model, fields, _, _) in SEARCH_SOURCES.items():
+        if sender is not model:
+            continue
+        if update_fields is not None and not set(update_fields) & set(fields):
+            return
+        try:
+            SearchService.index_objects(kind, [instance])
+        except Exception as e:
+            logger.error(f"Помилка оновлення пошукового індексу {kind}: {e}")
+
+
+def _reindex_on_delete(sender, instance, **kwargs):
+    for kind, (model, _, _, _) in SEARCH_SOURCES.items():
+        if sender is model:
+            SearchService.remove_object(kind, instance.pk)
+
+
+def connect_signals():
+    """Підключити оновлення індексу до save/delete моделей-джерел"""
+    for model, *_ in SEARCH_SOURCES.values():
+        post_save.connect(
+            _reindex_on_save, sender=model, dispatch_uid=f"search_save_{model.__name__}"
+        )
+        post_delete.connect(
+            _reindex_on_delete,
+            sender=model,
+            dispatch_uid=f"search_delete_{model.__name__}",
+        )
@@ -42,6 +42,7 @@ class EquipmentSerializer(serializers.ModelSerializer):
             "responsible_person",
             "purchase_price",
             "depreciation_rate",
+            "depreciation_method",
             "cpu",
             "ram",
             "storage",
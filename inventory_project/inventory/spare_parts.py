@@ -393,6 +393,9 @@ class SparePartMovement(models.Model):
         verbose_name = "Рух запчастин"
         verbose_name_plural = "Рух запчастин"
         ordering = ["-performed_at"]
+        indexes = [
+            models.Index(fields=["performed_at", "id"], name="idx_movement_performed_id"),
+        ]
 
     def __str__(self):
         return f"{self.get_movement_type_display()} - {self.spare_part.name} ({self.quantity})"
@@ -0,0 +1,221 @@
+# inventory/suggestions.py - Підказки пошуку з префіксного індексу в пам'яті процесу
+import re
+import threading
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+
+from .models import Equipment
+
+# Поле Equipment -> (type, category) у відповіді SearchSuggestionsView
+SUGGESTION_FIELDS = {
+    "name": ("equipment_name", "Назви обладнання"),
+    "serial_number": ("serial_number", "Серійні номери"),
+    "location": ("location", "Локації"),
+    "manufacturer": ("manufacturer", "Виробники"),
+}
+
+VERSION_KEY = "suggestions:version"
+DELTA_KEY = "suggestions:delta:{}"
+DELTA_TIMEOUT = 60 * 60
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class PrefixIndex:
+    """
+    Відсортований масив (ключ, значення), де ключ — нижній регістр значення,
+    починаючи з кожного слова. Префіксний пошук — bisect + послідовний прохід.
+    Лічильник посилань дозволяє видаляти значення, що зустрічаються в кількох записах.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.keys = []
+
+    @staticmethod
+    def _keys(value):
+        lowered = value.lower()
+        return {lowered[m.start() :] for m in WORD_RE.finditer(lowered)} | {lowered}
+
+    def add(self, value, count=1):
+        if not value:
+            return
+        if value in self.counts:
+            self.counts[value] += count
+            return
+        self.counts[value] = count
+        for key in self._keys(value):
+            insort(self.keys, (key, value))
+
+    def remove(self, value):
+        count = self.counts.get(value)
+        if not count:
+            return
+        if count > 1:
+            self.counts[value] = count - 1
+            return
+        del self.counts[value]
+        for key in self._keys(value):
+            index = bisect_left(self.keys, (key, value))
+            if index < len(self.keys) and self.keys[index] == (key, value):
+                del self.keys[index]
+
+    def search(self, prefix, limit):
+        """Значення, слово яких починається з prefix; спершу збіги з початку значення"""
+        prefix = prefix.lower()
+        found = {}
+        index = bisect_left(self.keys, (prefix, ""))
+        while index < len(self.keys) and len(found) < limit * 5:
+            key, value = self.keys[index]
+            if not key.startswith(prefix):
+                break
+            found[value] = None
+            index += 1
+        return sorted(
+            found,
+            key=lambda v: (not v.lower().startswith(prefix), -self.counts[v], v),
+        )[:limit]
+
+
+class SuggestionIndex:
+    """
+    Індекс підказок процесу. Узгодженість між воркерами — через лічильник версій
+    у кеші: кожна зміна публікує дельту під новою версією, інші процеси
+    застосовують пропущені дельти, а якщо якоїсь немає — перебудовуються з БД.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.fields = {}
+
+    def rebuild(self, version):
+        fields = {field: PrefixIndex() for field in SUGGESTION_FIELDS}
+        for field, index in fields.items():
+            rows = (
+                Equipment.objects.exclude(**{field: ""})
+                .exclude(**{f"{field}__isnull": True})
+                .values(field)
+                .annotate(total=Count("id"))
+                .order_by()
+            )
+            for row in rows:
+                index.add(row[field], row["total"])
+        self.fields = fields
+        self.version = version
+
+    def apply(self, ops):
+        for field, op, value in ops:
+            index = self.fields.get(field)
+            if index is None:
+                continue
+            if op == "add":
+                index.add(value)
+            else:
+                index.remove(value)
+
+    def ensure_current(self):
+        current = cache.get(VERSION_KEY)
+        # Лічильника немає (кеш очищено) — історія змін невідома, перебудувати
+        reset = current is None
+        if reset:
+            cache.add(VERSION_KEY, 0, None)
+            current = cache.get(VERSION_KEY, 0)
+        elif current == self.version:
+            return
+
+        with self.lock:
+            if current == self.version and not reset:
+                return
+            if not reset and self.version is not None and current > self.version:
+                deltas = cache.get_many(
+                    [DELTA_KEY.format(v) for v in range(self.version + 1, current + 1)]
+                )
+                if len(deltas) == current - self.version:
+                    for v in range(self.version + 1, current + 1):
+                        self.apply(deltas[DELTA_KEY.format(v)])
+                    self.version = current
+                    return
+            self.rebuild(current)
+
+    def suggest(self, query, limit):
+        self.ensure_current()
+        quotas = {
+            "name": max(limit // 2, 1),
+            "serial_number": max(limit // 4, 1),
+            "location": max(limit // 4, 1),
+            "manufacturer": max(limit // 4, 1),
+        }
+        suggestions = []
+        for field, (suggestion_type, category) in SUGGESTION_FIELDS.items():
+            for value in self.fields[field].search(query, quotas[field]):
+                suggestions.append(
+                    {"text": value, "type": suggestion_type, "category": category}
+                )
+        return suggestions[:limit]
+
+
+_index = SuggestionIndex()
+
+
+class SuggestionService:
+    """Публікація змін та відповідь на запити підказок без звернень до БД"""
+
+    @staticmethod
+    def suggest(query, limit=10):
+        return _index.suggest(query, limit)
+
+    @staticmethod
+    def publish(ops):
+        """Зберегти дельту під новою версією; порожня дельта примушує перебудову"""
+        cache.add(VERSION_KEY, 0, None)
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, None)
+            version = 1
+        if ops:
+            cache.set(DELTA_KEY.format(version), ops, DELTA_TIMEOUT)
+
+    @staticmethod
+    def invalidate():
+        """Для масових змін в обхід save(): усі процеси перебудують індекс"""
+        SuggestionService.publish(None)
+
+
+# ============ SIGNALS ============
+
+
+def _equipment_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and not instance.is_tracked():
+        # Старі значення невідомі — інші процеси перебудують індекс з БД
+        transaction.on_commit(SuggestionService.invalidate)
+        return
+
+    changes = {} if created else instance.changed_fields()
+    ops = []
+    for field in SUGGESTION_FIELDS:
+        if created:
+            ops.append((field, "add", getattr(instance, field)))
+        elif field in changes and (update_fields is None or field in update_fields):
+            old, new = changes[field]
+            ops.extend([(field, "remove", old), (field, "add", new)])
+    if ops:
+        transaction.on_commit(lambda: SuggestionService.publish(ops))
+
+
+def _equipment_deleted(sender, instance, **kwargs):
+    ops = [(field, "remove", getattr(instance, field)) for field in SUGGESTION_FIELDS]
+    transaction.on_commit(lambda: SuggestionService.publish(ops))
+
+
+def connect_signals():
+    post_save.connect(
+        _equipment_saved, sender=Equipment, dispatch_uid="suggestions_save"
+    )
+    post_delete.connect(
+        _equipment_deleted, sender=Equipment, dispatch_uid="suggestions_delete"
+    )
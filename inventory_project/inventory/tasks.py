@@ -1,17 +1,26 @@
 # inventory/tasks.py
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
+from tempfile import TemporaryFile
 
 from celery import shared_task
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
 from django.core.mail import send_mail
-from django.db.models import Q
+from django.db.models import BooleanField, ExpressionWrapper, Q
 from django.utils import timezone
 
+from .counters import EquipmentCounterService
+from .dashboard import EquipmentAggregates
+from .depreciation import DepreciationSnapshotService
+from .fanout import NotificationFanout
+from .labels import DEFAULT_LABEL_LAYOUT, LabelSheetService
 from .models import Equipment, Notification
 from .notifications import NotificationService
+from .webhooks import WebhookDispatcher, WebhookLogService
 
 User = get_user_model()
 logger = logging.getLogger("inventory")
@@ -28,53 +37,58 @@ def check_equipment_expiry():
             (1, "закінчується завтра"),
             (0, "закінчилося сьогодні"),
         ]
+        today = timezone.now().date()
+        periods = {
+            today + timedelta(days=days): (days, suffix)
+            for days, suffix in warning_periods
+        }
 
-        notifications_created = 0
+        # Усі терміни одним запитом
+        expiring_equipment = Equipment.objects.filter(
+            expiry_date__in=list(periods), status__in=["WORKING", "MAINTENANCE"]
+        ).values(
+            "id",
+            "name",
+            "serial_number",
+            "expiry_date",
+            "current_user_id",
+            "responsible_person_id",
+        )
+
+        fanout = NotificationFanout()
+        for row in expiring_equipment.iterator():
+            days, message_suffix = periods[row["expiry_date"]]
+            options = {
+                "notification_type": "WARNING" if days > 0 else "ERROR",
+                "priority": "HIGH" if days <= 7 else "MEDIUM",
+            }
+            title = f"Термін служби обладнання {message_suffix}"
+            equipment = f"Обладнання '{row['name']}' ({row['serial_number']})"
+
+            # Уведомлення для поточного користувача
+            period = f"{days}d:{row['expiry_date']}"
+            fanout.add(
+                row["current_user_id"],
+                row["id"],
+                "expiry",
+                period,
+                title,
+                f"{equipment} {message_suffix}",
+                **options,
+            )
+            # Уведомлення для відповідальної особи
+            if row["responsible_person_id"] != row["current_user_id"]:
+                fanout.add(
+                    row["responsible_person_id"],
+                    row["id"],
+                    "expiry",
+                    period,
+                    title,
+                    f"{equipment} під вашою відповідальністю {message_suffix}",
+                    **options,
+                )
 
-        for days, message_suffix in warning_periods:
-            target_date = timezone.now().date() + timedelta(days=days)
-
-            # Знайти обладнання що закінчується в цей день
-            expiring_equipment = Equipment.objects.filter(
-                expiry_date=target_date, status__in=["WORKING", "MAINTENANCE"]
-            ).select_related("current_user", "responsible_person")
-
-            for equipment in expiring_equipment:
-                # Створити уведомлення для поточного користувача
-                if equipment.current_user:
-                    notification, created = Notification.objects.get_or_create(
-                        user=equipment.current_user,
-                        equipment=equipment,
-                        title=f"Термін служби обладнання {message_suffix}",
-                        defaults={
-                            "message": f"Обладнання '{equipment.name}' ({equipment.serial_number}) {message_suffix}",
-                            "notification_type": "WARNING" if days > 0 else "ERROR",
-                            "priority": "HIGH" if days <= 7 else "MEDIUM",
-                        },
-                    )
-                    if created:
-                        notifications_created += 1
-
-                # Створити уведомлення для відповідальної особи
-                if (
-                    equipment.responsible_person
-                    and equipment.responsible_person != equipment.current_user
-                ):
-                    notification, created = Notification.objects.get_or_create(
-                        user=equipment.responsible_person,
-                        equipment=equipment,
-                        title=f"Термін служби обладнання {message_suffix}",
-                        defaults={
-                            "message": (
-                                f"Обладнання '{equipment.name}' ({equipment.serial_number})"
-                                f" під вашою відповідальністю {message_suffix}"
-                            ),
-                            "notification_type": "WARNING" if days > 0 else "ERROR",
-                            "priority": "HIGH" if days <= 7 else "MEDIUM",
-                        },
-                    )
-                    if created:
-                        notifications_created += 1
+        notifications_created = len(fanout.create())
 
         logger.info(
             f"Створено {notifications_created} уведомлень про закінчення терміну служби"
@@ -94,33 +108,36 @@ def check_warranty_expiry():
             (30, "закінчується через 30 днів"),
             (7, "закінчується через тиждень"),
         ]
+        today = timezone.now().date()
+        periods = {
+            today + timedelta(days=days): (days, suffix)
+            for days, suffix in warning_periods
+        }
 
-        notifications_created = 0
+        expiring_warranty = Equipment.objects.filter(
+            warranty_until__in=list(periods),
+            status__in=["WORKING", "MAINTENANCE"],
+            responsible_person__isnull=False,
+        ).values("id", "name", "serial_number", "warranty_until", "responsible_person_id")
+
+        fanout = NotificationFanout()
+        for row in expiring_warranty.iterator():
+            days, message_suffix = periods[row["warranty_until"]]
+            fanout.add(
+                row["responsible_person_id"],
+                row["id"],
+                "warranty",
+                f"{days}d:{row['warranty_until']}",
+                f"Гарантія на обладнання {message_suffix}",
+                (
+                    f"Гарантія на обладнання '{row['name']}'"
+                    f" ({row['serial_number']}) {message_suffix}"
+                ),
+                notification_type="WARNING",
+                priority="MEDIUM",
+            )
 
-        for days, message_suffix in warning_periods:
-            target_date = timezone.now().date() + timedelta(days=days)
-
-            expiring_warranty = Equipment.objects.filter(
-                warranty_until=target_date, status__in=["WORKING", "MAINTENANCE"]
-            ).select_related("current_user", "responsible_person")
-
-            for equipment in expiring_warranty:
-                if equipment.responsible_person:
-                    notification, created = Notification.objects.get_or_create(
-                        user=equipment.responsible_person,
-                        equipment=equipment,
-                        title=f"Гарантія на обладнання {message_suffix}",
-                        defaults={
-                            "message": (
-                                f"Гарантія на обладнання '{equipment.name}'"
-                                f" ({equipment.serial_number}) {message_suffix}"
-                            ),
-                            "notification_type": "WARNING",
-                            "priority": "MEDIUM",
-                        },
-                    )
-                    if created:
-                        notifications_created += 1
+        notifications_created = len(fanout.create())
 
         logger.info(
             f"Створено {notifications_created} уведомлень про закінчення гарантії"
@@ -136,56 +153,66 @@ def check_warranty_expiry():
 def check_maintenance_schedule():
     """Перевіряє графік обслуговування"""
     try:
-        notifications_created = 0
         today = timezone.now().date()
+        upcoming_date = today + timedelta(days=7)
 
-        # Обладнання що потребує обслуговування
-        overdue_maintenance = Equipment.objects.filter(
-            Q(next_maintenance_date__lt=today)
-            | Q(
-                next_maintenance_date__isnull=True,
-                last_maintenance_date__lt=today - timedelta(days=365),
-            ),
-            status="WORKING",
-        ).select_related("current_user", "responsible_person")
+        # Прострочене обслуговування та попередження за 7 днів одним запитом
+        overdue = Q(next_maintenance_date__lt=today) | Q(
+            next_maintenance_date__isnull=True,
+            last_maintenance_date__lt=today - timedelta(days=365),
+        )
+        equipment_rows = (
+            Equipment.objects.filter(
+                overdue | Q(next_maintenance_date=upcoming_date),
+                status="WORKING",
+                responsible_person__isnull=False,
+            )
+            .annotate(
+                is_overdue=ExpressionWrapper(overdue, output_field=BooleanField())
+            )
+            .values(
+                "id",
+                "name",
+                "serial_number",
+                "responsible_person_id",
+                "is_overdue",
+                "next_maintenance_date",
+                "last_maintenance_date",
+            )
+        )
 
-        for equipment in overdue_maintenance:
-            if equipment.responsible_person:
-                notification, created = Notification.objects.get_or_create(
-                    user=equipment.responsible_person,
-                    equipment=equipment,
-                    title="Потрібне обслуговування обладнання",
-                    defaults={
-                        "message": f"Обладнання '{equipment.name}' ({equipment.serial_number}) потребує обслуговування",
-                        "notification_type": "WARNING",
-                        "priority": "HIGH",
-                    },
+        fanout = NotificationFanout()
+        for row in equipment_rows.iterator():
+            equipment = f"'{row['name']}' ({row['serial_number']})"
+            if row["is_overdue"]:
+                # Період — дата, від якої ТО прострочене: після обслуговування
+                # починається новий цикл сповіщень
+                fanout.add(
+                    row["responsible_person_id"],
+                    row["id"],
+                    "maintenance_overdue",
+                    row["next_maintenance_date"] or row["last_maintenance_date"],
+                    "Потрібне обслуговування обладнання",
+                    f"Обладнання {equipment} потребує обслуговування",
+                    notification_type="WARNING",
+                    priority="HIGH",
                 )
-                if created:
-                    notifications_created += 1
-
-        # Попередження про майбутнє обслуговування (за 7 днів)
-        upcoming_maintenance = Equipment.objects.filter(
-            next_maintenance_date=today + timedelta(days=7), status="WORKING"
-        ).select_related("responsible_person")
-
-        for equipment in upcoming_maintenance:
-            if equipment.responsible_person:
-                notification, created = Notification.objects.get_or_create(
-                    user=equipment.responsible_person,
-                    equipment=equipment,
-                    title="Планове обслуговування через тиждень",
-                    defaults={
-                        "message": (
-                            f"Для обладнання '{equipment.name}' ({equipment.serial_number})"
-                            " заплановано обслуговування через тиждень"
-                        ),
-                        "notification_type": "INFO",
-                        "priority": "MEDIUM",
-                    },
+            else:
+                fanout.add(
+                    row["responsible_person_id"],
+                    row["id"],
+                    "maintenance_upcoming",
+                    row["next_maintenance_date"],
+                    "Планове обслуговування через тиждень",
+                    (
+                        f"Для обладнання {equipment}"
+                        " заплановано обслуговування через тиждень"
+                    ),
+                    notification_type="INFO",
+                    priority="MEDIUM",
                 )
-                if created:
-                    notifications_created += 1
+
+        notifications_created = len(fanout.create())
 
         logger.info(f"Створено {notifications_created} уведомлень про обслуговування")
         return f"Перевірено графік обслуговування, створено {notifications_created} уведомлень"
@@ -226,25 +253,16 @@ def generate_daily_report():
     try:
         today = timezone.now().date()
 
-        # Збір статистики
+        # Збір статистики одним агрегуючим запитом
+        aggregates = EquipmentAggregates.collect()
+        totals = aggregates.totals
         stats = {
-            "total_equipment": Equipment.objects.count(),
-            "working_equipment": Equipment.objects.filter(status="WORKING").count(),
-            "repair_equipment": Equipment.objects.filter(status="REPAIR").count(),
-            "new_equipment_today": Equipment.objects.filter(
-                created_at__date=today
-            ).count(),
-            "expiring_soon": Equipment.objects.filter(
-                expiry_date__lte=today + timedelta(days=30), expiry_date__gte=today
-            ).count(),
-            "maintenance_overdue": Equipment.objects.filter(
-                Q(next_maintenance_date__lt=today)
-                | Q(
-                    next_maintenance_date__isnull=True,
-                    last_maintenance_date__lt=today - timedelta(days=365),
-                ),
-                status="WORKING",
-            ).count(),
+            "total_equipment": totals["count"],
+            "working_equipment": aggregates.status_count("WORKING"),
+            "repair_equipment": aggregates.status_count("REPAIR"),
+            "new_equipment_today": totals["new_today"],
+            "expiring_soon": totals["expiring_soon"],
+            "maintenance_overdue": totals["maintenance_overdue"],
         }
 
         # Створити уведомлення для адміністраторів
@@ -373,33 +391,31 @@ def send_email_notifications():
 def update_equipment_metrics():
     """Оновлення метрик обладнання"""
     try:
-        updated_count = 0
-
-        # Оновити статус обладнання що давно не відповідало
-        offline_threshold = timezone.now() - timedelta(days=7)
-
         # Знайти обладнання що не оновлювалося більше 7 днів
-        stale_equipment = Equipment.objects.filter(
-            updated_at__lt=offline_threshold, status="WORKING"
+        stale_equipment = Equipment.objects.stale_heartbeat(days=7).values(
+            "id", "name", "serial_number", "updated_at", "responsible_person_id"
         )
 
-        for equipment in stale_equipment:
-            # Створити уведомлення про можливу проблему
-            if equipment.responsible_person:
-                Notification.objects.get_or_create(
-                    user=equipment.responsible_person,
-                    equipment=equipment,
-                    title="Обладнання не відповідає",
-                    defaults={
-                        "message": (
-                            f"Обладнання '{equipment.name}' ({equipment.serial_number})"
-                            " не передавало дані більше 7 днів"
-                        ),
-                        "notification_type": "WARNING",
-                        "priority": "MEDIUM",
-                    },
-                )
+        updated_count = 0
+        fanout = NotificationFanout()
+        for row in stale_equipment.iterator():
+            # Уведомлення про можливу проблему
+            # Одне сповіщення на епізод неактивності (дата останнього оновлення)
+            fanout.add(
+                row["responsible_person_id"],
+                row["id"],
+                "stale_7d",
+                timezone.localdate(row["updated_at"]),
+                "Обладнання не відповідає",
+                (
+                    f"Обладнання '{row['name']}' ({row['serial_number']})"
+                    " не передавало дані більше 7 днів"
+                ),
+                notification_type="WARNING",
+                priority="MEDIUM",
+            )
             updated_count += 1
+        fanout.create()
 
         logger.info(f"Перевірено {updated_count} одиниць обладнання на активність")
         return f"Перевірено {updated_count} одиниць обладнання"
@@ -532,21 +548,25 @@ def cleanup_notifications():
 def monitor_equipment_health():
     """Моніторинг здоров'я обладнання"""
     try:
-        alerts_created = 0
         today = timezone.now().date()
 
         # Знайти обладнання що довго не оновлювалося
-        stale_equipment = Equipment.objects.filter(
-            updated_at__date__lt=today - timedelta(days=3), status="WORKING"
+        stale_equipment = Equipment.objects.stale_heartbeat(today=today).values(
+            "id", "name", "serial_number", "location", "updated_at", "current_user_id"
         )
 
-        for equipment in stale_equipment:
-            days_stale = (today - equipment.updated_at.date()).days
-
-            if equipment.current_user:
-                title = f"Обладнання не відповідає: {equipment.name}"
-                message = f"""
-                Обладнання "{equipment.name}" ({equipment.serial_number})
+        fanout = NotificationFanout()
+        for row in stale_equipment.iterator():
+            days_stale = (today - timezone.localdate(row["updated_at"])).days
+            # Не частіше ніж раз на добу по тій самій одиниці
+            fanout.add(
+                row["current_user_id"],
+                row["id"],
+                "stale",
+                today,
+                f"Обладнання не відповідає: {row['name']}",
+                f"""
+                Обладнання "{row['name']}" ({row['serial_number']})
                 не передавало дані {days_stale} днів.
 
                 Можливі причини:
@@ -554,20 +574,13 @@ def monitor_equipment_health():
                 • Проблеми з мережею
                 • Агент не запущений
 
-                Локація: {equipment.location}
-                """
-
-                notification = NotificationService.create_notification(
-                    user=equipment.current_user,
-                    title=title,
-                    message=message,
-                    notification_type="WARNING",
-                    priority="MEDIUM",
-                    equipment=equipment,
-                )
+                Локація: {row['location']}
+                """,
+                notification_type="WARNING",
+                priority="MEDIUM",
+            )
 
-                if notification:
-                    alerts_created += 1
+        alerts_created = len(fanout.create(email=True))
 
         logger.info(f"Створено {alerts_created} алертів про здоров'я обладнання")
         return f"Створено {alerts_created} алертів"
@@ -717,3 +730,97 @@ def detect_equipment_anomalies():
     except Exception as e:
         logger.error(f"Помилка виявлення аномалій: {e}")
         raise
+
+
+@shared_task(bind=True)
+def generate_label_sheet(
+    self, model_key, ids=None, filters=None, layout=None, kind="qrcode"
+):
+    """Сформувати PDF з етикетками та зберегти його в media/labels/"""
+    layout = layout or DEFAULT_LABEL_LAYOUT
+    queryset = LabelSheetService.get_queryset(model_key, ids=ids, filters=filters)
+    total = queryset.count()
+
+    def report_progress(done, total):
+        if not self.request.called_directly:
+            self.update_state(
+                state="PROGRESS", meta={"current": done, "total": total}
+            )
+
+    try:
+        with TemporaryFile() as output:
+            count = LabelSheetService.build(
+                LabelSheetService.iter_labels(queryset, kind),
+                output,
+                layout=layout,
+                kind=kind,
+                total=total,
+                progress=report_progress,
+            )
+            output.seek(0)
+            filename = (
+                f"labels/{model_key}_{kind}_{timezone.now():%Y%m%d_%H%M%S}.pdf"
+            )
+            path = default_storage.save(filename, File(output))
+
+        return {"file": path, "url": default_storage.url(path), "count": count}
+
+    except Exception as e:
+        logger.error(f"Помилка генерації аркуша етикеток: {e}")
+        raise
+
+
+@shared_task
+def snapshot_depreciation(month=None):
+    """
+    Знімок амортизації на кінець місяця (YYYY-MM, за замовчуванням —
+    попередній місяць). Закритий місяць знімається один раз; для відкритого
+    повторний запуск перераховує лише змінені одиниці.
+    """
+    try:
+        if month:
+            target = datetime.strptime(month, "%Y-%m").date()
+        else:
+            target = timezone.now().date().replace(day=1) - timedelta(days=1)
+        return DepreciationSnapshotService.snapshot_month(target)
+
+    except Exception as e:
+        logger.error(f"Помилка знімка амортизації: {e}")
+        raise
+
+
+@shared_task
+def reconcile_equipment_counters():
+    """Звірити лічильники KPI з таблицею обладнання та виправити розбіжності"""
+    try:
+        return EquipmentCounterService.reconcile()
+
+    except Exception as e:
+        logger.error(f"Помилка звірки лічильників обладнання: {e}")
+        raise
+
+
+@shared_task
+def deliver_webhooks():
+    """Розібрати чергу доставки webhooks"""
+    try:
+        return WebhookDispatcher().drain()
+
+    except Exception as e:
+        logger.error(f"Помилка доставки webhooks: {e}")
+        raise
+
+
+@shared_task
+def cleanup_webhook_logs():
+    """Видалити логи webhooks, старші за термін зберігання"""
+    try:
+        result = WebhookLogService.prune()
+        logger.info(
+            f"Видалено {result['logs']} логів та {result['deliveries']} доставок webhooks"
+        )
+        return result
+
+    except Exception as e:
+        logger.error(f"Помилка очищення логів webhooks: {e}")
+        raise
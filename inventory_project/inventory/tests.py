@@ -1,10 +1,83 @@
+import asyncio
+import gzip
+import hashlib
+import hmac
+import importlib
+import io
+import json
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.apps import apps
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
 
-from .models import Equipment
+from .advanced_views import BulkOperationsView
+from .automation import (
+    MATCH_FIELDS,
+    AutomationEngine,
+    AutomationFiring,
+    AutomationRule,
+    RuleRun,
+)
+from .agent_sync import AGENT_PROTOCOL_VERSION, compute_section_hashes
+from .analytics_cache import LOCK_KEY, AnalyticsCache, _params_hash
+from .counters import EquipmentCounter, EquipmentCounterService
+from .dashboard import DashboardService, EquipmentAggregates
+from .depreciation import (
+    DECLINING_BALANCE,
+    STRAIGHT_LINE,
+    DepreciationSnapshot,
+    DepreciationSnapshotService,
+    annotate_depreciation,
+    book_value,
+)
+from .fanout import NotificationFanout
+from .filter_compiler import EQUIPMENT_SORT_FIELDS
+from .models import (
+    Equipment,
+    Notification,
+    PeripheralDevice,
+    Software,
+    UserActivity,
+)
+from .search import SearchDocument, SearchService
+from .suggestions import SuggestionService
+from .tasks import (
+    check_equipment_expiry,
+    cleanup_webhook_logs,
+    deliver_webhooks,
+    generate_label_sheet,
+    monitor_equipment_health,
+    snapshot_depreciation,
+)
+from .webhooks import (
+    ROUTES_GENERATION_KEY,
+    WebhookConfig,
+    WebhookConfigSerializer,
+    WebhookDelivery,
+    WebhookDispatcher,
+    WebhookLog,
+    WebhookLogService,
+    WebhookService,
+)
 
 User = get_user_model()
 
@@ -137,6 +210,39 @@ class EquipmentCRUDTests(TestCase):
         self.assertEqual(response.data["count"], 1)
         self.assertEqual(response.data["results"][0]["name"], "Принтер")
 
+    def test_changed_fields_tracked_without_refetch(self):
+        Equipment.objects.create(**self.equipment_data)
+        eq = Equipment.objects.get(serial_number="SN-TEST-001")
+        self.assertEqual(eq.changed_fields(), {})
+
+        eq.status = "REPAIR"
+        eq.location = "Склад"
+        self.assertEqual(
+            eq.changed_fields(),
+            {"status": ("WORKING", "REPAIR"), "location": ("Офіс 101", "Склад")},
+        )
+
+        with patch("inventory.webhooks.WebhookService.send_webhook") as send_webhook:
+            with self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as ctx:
+                    eq.save()
+
+        equipment_sql = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if '"inventory_equipment"' in q["sql"]
+        ]
+        self.assertEqual(len(equipment_sql), 1)
+        self.assertTrue(equipment_sql[0].startswith("UPDATE"))
+        self.assertNotIn('"name"', equipment_sql[0])
+        self.assertEqual(eq.changed_fields(), {})
+
+        send_webhook.assert_called_once()
+        event, payload = send_webhook.call_args.args
+        self.assertEqual(event, "equipment.status_changed")
+        self.assertEqual(payload["old_status"], "WORKING")
+        self.assertEqual(payload["new_status"], "REPAIR")
+
 
 class HealthCheckTests(TestCase):
     """Тести health check"""
@@ -224,3 +330,1801 @@ class ProfileTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.user.refresh_from_db()
         self.assertEqual(self.user.first_name, "Нове Ім'я")
+
+
+class AgentReportTests(TestCase):
+    """Тести прийому звітів агента"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="agent", password="agentpass123")
+        self.client.force_authenticate(user=self.user)
+        self.report = {
+            "serial_number": "SN-AGENT-001",
+            "name": "WS-001",
+            "location": "Офіс 201",
+            "installed_software": [
+                {"name": f"Program {i}", "version": "1.0", "vendor": "Vendor"}
+                for i in range(20)
+            ],
+            "peripherals": [
+                {"name": "USB Mouse", "type": "USB", "serial_number": "USB-AAA"},
+            ],
+        }
+
+    def test_report_creates_equipment_and_software(self):
+        response = self.client.post("/api/agent/report/", self.report, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["software_synced"], 20)
+        self.assertIn("queries", response.data)
+
+        equipment = Equipment.objects.get(serial_number="SN-AGENT-001")
+        self.assertEqual(Software.objects.filter(installed_on=equipment).count(), 20)
+        self.assertEqual(
+            PeripheralDevice.objects.get(serial_number="USB-AAA").connected_to,
+            equipment,
+        )
+
+    def test_report_applies_only_software_delta(self):
+        self.client.post("/api/agent/report/", self.report, format="json")
+        self.report["installed_software"] = self.report["installed_software"][2:] + [
+            {"name": "New Program", "version": "2.0", "vendor": "Vendor"}
+        ]
+        response = self.client.post("/api/agent/report/", self.report, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["software_added"], 1)
+        self.assertEqual(response.data["software_removed"], 2)
+
+        equipment = Equipment.objects.get(serial_number="SN-AGENT-001")
+        self.assertEqual(Software.objects.filter(installed_on=equipment).count(), 19)
+        self.assertEqual(Software.objects.filter(name="Program 0").count(), 1)
+
+    def test_discovered_software_is_searchable(self):
+        self.report["installed_software"].append(
+            {"name": "Zebradraw", "version": "3.1", "vendor": "Zebra"}
+        )
+        self.client.post("/api/agent/report/", self.report, format="json")
+
+        response = self.client.get("/api/software/", {"search": "Zebradraw"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["name"], "Zebradraw")
+
+    def test_query_count_does_not_grow_with_software(self):
+        self.client.post("/api/agent/report/", self.report, format="json")
+        small = self.client.post("/api/agent/report/", self.report, format="json")
+
+        self.report["installed_software"] = [
+            {"name": f"Program {i}", "version": "1.0", "vendor": "Vendor"}
+            for i in range(200)
+        ]
+        self.client.post("/api/agent/report/", self.report, format="json")
+        large = self.client.post("/api/agent/report/", self.report, format="json")
+        self.assertEqual(small.data["queries"], large.data["queries"])
+
+    def test_unchanged_sections_are_skipped(self):
+        self.client.post("/api/agent/report/", self.report, format="json")
+        self.report["cpu"] = "Intel Core i7"
+        response = self.client.post("/api/agent/report/", self.report, format="json")
+        self.assertEqual(response.data["skipped_sections"], ["software", "peripherals"])
+        self.assertEqual(
+            Equipment.objects.get(serial_number="SN-AGENT-001").cpu, "Intel Core i7"
+        )
+
+    def test_hash_headers_short_circuit_unchanged_report(self):
+        self.client.post("/api/agent/report/", self.report, format="json")
+        equipment = Equipment.objects.get(serial_number="SN-AGENT-001")
+        hashes = compute_section_hashes(self.report)
+
+        response = self.client.post(
+            "/api/agent/report/",
+            self.report,
+            format="json",
+            HTTP_X_AGENT_SERIAL="SN-AGENT-001",
+            HTTP_X_AGENT_REPORT_HASHES=", ".join(f"{k}={v}" for k, v in hashes.items()),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "not_modified")
+        self.assertEqual(response.data["equipment_id"], equipment.id)
+        equipment.refresh_from_db()
+        self.assertGreater(equipment.updated_at, equipment.created_at)
+
+    def test_gzip_report_is_accepted(self):
+        body = gzip.compress(json.dumps(self.report).encode("utf-8"))
+        response = self.client.generic(
+            "POST",
+            "/api/agent/report/",
+            body,
+            content_type="application/json",
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["revision"], 1)
+
+    def test_delta_is_applied_against_snapshot(self):
+        self.client.post("/api/agent/report/", self.report, format="json")
+        delta = {
+            "protocol": AGENT_PROTOCOL_VERSION,
+            "serial_number": "SN-AGENT-001",
+            "base_revision": 1,
+            "hardware": {"changed": {"ram": "32 GB"}, "removed": []},
+            "installed_software": {
+                "added": [{"name": "New Program", "version": "2.0", "vendor": "V"}],
+                "removed": [self.report["installed_software"][0]],
+            },
+            "peripherals": {"added": [], "removed": []},
+        }
+        response = self.client.post("/api/agent/report/delta/", delta, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["revision"], 2)
+        self.assertEqual(response.data["skipped_sections"], ["peripherals"])
+
+        equipment = Equipment.objects.get(serial_number="SN-AGENT-001")
+        self.assertEqual(equipment.ram, "32 GB")
+        self.assertEqual(Software.objects.filter(installed_on=equipment).count(), 20)
+        self.assertFalse(equipment.software_set.filter(name="Program 0").exists())
+
+        response = self.client.post("/api/agent/report/delta/", delta, format="json")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["revision"], 2)
+
+
+class CodeImagesTests(TestCase):
+    """Тести генерації штрих-кодів та QR-кодів"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.equipment = Equipment.objects.create(
+            name="ПК",
+            category="PC",
+            serial_number="SN-CODE-001",
+            location="Офіс 1",
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_codes_not_regenerated_on_unrelated_change(self):
+        equipment = Equipment.objects.get(pk=self.equipment.pk)
+        barcode_name = equipment.barcode_image.name
+        equipment.status = "REPAIR"
+        equipment.save(update_fields=["status"])
+        equipment.refresh_from_db()
+        self.assertEqual(equipment.barcode_image.name, barcode_name)
+
+    def test_codes_replaced_in_place_when_source_changes(self):
+        equipment = Equipment.objects.get(pk=self.equipment.pk)
+        qrcode_name = equipment.qrcode_image.name
+        equipment.location = "Офіс 2"
+        equipment.save()
+        equipment.refresh_from_db()
+        self.assertEqual(equipment.qrcode_image.name, qrcode_name)
+        self.assertTrue(equipment.qrcode_image.storage.exists(qrcode_name))
+
+    def test_generate_missing_codes_command(self):
+        Equipment.objects.filter(pk=self.equipment.pk).update(
+            barcode_image="", qrcode_image=""
+        )
+        call_command(
+            "generate_missing_codes", "--model", "equipment", stdout=io.StringIO()
+        )
+        self.equipment.refresh_from_db()
+        self.assertTrue(self.equipment.barcode_image)
+        self.assertTrue(self.equipment.qrcode_image)
+
+    @override_settings(LABEL_SHEET_WORKERS=1, LABEL_SHEET_PAGES_PER_CHUNK=1)
+    def test_label_sheet_task_builds_multipage_pdf(self):
+        for index in range(24):
+            Equipment.objects.create(
+                name=f"Монітор {index}",
+                category="MONITOR",
+                serial_number=f"SN-LABEL-{index:03d}",
+            )
+
+        result = generate_label_sheet.run(
+            "equipment", filters={"category": "MONITOR"}, layout="a4-3x8"
+        )
+
+        self.assertEqual(result["count"], 24)
+        with default_storage.open(result["file"]) as f:
+            content = f.read()
+        self.assertTrue(content.startswith(b"%PDF"))
+        self.assertEqual(len(re.findall(rb"/Type /Page\b", content)), 1)
+
+        result = generate_label_sheet.run("equipment", filters={}, layout="a4-3x8")
+        self.assertEqual(result["count"], 25)
+        with default_storage.open(result["file"]) as f:
+            self.assertEqual(len(re.findall(rb"/Type /Page\b", f.read())), 2)
+
+    def test_code_image_endpoint_with_etag(self):
+        client = APIClient()
+        client.force_authenticate(
+            user=User.objects.create_user(username="codes", password="codespass123")
+        )
+        cache_dir = f"{self.media_root}/code_cache"
+        with override_settings(CODE_IMAGE_CACHE_DIR=cache_dir):
+            url = f"/api/codes/equipment/{self.equipment.pk}/qrcode.svg"
+            response = client.get(url, {"size": 5})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response["Content-Type"], "image/svg+xml")
+            etag = response["ETag"]
+
+            response = client.get(url, {"size": 5}, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            response = client.get(
+                f"/api/codes/equipment/{self.equipment.pk}/barcode.png"
+            )
+            self.assertEqual(response["Content-Type"], "image/png")
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_unencodable_barcode_is_client_error(self):
+        Equipment.objects.filter(pk=self.equipment.pk).update(
+            inventory_number="ІНВ-001"
+        )
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="codes-inv"))
+        with override_settings(CODE_IMAGE_CACHE_DIR=f"{self.media_root}/code_cache"):
+            response = client.get(
+                f"/api/codes/equipment/{self.equipment.pk}/barcode.png"
+            )
+            self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+            self.assertIn("Code128", response.data["error"])
+            # QR-код кодує кирилицю без проблем
+            response = client.get(
+                f"/api/codes/equipment/{self.equipment.pk}/qrcode.png"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(LABEL_SHEET_WORKERS=2, LABEL_SHEET_PAGES_PER_CHUNK=1)
+    def test_label_sheet_skips_unencodable_rows(self):
+        for index in range(30):
+            Equipment.objects.create(
+                name=f"Монітор {index}",
+                category="MONITOR",
+                serial_number=f"SN-BAD-{index:03d}",
+            )
+        bad = Equipment.objects.filter(category="MONITOR").order_by("pk")[5]
+        Equipment.objects.filter(pk=bad.pk).update(inventory_number="ІНВ-005")
+
+        result = generate_label_sheet.run(
+            "equipment",
+            filters={"category": "MONITOR"},
+            layout="a4-3x8",
+            kind="barcode",
+        )
+
+        self.assertEqual(result["count"], 29)
+        with default_storage.open(result["file"]) as f:
+            content = f.read()
+        self.assertTrue(content.startswith(b"%PDF"))
+        self.assertEqual(len(re.findall(rb"/Type /Page\b", content)), 2)
+
+    def test_label_sheet_rejects_unknown_filter(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="labels-bad"))
+        with patch("inventory.views.generate_label_sheet.delay") as delay:
+            response = client.post(
+                "/api/labels/",
+                {"model": "equipment", "filters": {"bogus": 1}},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("bogus", response.data["error"])
+
+            response = client.post(
+                "/api/labels/",
+                {"model": "equipment", "filters": ["category"]},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        delay.assert_not_called()
+
+
+class SearchIndexTests(TestCase):
+    """Тести пошукового індексу"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="olena",
+            password="searchpass123",
+            first_name="Олена",
+            last_name="Коваль",
+        )
+        self.client.force_authenticate(user=self.user)
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            self.equipment = Equipment.objects.create(
+                name="Ноутбук Dell Latitude",
+                category="LAPTOP",
+                serial_number="SN-IDX-001",
+                location="Офіс 5",
+            )
+
+    def test_global_search_uses_prefix_match(self):
+        response = self.client.get("/api/search/", {"q": "ноут lat"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"]["equipment"][0]["id"], self.equipment.pk
+        )
+
+        response = self.client.get("/api/search/", {"q": "Ковал"})
+        self.assertEqual(response.data["results"]["users"][0]["title"], "Олена Коваль")
+
+    def test_migration_backfills_existing_rows(self):
+        migration = importlib.import_module("inventory.migrations.0021_search_index")
+        SearchService.rebuild()
+        fields = ("kind", "object_id", "title", "subtitle", "url", "body")
+        expected = set(SearchDocument.objects.values_list(*fields))
+
+        SearchDocument.objects.all().delete()
+        migration.backfill_search_index(apps, None)
+        self.assertEqual(set(SearchDocument.objects.values_list(*fields)), expected)
+        self.assertIn(("equipment", self.equipment.pk), {row[:2] for row in expected})
+
+    def test_index_follows_save_and_delete(self):
+        self.assertEqual(
+            SearchService.search("idx-001")["equipment"][0]["id"], self.equipment.pk
+        )
+
+        self.equipment.name = "Принтер Canon"
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            self.equipment.save()
+        self.assertEqual(SearchService.search("dell"), {})
+        self.assertIn("equipment", SearchService.search("canon"))
+
+        self.equipment.delete()
+        self.assertEqual(SearchDocument.objects.filter(kind="equipment").count(), 0)
+
+
+class SearchSuggestionsTests(TestCase):
+    """Тести префіксного індексу підказок"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=User.objects.create_user(username="typeahead", password="typepass123")
+        )
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            self.equipment = Equipment.objects.create(
+                name="Ноутбук Lenovo ThinkPad",
+                category="LAPTOP",
+                serial_number="LNV-0001",
+                location="Офіс 12",
+                manufacturer="Lenovo",
+            )
+
+    def test_suggestions_served_from_memory_after_first_build(self):
+        response = self.client.get("/api/search/suggestions/", {"q": "think"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            "Ноутбук Lenovo ThinkPad", [s["text"] for s in response.data["suggestions"]]
+        )
+
+        with self.assertNumQueries(0):
+            suggestions = SuggestionService.suggest("leno")
+        self.assertEqual(
+            {s["type"] for s in suggestions}, {"equipment_name", "manufacturer"}
+        )
+
+    def test_changes_applied_from_published_delta(self):
+        SuggestionService.suggest("lnv")
+
+        self.equipment.serial_number = "LNV-0002"
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.equipment.save()
+
+        with self.assertNumQueries(0):
+            texts = [s["text"] for s in SuggestionService.suggest("lnv")]
+        self.assertEqual(texts, ["LNV-0002"])
+
+    def test_bulk_location_change_invalidates_suggestions_and_analytics(self):
+        SuggestionService.suggest("офіс")
+        (generation,) = AnalyticsCache.generations(["equipment"])
+
+        request = APIRequestFactory().post(
+            "/",
+            {
+                "action": "change_location",
+                "ids": [self.equipment.pk],
+                "location": "Склад Південь",
+            },
+            format="json",
+        )
+        force_authenticate(request, user=User.objects.get(username="typeahead"))
+        with self.captureOnCommitCallbacks(execute=True):
+            BulkOperationsView.as_view()(request)
+
+        texts = [s["text"] for s in SuggestionService.suggest("склад")]
+        self.assertEqual(texts, ["Склад Південь"])
+        self.assertNotIn(
+            "Офіс 12", [s["text"] for s in SuggestionService.suggest("офіс")]
+        )
+        self.assertNotEqual(AnalyticsCache.generations(["equipment"]), [generation])
+
+
+class AdvancedSearchTests(TestCase):
+    """Тести розширеного пошуку з перевіркою фільтрів та курсорами"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="searcher", password="searchpass123", department="IT"
+        )
+        self.client.force_authenticate(user=self.user)
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            for index in range(5):
+                Equipment.objects.create(
+                    name=f"Монітор {index}",
+                    category="MONITOR",
+                    serial_number=f"SN-ADV-{index}",
+                    current_user=self.user if index < 2 else None,
+                )
+
+    def test_rejects_unknown_filters_and_sort_fields(self):
+        response = self.client.post(
+            "/api/search/advanced/",
+            {"filters": {"status": ["BROKEN"], "manufacturer__name": "Dell"}},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data["errors"]), {"status", "manufacturer__name"})
+
+        response = self.client.post(
+            "/api/search/advanced/", {"sort_by": "password"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_attention_filters_match_shared_predicates(self):
+        today = timezone.now().date()
+        Equipment.objects.filter(serial_number="SN-ADV-0").update(
+            last_maintenance_date=today - timedelta(days=10),
+            next_maintenance_date=today - timedelta(days=1),
+            warranty_until=today + timedelta(days=5),
+        )
+        Equipment.objects.filter(serial_number="SN-ADV-1").update(
+            last_maintenance_date=today - timedelta(days=400),
+            next_maintenance_date=today + timedelta(days=30),
+        )
+        Equipment.objects.exclude(serial_number__in=["SN-ADV-0", "SN-ADV-1"]).update(
+            last_maintenance_date=today
+        )
+
+        def found(filters):
+            response = self.client.post(
+                "/api/search/advanced/", {"filters": filters}, format="json"
+            )
+            return {item["id"] for item in response.data["results"]}
+
+        self.assertEqual(
+            found({"needs_maintenance": True}),
+            set(Equipment.objects.maintenance_due().values_list("pk", flat=True)),
+        )
+        self.assertEqual(
+            found({"warranty_expiring_days": 7}),
+            set(Equipment.objects.warranty_expiring(7).values_list("pk", flat=True)),
+        )
+
+    def test_sort_fields_are_backed_by_keyset_indexes(self):
+        indexed = {
+            tuple(index.fields)[0]
+            for index in Equipment._meta.indexes
+            if tuple(index.fields)[1:] == ("id",)
+        }
+        self.assertLessEqual(EQUIPMENT_SORT_FIELDS, indexed)
+
+        response = self.client.post(
+            "/api/search/advanced/",
+            {"sort_by": "created_at", "sort_order": "desc"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(
+            "/api/search/advanced/", {"sort_by": "location"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_pages_through_results(self):
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.post(
+                "/api/search/advanced/",
+                {
+                    "filters": {"category": ["MONITOR"]},
+                    "page_size": 2,
+                    "cursor": cursor,
+                    "include_total": True,
+                },
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["pagination"]["total"], 5)
+            seen.extend(item["name"] for item in response.data["results"])
+            cursor = response.data["pagination"]["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f"Монітор {index}" for index in range(5)])
+
+    def test_department_filter_uses_assigned_user(self):
+        response = self.client.post(
+            "/api/search/advanced/",
+            {"filters": {"department": ["IT"]}, "sort_order": "desc"},
+            format="json",
+        )
+        self.assertEqual(
+            [item["name"] for item in response.data["results"]],
+            ["Монітор 1", "Монітор 0"],
+        )
+        self.assertEqual(response.data["results"][0]["department"], "IT відділ")
+
+
+class KeysetPaginationTests(TestCase):
+    """Тести курсорної пагінації списків"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="pager", password="pagerpass123", department="IT"
+        )
+        self.client.force_authenticate(user=self.user)
+        activities = UserActivity.objects.bulk_create(
+            UserActivity(user=self.user, action_type="search") for _ in range(7)
+        )
+        # Однаковий час у кількох записів перевіряє розрізнення за id
+        moment = timezone.now()
+        UserActivity.objects.filter(pk__in=[a.pk for a in activities[2:5]]).update(
+            timestamp=moment
+        )
+        self.expected = list(
+            UserActivity.objects.order_by("-timestamp", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+
+    def test_cursor_walk_forward_and_back(self):
+        pages = []
+        response = self.client.get("/api/activity-log/", {"page_size": 3})
+        self.assertEqual(response.data["count"], 7)
+        while True:
+            pages.append([row["id"] for row in response.data["results"]])
+            if not response.data["next_cursor"]:
+                break
+            response = self.client.get(
+                "/api/activity-log/",
+                {"page_size": 3, "cursor": response.data["next_cursor"]},
+            )
+            self.assertIsNone(response.data["count"])
+
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+        response = self.client.get(
+            "/api/activity-log/",
+            {"page_size": 3, "cursor": response.data["previous_cursor"]},
+        )
+        self.assertEqual([row["id"] for row in response.data["results"]], pages[1])
+
+    def test_legacy_page_number_and_invalid_cursor(self):
+        response = self.client.get("/api/activity-log/", {"page": 2, "page_size": 3})
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], self.expected[3:6]
+        )
+        self.assertIn("page=1", response.data["previous"])
+
+        response = self.client.get("/api/activity-log/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_users_list_pages_by_ordering_field(self):
+        for index in range(4):
+            User.objects.create_user(username=f"user{index}", password="pass12345")
+        response = self.client.get(
+            "/api/users/", {"ordering": "username", "page_size": 3, "cursor": ""}
+        )
+        names = [row["username"] for row in response.data["results"]]
+        response = self.client.get(
+            "/api/users/",
+            {
+                "ordering": "username",
+                "page_size": 3,
+                "cursor": response.data["next_cursor"],
+            },
+        )
+        names += [row["username"] for row in response.data["results"]]
+        self.assertEqual(
+            names,
+            list(User.objects.order_by("username").values_list("username", flat=True)),
+        )
+        self.assertIsNone(response.data["next"])
+
+
+class DashboardAggregatesTests(TestCase):
+    """Тести агрегатів дашборду одним запитом"""
+
+    def setUp(self):
+        it_user = User.objects.create_user(
+            username="it", password="pass12345", department="IT"
+        )
+        hr_user = User.objects.create_user(
+            username="hr", password="pass12345", department="HR"
+        )
+        rows = [
+            ("WORKING", "PC", "Київ", it_user, "1000.00"),
+            ("WORKING", "PC", "Київ", it_user, "500.00"),
+            ("REPAIR", "MONITOR", "Київ", hr_user, "200.00"),
+            ("MAINTENANCE", "MONITOR", "Львів", None, None),
+        ]
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            for index, (state, category, location, owner, price) in enumerate(rows):
+                Equipment.objects.create(
+                    name=f"Агрегат {index}",
+                    serial_number=f"SN-AGG-{index}",
+                    status=state,
+                    category=category,
+                    location=location,
+                    current_user=owner,
+                    purchase_price=price,
+                )
+
+    def test_slices_share_one_query(self):
+        with self.assertNumQueries(1):
+            aggregates = EquipmentAggregates.collect()
+        with self.assertNumQueries(0):
+            overview = DashboardService.get_equipment_overview(aggregates)
+            locations = DashboardService.get_location_statistics(aggregates)
+
+        self.assertEqual(overview["total_equipment"], 4)
+        self.assertEqual(overview["working_equipment"], 2)
+        self.assertEqual(overview["in_repair"], 1)
+        self.assertEqual(overview["in_maintenance"], 1)
+        self.assertEqual(
+            locations[0],
+            {
+                "location": "Київ",
+                "equipment_count": 3,
+                "total_value": Decimal("1700.00"),
+                "working_count": 2,
+                "repair_count": 1,
+            },
+        )
+
+        # Відділи: агрегати + один запит кількості користувачів
+        with self.assertNumQueries(1):
+            departments = DashboardService.get_department_statistics(aggregates)
+        by_code = {row["department_code"]: row for row in departments}
+        self.assertEqual(by_code["IT"]["equipment_count"], 2)
+        self.assertEqual(by_code["IT"]["equipment_value"], 1500.0)
+        self.assertEqual(by_code["HR"]["user_count"], 1)
+        self.assertEqual(by_code["FINANCE"]["equipment_count"], 0)
+
+
+class DepreciationTests(TestCase):
+    """Тести розрахунку амортизації в SQL"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="accountant", password="pass12345"
+        )
+        self.client.force_authenticate(user=self.user)
+        purchased = timezone.now().date() - timedelta(days=730)
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            self.straight = Equipment.objects.create(
+                name="Ноутбук",
+                serial_number="SN-DEP-1",
+                category="LAPTOP",
+                location="Київ",
+                purchase_price=Decimal("1000.00"),
+                purchase_date=purchased,
+            )
+            self.declining = Equipment.objects.create(
+                name="Сервер",
+                serial_number="SN-DEP-2",
+                category="SERVER",
+                location="Київ",
+                purchase_price=Decimal("5000.00"),
+                purchase_date=purchased,
+                depreciation_method=DECLINING_BALANCE,
+            )
+
+    def test_sql_matches_python_formula(self):
+        rows = {eq.pk: eq for eq in annotate_depreciation(Equipment.objects.all())}
+        self.assertEqual(rows[self.straight.pk].book_value, Decimal("600.27"))
+        for obj in (self.straight, self.declining):
+            annotated = rows[obj.pk]
+            self.assertEqual(
+                annotated.book_value,
+                book_value(
+                    obj.purchase_price,
+                    obj.depreciation_rate,
+                    obj.depreciation_method,
+                    obj.purchase_date,
+                ),
+            )
+            self.assertEqual(
+                annotated.accumulated_depreciation,
+                obj.purchase_price - annotated.book_value,
+            )
+
+    def test_missing_purchase_date_has_zero_book_value(self):
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            undated = Equipment.objects.create(
+                name="Монітор",
+                serial_number="SN-DEP-3",
+                category="MONITOR",
+                purchase_price=Decimal("400.00"),
+                depreciation_method=DECLINING_BALANCE,
+            )
+        annotated = annotate_depreciation(Equipment.objects.filter(pk=undated.pk))[0]
+        self.assertEqual(annotated.book_value, Decimal("0.00"))
+        self.assertEqual(annotated.accumulated_depreciation, Decimal("400.00"))
+        self.assertEqual(annotated.monthly_depreciation, Decimal("0.00"))
+        self.assertEqual(
+            book_value(Decimal("400.00"), Decimal("20.00"), STRAIGHT_LINE, None),
+            Decimal("0.00"),
+        )
+
+        # Як у get_depreciation_value() or 0: без дати покупки вартість не враховується
+        overview = DashboardService.get_financial_overview()
+        expected = sum(
+            eq.get_depreciation_value() or Decimal("0")
+            for eq in Equipment.objects.all()
+        )
+        self.assertEqual(overview["total_purchase_value"], 6400.0)
+        self.assertAlmostEqual(overview["current_depreciated_value"], float(expected))
+
+    def test_report_uses_grouped_aggregates(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/reports/depreciation/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = response.data["summary"]
+        self.assertEqual(summary["total_purchase_value"], 6000.0)
+        self.assertAlmostEqual(
+            summary["total_book_value"],
+            sum(item["book_value"] for item in response.data["items"]),
+        )
+        self.assertEqual(response.data["by_location"][0]["count"], 2)
+
+    def test_monthly_snapshot_is_incremental(self):
+        today = timezone.now().date()
+        month = today.replace(day=1) - timedelta(days=1)
+        label = f"{month:%Y-%m}"
+
+        # Відкритий (поточний) місяць перераховується інкрементно
+        current = DepreciationSnapshotService.snapshot_month(today)
+        self.assertEqual((current["processed"], current["closed"]), (2, False))
+        self.assertEqual(snapshot_depreciation(label)["processed"], 2)
+
+        self.declining.purchase_price = Decimal("4000.00")
+        self.declining.save()
+        result = DepreciationSnapshotService.snapshot_month(today)
+        self.assertEqual((result["processed"], result["total"]), (1, 2))
+
+        # Закритий місяць зі знімком не переписується
+        result = snapshot_depreciation(label)
+        self.assertEqual((result["processed"], result["closed"]), (0, True))
+        self.assertEqual(
+            DepreciationSnapshot.objects.get(
+                equipment=self.declining, month=month.replace(day=1)
+            ).purchase_price,
+            Decimal("5000.00"),
+        )
+
+        response = self.client.get("/api/reports/depreciation/", {"month": label})
+        self.assertEqual(response.data["source"], "snapshot")
+        self.assertEqual(response.data["summary"]["total_purchase_value"], 6000.0)
+        snapshot = DepreciationSnapshot.objects.get(
+            equipment=self.straight, month=month.replace(day=1)
+        )
+        self.assertEqual(
+            snapshot.book_value,
+            book_value(
+                Decimal("1000.00"),
+                Decimal("20.00"),
+                STRAIGHT_LINE,
+                self.straight.purchase_date,
+                month,
+            ),
+        )
+
+        response = self.client.get("/api/reports/depreciation/")
+        self.assertEqual(response.data["source"], "live")
+        response = self.client.get("/api/reports/depreciation/", {"month": "2024-13"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AdvancedAnalyticsTests(TestCase):
+    """Тести розширеної аналітики з календарними місяцями"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="analyst", password="pass12345")
+        self.client.force_authenticate(user=self.user)
+        today = timezone.now().date()
+        self.old_month = today.replace(day=1)
+        for _ in range(10):
+            self.old_month = (self.old_month - timedelta(days=1)).replace(day=1)
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            Equipment.objects.create(
+                name="Новий",
+                serial_number="SN-AN-1",
+                purchase_date=today,
+                purchase_price=Decimal("100.00"),
+            )
+            Equipment.objects.create(
+                name="Місячний",
+                serial_number="SN-AN-2",
+                purchase_date=self.old_month,
+                purchase_price=Decimal("250.00"),
+            )
+            Equipment.objects.create(
+                name="Старий",
+                serial_number="SN-AN-3",
+                purchase_date=today.replace(year=today.year - 10, day=1),
+            )
+
+    def test_series_use_calendar_months_and_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/analytics/advanced/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(
+            len([q for q in queries if "inventory_equipment" in q["sql"]]), 6
+        )
+
+        months = [row["month"] for row in response.data["monthly_acquisitions"]]
+        self.assertEqual(len(set(months)), 24)
+        self.assertEqual(months, sorted(months))
+        self.assertEqual(months[-1], timezone.now().strftime("%Y-%m"))
+        by_month = {row["month"]: row for row in response.data["monthly_acquisitions"]}
+        self.assertEqual(
+            by_month[self.old_month.strftime("%Y-%m")]["total_cost"], 250.0
+        )
+
+        ages = {row["age"]: row["count"] for row in response.data["age_distribution"]}
+        self.assertEqual(ages["0-1"], 2)
+        self.assertEqual(ages["7+"], 1)
+        self.assertEqual(response.data["summary"]["equipment_over_5_years"], 1)
+
+
+class AnalyticsCacheTests(TestCase):
+    """Тести кешу аналітики з інвалідацією за тегами"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="cached", password="pass12345", is_staff=True
+        )
+        self.client.force_authenticate(user=self.user)
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            self.equipment = Equipment.objects.create(
+                name="Кешований", serial_number="SN-AC-1"
+            )
+
+    def _equipment_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len([q for q in queries if "inventory_equipment" in q["sql"]])
+
+    def test_hit_and_invalidation_by_tag(self):
+        first, count = self._equipment_queries("/api/analytics/equipment/")
+        self.assertGreater(count, 0)
+        second, count = self._equipment_queries("/api/analytics/equipment/", {"_": 1})
+        self.assertEqual(count, 0)
+        self.assertEqual(second.data["summary"]["total_equipment"], 1)
+
+        # Зміна користувачів не зачіпає аналітику обладнання
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username="other", password="pass12345")
+        _, count = self._equipment_queries("/api/analytics/equipment/")
+        self.assertEqual(count, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with override_settings(CODE_IMAGES_ON_SAVE=False):
+                Equipment.objects.create(name="Другий", serial_number="SN-AC-2")
+        third, count = self._equipment_queries("/api/analytics/equipment/")
+        self.assertGreater(count, 0)
+        self.assertEqual(third.data["summary"]["total_equipment"], 2)
+
+        stats = self.client.get("/api/analytics/cache-stats/").data["endpoints"]
+        self.assertEqual(stats["equipment_analytics"]["hits"], 2)
+        self.assertEqual(stats["equipment_analytics"]["misses"], 2)
+        self.assertEqual(stats["equipment_analytics"]["hit_ratio"], 0.5)
+
+    def test_params_are_normalized(self):
+        self._equipment_queries("/api/analytics/", {"months": 12})
+        _, count = self._equipment_queries("/api/analytics/")
+        self.assertEqual(count, 0)
+        _, count = self._equipment_queries("/api/analytics/", {"months": 6})
+        self.assertGreater(count, 0)
+
+    def test_only_lock_holder_recomputes(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        with override_settings(ANALYTICS_CACHE_TIMEOUT=-1):
+            self.assertEqual(
+                AnalyticsCache.get_or_compute("test", {}, compute, ("equipment",)), 1
+            )
+        cache.add(LOCK_KEY.format("test", _params_hash({})), 1)
+
+        # Свіжість минула, але дані не змінювались: інший воркер уже
+        # перераховує, тому віддається попередній результат
+        value = AnalyticsCache.get_or_compute("test", {}, compute, ("equipment",))
+        self.assertEqual(value, 1)
+        self.assertEqual(len(calls), 1)
+
+        # Дані змінились — старий результат не віддається, після очікування
+        # воркер рахує сам
+        AnalyticsCache.bump("equipment")
+        with override_settings(ANALYTICS_CACHE_WAIT=0):
+            value = AnalyticsCache.get_or_compute("test", {}, compute, ("equipment",))
+        self.assertEqual(value, 2)
+
+    def test_stats_require_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get("/api/analytics/cache-stats/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class EquipmentCounterTests(TestCase):
+    """Тести денормалізованих лічильників обладнання"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="pass12345")
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            self.first = Equipment.objects.create(
+                name="Перший",
+                serial_number="SN-CNT-1",
+                location="Київ",
+                current_user=self.user,
+            )
+            self.second = Equipment.objects.create(
+                name="Другий", serial_number="SN-CNT-2", location="Львів"
+            )
+
+    def assertCountersExact(self):
+        stored = {
+            (row.dimension, row.value): row.count
+            for row in EquipmentCounter.objects.exclude(count=0)
+        }
+        self.assertEqual(stored, dict(EquipmentCounterService.expected_counts()))
+
+    def test_counters_follow_insert_update_delete(self):
+        self.assertEqual(EquipmentCounterService.get("total"), 2)
+        self.assertEqual(self.user.get_assigned_equipment_count(), 1)
+
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            self.first.status = "REPAIR"
+            self.first.location = "Львів"
+            self.first.save()
+            # Екземпляр без збережених значень: старі читаються з БД
+            untracked = Equipment.objects.get(pk=self.second.pk)
+            untracked._original_values = None
+            untracked.current_user = self.user
+            untracked.save()
+        self.assertCountersExact()
+        self.assertEqual(self.user.get_assigned_equipment_count(), 1)
+        self.assertEqual(EquipmentCounterService.group("location"), {"Львів": 2})
+
+        self.first.delete()
+        self.assertCountersExact()
+        self.assertEqual(EquipmentCounterService.get("status", "REPAIR"), 0)
+
+    def test_reconcile_repairs_bulk_updates(self):
+        Equipment.objects.filter(pk=self.second.pk).update(status="DISPOSED")
+        EquipmentCounter.objects.filter(dimension="total").update(count=10)
+        result = EquipmentCounterService.reconcile()
+        self.assertEqual(result["repaired"], 3)
+        self.assertCountersExact()
+        self.assertEqual(EquipmentCounterService.reconcile()["repaired"], 0)
+
+    def test_bulk_endpoints_keep_counters_exact(self):
+        other = User.objects.create_user(username="other", password="pass12345")
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        ids = [self.first.pk, self.second.pk]
+
+        response = client.post(
+            "/api/equipment/bulk-update/",
+            {"ids": ids, "status": "REPAIR"},
+            format="json",
+        )
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(EquipmentCounterService.get("status", "WORKING"), 0)
+        self.assertCountersExact()
+
+        # Маршрут bulk-operations перекриває detail роутера — викликаємо view напряму
+        factory = APIRequestFactory()
+        view = BulkOperationsView.as_view()
+        for data in (
+            {"action": "change_status", "status": "STORAGE"},
+            {"action": "change_location", "location": "Одеса"},
+            {"action": "assign_user", "user_id": other.pk},
+        ):
+            request = factory.post("/", {"ids": ids, **data}, format="json")
+            force_authenticate(request, user=self.user)
+            self.assertEqual(view(request).status_code, status.HTTP_200_OK)
+            self.assertCountersExact()
+        self.assertEqual(
+            EquipmentCounterService.get("user_status", f"{other.pk}:STORAGE"), 2
+        )
+        self.assertEqual(self.user.get_assigned_equipment_count(), 0)
+
+    def test_kpi_reads_use_counters(self):
+        with self.assertNumQueries(1):
+            overview = DashboardService.get_equipment_overview()
+        self.assertEqual(overview["total_equipment"], 2)
+        self.assertEqual(overview["working_equipment"], 2)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        stats = client.get("/api/users/stats/").data
+        expected = (
+            User.objects.filter(is_active=True)
+            .exclude(assigned_equipment__isnull=False)
+            .count()
+        )
+        self.assertEqual(stats["without_equipment"], expected)
+        dashboard = client.get("/api/mobile/dashboard/").data
+        self.assertEqual(dashboard["equipment_stats"]["assigned_to_me"], 1)
+
+
+class EquipmentPredicateTests(TestCase):
+    """Тести правил уваги на рівні queryset"""
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.users = [
+            User.objects.create_user(
+                username=f"digest{i}",
+                password="pass12345",
+                email=f"digest{i}@example.com",
+                notification_preferences={"daily_reports": True},
+            )
+            for i in range(3)
+        ]
+        rows = [
+            # (останнє ТО днів тому, покупка днів тому, гарантія через днів, статус)
+            (None, 100, 10, "WORKING"),
+            (365, 400, None, "WORKING"),
+            (364, 400, 40, "WORKING"),
+            (None, None, None, "REPAIR"),
+        ]
+        with override_settings(CODE_IMAGES_ON_SAVE=False):
+            for index, (maintained, bought, warranty, state) in enumerate(rows):
+                owner = self.users[index % 2]
+                Equipment.objects.create(
+                    name=f"Предикат {index}",
+                    serial_number=f"SN-PRED-{index}",
+                    status=state,
+                    current_user=owner,
+                    responsible_person=owner,
+                    last_maintenance_date=(
+                        self.today - timedelta(days=maintained) if maintained else None
+                    ),
+                    purchase_date=(
+                        self.today - timedelta(days=bought) if bought else None
+                    ),
+                    warranty_until=(
+                        self.today + timedelta(days=warranty) if warranty else None
+                    ),
+                )
+
+    def test_predicate_matches_instance_rule(self):
+        expected = {e.pk for e in Equipment.objects.all() if e.needs_maintenance()}
+        self.assertEqual(
+            set(Equipment.objects.maintenance_due().values_list("pk", flat=True)),
+            expected,
+        )
+        overdue = dict(
+            Equipment.objects.needs_maintenance()
+            .with_days_overdue()
+            .values_list("name", "days_overdue")
+        )
+        self.assertEqual(overdue, {"Предикат 0": 100, "Предикат 1": 0})
+
+        alerts = DashboardService.get_maintenance_alerts()
+        self.assertEqual(alerts["needs_maintenance_count"], 2)
+        self.assertEqual(alerts["needs_maintenance"][0]["name"], "Предикат 0")
+        self.assertEqual(alerts["warranty_expiring_count"], 1)
+
+    def test_attention_counts(self):
+        attention = self.users[0].get_equipment_needing_attention()
+        self.assertEqual(attention["needs_maintenance"], 1)
+        self.assertEqual(attention["warranty_expiring"], 1)
+
+        by_user = Equipment.objects.attention_by_user([u.pk for u in self.users])
+        self.assertEqual(by_user[self.users[0].pk]["total"], 2)
+        self.assertEqual(by_user[self.users[1].pk]["needs_maintenance"], 2)
+        self.assertNotIn(self.users[2].pk, by_user)
+
+    def test_digest_queries_do_not_grow_with_users(self):
+        from django.core import mail
+
+        from .notifications import NotificationService
+
+        with CaptureQueriesContext(connection) as queries:
+            sent = NotificationService.send_daily_digest()
+        self.assertEqual(sent, 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            len([q for q in queries if "inventory_equipment" in q["sql"]]), 1
+        )
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    CODE_IMAGES_ON_SAVE=False,
+)
+class NotificationFanoutTests(TestCase):
+    """Тести масового створення сповіщень перевірками Celery"""
+
+    def setUp(self):
+        today = timezone.now().date()
+        self.owner = User.objects.create_user(
+            username="fanout", password="pass12345", email="fanout@example.com"
+        )
+        self.responsible = User.objects.create_user(
+            username="fanout-resp", password="pass12345"
+        )
+        for index, days in enumerate([30, 7, 1, 0, 30, 12]):
+            Equipment.objects.create(
+                name=f"Фанаут {index}",
+                serial_number=f"SN-FAN-{index}",
+                expiry_date=today + timedelta(days=days),
+                current_user=self.owner,
+                responsible_person=self.responsible,
+            )
+
+    def test_expiry_check_is_bulk_and_idempotent(self):
+        with CaptureQueriesContext(connection) as queries:
+            check_equipment_expiry()
+        notifications = Notification.objects.filter(title__startswith="Термін")
+        # 5 одиниць у вікнах попередження × 2 отримувачі
+        self.assertEqual(notifications.count(), 10)
+        self.assertEqual(
+            len([q for q in queries if "inventory_notification" in q["sql"]]), 1
+        )
+        self.assertEqual(
+            notifications.filter(user=self.responsible)
+            .first()
+            .message.count("під вашою відповідальністю"),
+            1,
+        )
+
+        # Повторний запуск: вибірка обладнання та вставка без нових рядків
+        with CaptureQueriesContext(connection) as queries:
+            result = check_equipment_expiry()
+        self.assertIn("створено 0", result)
+        self.assertEqual(len(queries), 2)
+
+        # Зміна тексту не створює дублікатів — дедуплікація за ключем
+        notifications.update(title="Інший текст")
+        self.assertIn("створено 0", check_equipment_expiry())
+
+    def test_migration_keys_existing_title_deduplicated_alerts(self):
+        migration = importlib.import_module(
+            "inventory.migrations.0028_notification_dedup_key"
+        )
+        suffixes = {30: "закінчується через 30 днів", 7: "закінчується через тиждень"}
+        suffixes.update({1: "закінчується завтра", 0: "закінчилося сьогодні"})
+        today = timezone.now().date()
+        # Сповіщення, створені до появи ключа (get_or_create за title)
+        for equipment in Equipment.objects.all():
+            days = (equipment.expiry_date - today).days
+            if days not in suffixes:
+                continue
+            for user in (self.owner, self.responsible):
+                for _ in range(2 if days == 0 else 1):
+                    Notification.objects.create(
+                        user=user,
+                        equipment=equipment,
+                        title=f"Термін служби обладнання {suffixes[days]}",
+                        message="…",
+                        read=days == 7,
+                    )
+
+        migration.backfill_dedup_keys(apps, None)
+
+        keyed = Notification.objects.filter(dedup_key__isnull=False)
+        self.assertEqual(keyed.count(), 10)
+        self.assertEqual(Notification.objects.filter(dedup_key__isnull=True).count(), 2)
+        self.assertIn("створено 0", check_equipment_expiry())
+
+    def test_concurrent_insert_is_not_pushed_again(self):
+        first, second = NotificationFanout(), NotificationFanout()
+        for fanout in (first, second):
+            fanout.add(self.owner.pk, None, "report", "2026-10-17", "Звіт", "Звіт")
+        self.assertEqual(len(first.create(push=False)), 1)
+        # Той самий ключ, вставлений іншим запуском у тому ж вікні часу
+        Notification.objects.filter(title="Звіт").update(
+            created_at=timezone.now() + timedelta(minutes=1)
+        )
+        with patch("inventory.fanout.push_notifications") as push:
+            self.assertEqual(second.create(), [])
+        push.assert_not_called()
+        self.assertEqual(Notification.objects.filter(title="Звіт").count(), 1)
+
+    def test_dedup_key_is_unique_per_user(self):
+        equipment = Equipment.objects.first()
+        Notification.objects.create(
+            user=self.owner, equipment=equipment, title="A", message="A", dedup_key="k"
+        )
+        Notification.objects.create(
+            user=self.responsible,
+            equipment=equipment,
+            title="A",
+            message="A",
+            dedup_key="k",
+        )
+        Notification.objects.create(user=self.owner, title="B", message="B")
+        Notification.objects.create(user=self.owner, title="B", message="B")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Notification.objects.create(
+                user=self.owner, title="C", message="C", dedup_key="k"
+            )
+
+    def test_stale_health_alerts_are_pushed_and_mailed_in_batches(self):
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+        from django.core import mail
+
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f"user_{self.owner.pk}", channel)
+
+        Equipment.objects.update(updated_at=timezone.now() - timedelta(days=5))
+        monitor_equipment_health()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("(6)", mail.outbox[0].subject)
+        event = async_to_sync(layer.receive)(channel)
+        self.assertEqual(event["type"], "notification.message")
+        self.assertEqual(event["payload"]["count"], 6)
+        self.assertEqual(event["payload"]["title"], "Нові сповіщення (6)")
+        self.assertTrue(event["payload"]["message"].endswith("та ще 3"))
+
+        # Повторний запуск у межах доби нічого не створює
+        self.assertEqual(monitor_equipment_health(), "Створено 0 алертів")
+
+    def test_single_push_carries_fields_at_top_level(self):
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f"user_{self.owner.pk}", channel)
+
+        fanout = NotificationFanout()
+        fanout.add(
+            self.owner.pk, None, "warranty", "", "Гарантія", "Закінчується гарантія"
+        )
+        fanout.create()
+
+        payload = async_to_sync(layer.receive)(channel)["payload"]
+        self.assertEqual(payload["title"], "Гарантія")
+        self.assertEqual(payload["message"], "Закінчується гарантія")
+        self.assertEqual(payload["count"], 1)
+
+
+class _WebhookReceiver(BaseHTTPRequestHandler):
+    """Тестовий ендпоінт: запам'ятовує запити, відповідає кодом із шляху"""
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+            server.requests.append((self.path, dict(self.headers), body))
+        code = int(self.path.strip("/").split("/")[0] or 200)
+        self.send_response(code)
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(WEBHOOK_RETRY_BASE=30, WEBHOOK_MAX_ATTEMPTS=3)
+class WebhookDeliveryTests(TestCase):
+    """Тести черги доставки webhooks"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _WebhookReceiver)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.active = self.server.peak = 0
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        # Таблиця маршрутів процесу не повинна пережити відкат тесту
+        self.addCleanup(cache.delete, ROUTES_GENERATION_KEY)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def url(self, code=200):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/{code}/"
+
+    def make_webhook(self, code=200, **kwargs):
+        kwargs.setdefault("events", ["equipment.status_changed"])
+        with self.captureOnCommitCallbacks(execute=True):
+            return WebhookConfig.objects.create(
+                name=f"hook-{code}", url=self.url(code), **kwargs
+            )
+
+    def test_send_webhook_enqueues_for_subscribers(self):
+        webhook = self.make_webhook()
+        self.make_webhook(events=["maintenance.created"])
+        self.make_webhook(active=False)
+
+        with patch("inventory.tasks.deliver_webhooks.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                WebhookService.send_webhook("equipment.status_changed", {"id": 1})
+
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.webhook, webhook)
+        self.assertEqual(delivery.status, "PENDING")
+        delay.assert_called_once()
+        # Нічого не відправлено синхронно
+        self.assertEqual(self.server.requests, [])
+
+    def test_routing_table_with_wildcards(self):
+        exact = self.make_webhook()
+        family = self.make_webhook(events=["equipment.*"])
+        for index in range(5):
+            self.make_webhook(events=[f"other.event_{index}"])
+
+        # Таблиця вже побудована: без підписників — жодного запиту
+        WebhookService.send_webhook("warmup", {})
+        with self.assertNumQueries(0):
+            WebhookService.send_webhook("maintenance.created", {})
+
+        everything = self.make_webhook(events=["*", "equipment.status_changed"])
+        WebhookService.send_webhook("warmup", {})
+        WebhookDelivery.objects.all().delete()
+        # З підписниками — перевірка id та одна вставка
+        with self.assertNumQueries(2):
+            WebhookService.send_webhook("equipment.status_changed", {"id": 1})
+        self.assertEqual(
+            set(WebhookDelivery.objects.values_list("webhook_id", flat=True)),
+            {exact.pk, family.pk, everything.pk},
+        )
+
+        # Зміна конфігурації перебудовує таблицю після фіксації
+        with self.captureOnCommitCallbacks(execute=True):
+            family.events = ["maintenance.*"]
+            family.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            everything.delete()
+        self.assertEqual(
+            len(WebhookService.send_webhook("maintenance.completed", {})), 1
+        )
+        self.assertEqual(len(WebhookService.send_webhook("equipment.created", {})), 0)
+
+    def test_events_validation(self):
+        serializer = WebhookConfigSerializer(
+            data={"name": "x", "url": self.url(), "events": ["equip*"]}
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("events", serializer.errors)
+        serializer = WebhookConfigSerializer(
+            data={"name": "x", "url": self.url(), "events": ["equipment.*", "*"]}
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_drain_batches_and_signs(self):
+        webhook = self.make_webhook(batch_size=3, secret="s3cret")
+        for index in range(5):
+            WebhookService.send_webhook("equipment.status_changed", {"id": index})
+
+        self.assertEqual(deliver_webhooks(), {"delivered": 5, "retried": 0, "dead": 0})
+
+        self.assertEqual(len(self.server.requests), 2)
+        sizes = sorted(len(json.loads(body)) for _, _, body in self.server.requests)
+        self.assertEqual(sizes, [2, 3])
+        for _, headers, raw in self.server.requests:
+            expected = hmac.new(b"s3cret", raw, hashlib.sha256).hexdigest()
+            self.assertEqual(headers["X-Webhook-Signature"], f"sha256={expected}")
+            self.assertEqual(headers["X-Webhook-Event"], "batch")
+        self.assertEqual(WebhookDelivery.objects.filter(status="DELIVERED").count(), 5)
+        self.assertEqual(webhook.logs.filter(success=True).count(), 5)
+
+    def test_failures_back_off_then_dead_letter(self):
+        flaky = self.make_webhook(code=503)
+        rejected = self.make_webhook(code=400)
+        WebhookService.send_webhook("equipment.status_changed", {"id": 1})
+
+        before = timezone.now()
+        self.assertEqual(deliver_webhooks(), {"delivered": 0, "retried": 1, "dead": 1})
+        retry = WebhookDelivery.objects.get(webhook=flaky)
+        self.assertEqual((retry.status, retry.attempts), ("PENDING", 1))
+        self.assertGreaterEqual(retry.next_attempt_at, before + timedelta(seconds=30))
+        self.assertTrue(retry.last_error.startswith("HTTP 503"))
+        # 400 не повторюється
+        self.assertEqual(WebhookDelivery.objects.get(webhook=rejected).status, "DEAD")
+
+        # Ще не час — нічого не відправляється
+        self.assertEqual(deliver_webhooks()["retried"], 0)
+
+        WebhookDelivery.objects.filter(pk=retry.pk).update(attempts=2)
+        WebhookDelivery.objects.filter(pk=retry.pk).update(
+            next_attempt_at=timezone.now()
+        )
+        self.assertEqual(deliver_webhooks()["dead"], 1)
+        self.assertEqual(WebhookDelivery.objects.get(pk=retry.pk).status, "DEAD")
+
+        admin = User.objects.create_user(username="hooks", password="pass12345")
+        client = APIClient()
+        client.force_authenticate(admin)
+        with patch("inventory.tasks.deliver_webhooks.delay"):
+            response = client.post(f"/api/webhooks/{flaky.pk}/redeliver/")
+        self.assertEqual(response.data, {"requeued": 1})
+        self.assertEqual(WebhookDelivery.objects.get(pk=retry.pk).status, "PENDING")
+
+    def test_per_endpoint_concurrency_limit(self):
+        self.server.delay = 0.2
+        self.make_webhook(max_concurrency=2)
+        for index in range(6):
+            WebhookService.send_webhook("equipment.status_changed", {"id": index})
+
+        started = time.monotonic()
+        self.assertEqual(deliver_webhooks()["delivered"], 6)
+        self.assertEqual(self.server.peak, 2)
+        # Три хвилі по два запити, а не шість послідовних
+        self.assertLess(time.monotonic() - started, 6 * 0.2)
+
+    @override_settings(WEBHOOK_TIMEOUT=1)
+    def test_lease_outlasting_batch_is_not_recorded_twice(self):
+        self.make_webhook(max_concurrency=2)
+        for index in range(10):
+            WebhookService.send_webhook("equipment.status_changed", {"id": index})
+
+        first = WebhookDispatcher()
+        claimed = first.claim()
+        self.assertEqual(len(claimed), 10)
+        # 10 запитів по 2 одночасно — п'ять хвиль, а не WEBHOOK_TIMEOUT * 3
+        self.assertGreaterEqual(
+            claimed[0].locked_until, timezone.now() + timedelta(seconds=5)
+        )
+        self.assertEqual(WebhookDispatcher().claim(), [])
+
+        # Розсилка затягнулася довше за оренду: рядки забирає інший воркер
+        WebhookDelivery.objects.update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        second = WebhookDispatcher()
+        reclaimed = second.claim()
+        self.assertEqual(len(reclaimed), 10)
+
+        # Запізнілий результат першого воркера нічого не перезаписує
+        jobs = first.jobs(claimed)
+        stale = first.record(jobs, [(503, "", "", 5)] * len(jobs))
+        self.assertEqual(stale, {"delivered": 0, "retried": 0, "dead": 0})
+        self.assertEqual(
+            WebhookDelivery.objects.filter(status="SENDING", attempts=0).count(), 10
+        )
+
+        jobs = second.jobs(reclaimed)
+        results = asyncio.run(second.post_all(jobs))
+        self.assertEqual(second.record(jobs, results)["delivered"], 10)
+        self.assertEqual(
+            WebhookDelivery.objects.filter(status="DELIVERED", attempts=1).count(), 10
+        )
+        self.assertEqual(len(self.server.requests), 10)
+
+    def test_logs_page_with_cursor_and_stats(self):
+        webhook = self.make_webhook(code=200)
+        WebhookLog.objects.bulk_create(
+            WebhookLog(
+                webhook=webhook,
+                event=f"event.{index}",
+                success=index % 4 != 0,
+                duration_ms=index * 10,
+            )
+            for index in range(1, 9)
+        )
+        user = User.objects.create_user(username="hook-logs", password="pass12345")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        url = f"/api/webhooks/{webhook.pk}/logs/"
+        response = client.get(url, {"page_size": 5, "cursor": ""})
+        self.assertEqual(len(response.data["results"]), 5)
+        seen = [row["id"] for row in response.data["results"]]
+        response = client.get(
+            url, {"page_size": 5, "cursor": response.data["next_cursor"]}
+        )
+        seen += [row["id"] for row in response.data["results"]]
+        self.assertIsNone(response.data["next_cursor"])
+        self.assertEqual(
+            seen,
+            list(webhook.logs.order_by("-sent_at", "-pk").values_list("pk", flat=True)),
+        )
+
+        stats = response.data["stats"]
+        self.assertEqual((stats["total"], stats["succeeded"]), (8, 6))
+        self.assertEqual(stats["success_rate"], 75.0)
+        self.assertEqual(
+            (stats["avg_ms"], stats["max_ms"], stats["p95_ms"]), (45, 80, 70)
+        )
+
+    def test_delivery_records_latency_and_prune_in_chunks(self):
+        webhook = self.make_webhook()
+        WebhookService.send_webhook("equipment.status_changed", {"id": 1})
+        deliver_webhooks()
+        log = webhook.logs.get()
+        self.assertIsNotNone(log.duration_ms)
+
+        old = timezone.now() - timedelta(days=31)
+        WebhookLog.objects.bulk_create(
+            WebhookLog(webhook=webhook, event="old") for _ in range(5)
+        )
+        WebhookLog.objects.filter(event="old").update(sent_at=old)
+        WebhookDelivery.objects.update(delivered_at=old)
+
+        with self.settings(WEBHOOK_CLEANUP_CHUNK=2):
+            self.assertEqual(cleanup_webhook_logs(), {"logs": 5, "deliveries": 1})
+        self.assertEqual(list(WebhookLog.objects.all()), [log])
+        self.assertEqual(WebhookLogService.prune(), {"logs": 0, "deliveries": 0})
+
+
+class AutomationEngineTests(TestCase):
+    """Тести set-based виконання правил автоматизації"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username="auto", password="pass12345", email="auto@example.com"
+        )
+        self.admin = User.objects.create_user(
+            username="auto-admin", password="pass12345", is_staff=True
+        )
+        self.rule = AutomationRule.objects.create(
+            name="Старе обладнання",
+            trigger_type="EQUIPMENT_AGE",
+            conditions={"value": 5},
+            actions=[
+                {"type": "SEND_NOTIFICATION"},
+                {"type": "SEND_EMAIL"},
+                {"type": "CREATE_MAINTENANCE"},
+                {"type": "SEND_WEBHOOK"},
+                {"type": "CHANGE_STATUS", "params": {"status": "STORAGE"}},
+            ],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            WebhookConfig.objects.create(
+                name="auto",
+                url="http://127.0.0.1:9/",
+                events=["automation.*", "equipment.status_changed"],
+            )
+        self.addCleanup(cache.delete, ROUTES_GENERATION_KEY)
+
+    def add_equipment(self, count, start=0):
+        purchase = timezone.now().date() - timedelta(days=365 * 6)
+        for index in range(start, start + count):
+            Equipment.objects.create(
+                name=f"Авто {index}",
+                serial_number=f"SN-AUTO-{index}",
+                purchase_date=purchase,
+                current_user=self.owner if index % 2 == 0 else None,
+            )
+
+    def run_rule(self):
+        with patch("inventory.tasks.deliver_webhooks.delay"):
+            with CaptureQueriesContext(connection) as queries:
+                affected = AutomationEngine.evaluate_rule(self.rule)
+        return affected, len(queries)
+
+    def test_actions_run_per_set(self):
+        self.add_equipment(6)
+        affected, _ = self.run_rule()
+        self.assertEqual(affected, 6 * 5)
+
+        self.assertEqual(Equipment.objects.filter(status="STORAGE").count(), 6)
+        self.assertEqual(EquipmentCounterService.get("status", "STORAGE"), 6)
+        self.assertEqual(EquipmentCounterService.reconcile()["repaired"], 0)
+        self.assertEqual(
+            Equipment.history.filter(status="STORAGE", history_type="~").count(), 6
+        )
+        self.assertEqual(Notification.objects.filter(user=self.owner).count(), 3)
+
+        from .maintenance import MaintenanceRequest
+
+        requests = MaintenanceRequest.objects.all()
+        self.assertEqual(requests.count(), 6)
+        self.assertEqual({r.requester_id for r in requests}, {self.admin.pk})
+
+        # Один лист на отримувача з усім його обладнанням
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].body.count("SN-AUTO-"), 3)
+
+        # Одна подія на запуск правила замість подій на кожну одиницю
+        events = dict(WebhookDelivery.objects.values_list("event", "payload"))
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events["automation.triggered"]["count"], 6)
+        self.assertEqual(events["equipment.status_changed"]["count"], 6)
+        self.assertEqual(
+            events["equipment.status_changed"]["items"][0]["old_status"], "WORKING"
+        )
+
+        # Змінене обладнання більше не відповідає правилу
+        self.assertEqual(self.run_rule()[0], 0)
+
+    def test_query_count_does_not_grow_with_matches(self):
+        # Таблиця маршрутів webhooks будується один раз, поза вимірюванням
+        WebhookService.send_webhook("warmup", {})
+        self.add_equipment(3)
+        _, small = self.run_rule()
+        Equipment.objects.update(status="WORKING")
+        self.add_equipment(12, start=3)
+        _, large = self.run_rule()
+        self.assertEqual(small, large)
+
+    def test_incremental_runs_use_watermark_and_ledger(self):
+        self.rule.actions = [{"type": "SEND_NOTIFICATION"}]
+        self.rule.save()
+        self.add_equipment(4)
+        self.assertEqual(self.run_rule()[0], 4)
+        self.assertEqual(self.rule.firings.count(), 4)
+        self.rule.save(update_fields=["watermark", "watermark_key"])
+
+        # Повторний запуск не спрацьовує вдруге на тих самих одиницях
+        self.assertEqual(self.run_rule()[0], 0)
+
+        # Нова межа віку: одиниця, що перетнула її з дня watermark (без save)
+        crossing = Equipment.objects.create(name="Межа", serial_number="SN-EDGE")
+        Equipment.objects.filter(pk=crossing.pk).update(
+            purchase_date=timezone.now().date() - timedelta(days=365 * 5),
+            updated_at=timezone.now() - timedelta(days=2),
+        )
+        AutomationRule.objects.filter(pk=self.rule.pk).update(
+            watermark=timezone.now() - timedelta(days=1)
+        )
+        self.rule.refresh_from_db()
+        self.assertEqual(self.run_rule()[0], 1)
+
+        # Одиниця, що перестала відповідати, звільняється з журналу
+        first = Equipment.objects.get(serial_number="SN-AUTO-0")
+        first.status = "REPAIR"
+        first.save()
+        self.run_rule()
+        self.assertFalse(
+            AutomationFiring.objects.filter(rule=self.rule, equipment=first).exists()
+        )
+        first.status = "WORKING"
+        first.save()
+        self.assertEqual(self.run_rule()[0], 1)
+
+        # Зміна дій скидає журнал: повний перерахунок
+        self.rule.actions = [{"type": "SEND_WEBHOOK"}]
+        self.assertEqual(self.run_rule()[0], 5)
+
+    def test_failed_chunk_still_sends_for_committed_chunks(self):
+        self.add_equipment(4)
+        original = RuleRun.create_maintenance
+        calls = []
+
+        def fail_second_chunk(run, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError("boom")
+            return original(run, rows)
+
+        with patch("inventory.automation.CHUNK_SIZE", 2), patch.object(
+            RuleRun, "create_maintenance", fail_second_chunk
+        ):
+            with self.assertRaises(RuntimeError):
+                self.run_rule()
+
+        # Перша пачка зафіксована, друга відкотилась разом із зібраним для неї
+        self.assertEqual(self.rule.firings.count(), 2)
+        self.assertIsNone(self.rule.watermark)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("SN-AUTO-0", mail.outbox[0].body)
+        self.assertNotIn("SN-AUTO-2", mail.outbox[0].body)
+        events = dict(WebhookDelivery.objects.values_list("event", "payload"))
+        self.assertEqual(events["automation.triggered"]["count"], 2)
+        self.assertEqual(events["equipment.status_changed"]["count"], 2)
+
+    def test_overlapping_runs_act_once_per_firing(self):
+        self.rule.actions = [{"type": "SEND_NOTIFICATION"}]
+        self.add_equipment(4)
+        rows = list(
+            AutomationEngine.candidates(self.rule, False)
+            .order_by("pk")
+            .values(*MATCH_FIELDS)
+        )
+        # Паралельний запуск уже записав спрацювання для перших двох одиниць
+        AutomationFiring.objects.bulk_create(
+            AutomationFiring(rule=self.rule, equipment_id=row["id"]) for row in rows[:2]
+        )
+
+        run = RuleRun(self.rule)
+        run.execute(rows)
+        self.assertEqual(run.matched, 2)
+        self.assertEqual(
+            set(Notification.objects.values_list("equipment_id", flat=True)),
+            {rows[2]["id"]},
+        )
+        self.assertEqual(self.rule.firings.count(), 4)
+
+    def test_incremental_window_uses_one_calendar_across_midnight(self):
+        from datetime import date, datetime
+        from datetime import timezone as dt_timezone
+
+        self.rule.actions = [{"type": "SEND_NOTIFICATION"}]
+        day = date(2026, 3, 10)
+        # 23:00 UTC — у Києві вже наступна доба
+        first = datetime(2026, 3, 10, 23, 0, tzinfo=dt_timezone.utc)
+        second = datetime(2026, 3, 11, 0, 30, tzinfo=dt_timezone.utc)
+        crossing = Equipment.objects.create(
+            name="Північ",
+            serial_number="SN-MIDNIGHT",
+            purchase_date=day + timedelta(days=1) - timedelta(days=365 * 5),
+        )
+        Equipment.objects.filter(pk=crossing.pk).update(
+            updated_at=first - timedelta(days=10)
+        )
+
+        with patch("django.utils.timezone.now", return_value=first):
+            self.assertEqual(self.run_rule()[0], 0)
+        self.assertEqual(self.rule.watermark, first)
+
+        # Межа віку перетнута опівночі UTC: інкрементний запуск її бачить
+        with patch("django.utils.timezone.now", return_value=second):
+            self.assertTrue(AutomationEngine.is_incremental(self.rule))
+            self.assertEqual(self.run_rule()[0], 1)
+        self.assertTrue(self.rule.firings.filter(equipment=crossing).exists())
+
+    def test_bulk_status_round_trip_releases_and_refires(self):
+        self.rule.actions = [{"type": "SEND_NOTIFICATION"}]
+        self.add_equipment(2)
+        self.assertEqual(self.run_rule()[0], 2)
+
+        Equipment.objects.all().update_tracked(status="REPAIR")
+        self.assertTrue(AutomationEngine.is_incremental(self.rule))
+        self.assertEqual(self.run_rule()[0], 0)
+        self.assertEqual(self.rule.firings.count(), 0)
+
+        # Масово повернуте в роботу обладнання знову бачить інкрементний запуск
+        Equipment.objects.all().update_tracked(status="WORKING")
+        self.assertEqual(self.run_rule()[0], 2)
+
+    def test_dry_run_reports_without_side_effects(self):
+        self.add_equipment(5)
+        report = AutomationEngine.dry_run(self.rule)
+        self.assertEqual(report["mode"], "full")
+        self.assertEqual(report["matched"], 5)
+        estimate = report["estimate"]
+        self.assertEqual(estimate["status_changes"], 5)
+        self.assertEqual(estimate["notifications"], 3)
+        self.assertEqual(estimate["maintenance_requests"], 5)
+        self.assertEqual(estimate["emails"], 1)
+        self.assertEqual(estimate["webhook_events"], 2)
+        self.assertEqual(estimate["chunks"], 1)
+        self.assertIsNotNone(estimate["planner_cost"])
+
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.post(
+            f"/api/automation-rules/{self.rule.pk}/run/",
+            {"dry_run": True},
+            format="json",
+        )
+        self.assertEqual(response.data["matched"], 5)
+        self.assertEqual(Equipment.objects.filter(status="WORKING").count(), 5)
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(AutomationFiring.objects.exists())
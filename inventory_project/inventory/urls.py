@@ -181,6 +181,11 @@ urlpatterns = [
         name="advanced_analytics",
     ),
     path("api/analytics/report/", analytics.generate_report, name="generate_report"),
+    path(
+        "api/analytics/cache-stats/",
+        analytics.analytics_cache_stats,
+        name="analytics_cache_stats",
+    ),
     # Мобільне API
     path(
         "api/mobile/equipment/",
@@ -314,8 +319,25 @@ urlpatterns = [
         views.delete_equipment_document,
         name="delete-equipment-document",
     ),
+    # ============ КОДИ (рендеринг на запит) ============
+    path(
+        "api/codes/<str:model>/<int:pk>/<str:kind>.<str:fmt>",
+        views.code_image,
+        name="code-image",
+    ),
+    path("api/labels/", views.label_sheet, name="label-sheet"),
+    path(
+        "api/labels/<str:task_id>/",
+        views.label_sheet_status,
+        name="label-sheet-status",
+    ),
     # ============ AGENT ============
     path("api/agent/report/", views.agent_report, name="agent-report"),
+    path(
+        "api/agent/report/delta/",
+        views.agent_report_delta,
+        name="agent-report-delta",
+    ),
     # ============ BACKUP & GOOGLE DRIVE ============
     path("api/backups/", BackupListView.as_view(), name="backup-list"),
     path("api/backups/create/", BackupCreateView.as_view(), name="backup-create"),
@@ -366,6 +388,16 @@ urlpatterns = [
     # ============ ADVANCED FEATURES ============
     path("api/activity-log/", ActivityLogView.as_view(), name="activity-log"),
     path("api/search/", GlobalSearchView.as_view(), name="global-search"),
+    path(
+        "api/search/advanced/",
+        views.AdvancedSearchView.as_view(),
+        name="advanced-search",
+    ),
+    path(
+        "api/search/suggestions/",
+        views.SearchSuggestionsView.as_view(),
+        name="search-suggestions",
+    ),
     path(
         "api/reports/depreciation/",
         DepreciationReportView.as_view(),
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from django.conf import settings
 
 import xlsxwriter
+from celery.result import AsyncResult
 from django_filters.rest_framework import DjangoFilterBackend
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
@@ -14,8 +15,10 @@ from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import connection, models
-from django.http import HttpResponse, JsonResponse
+from django.db.models.functions import Cast
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
@@ -35,8 +38,41 @@ from rest_framework.serializers import CharField, Serializer
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from .dashboard import DashboardService, ReportService
+from .agent_sync import (
+    AGENT_HASHES_HEADER,
+    AGENT_PROTOCOL_VERSION,
+    AGENT_SERIAL_HEADER,
+    AgentIngestService,
+    GzipJSONParser,
+    parse_hashes_header,
+)
+from .analytics_cache import cached_analytics
+from .codes import (
+    CODE_FORMATS,
+    CODE_KINDS,
+    DEFAULT_CODE_SIZE,
+    MAX_CODE_SIZE,
+    MIN_CODE_SIZE,
+    CodeImageService,
+    CodeRenderError,
+    code_etag,
+)
+from .counters import EquipmentCounter
+from .dashboard import DashboardService, EquipmentAggregates, ReportService
+from .filter_compiler import (
+    FilterValidationError,
+    compile_filters,
+    compile_sort,
+    spec_cache_key,
+)
 from .filters import EquipmentFilter
+from .labels import (
+    DEFAULT_LABEL_LAYOUT,
+    LABEL_FILTER_FIELDS,
+    LABEL_LAYOUTS,
+    LABEL_MODELS,
+    LabelSheetService,
+)
 from .maintenance import (
     MaintenanceRequest,
     MaintenanceSchedule,
@@ -51,7 +87,10 @@ from .models import (
     Software,
 )
 from .offline import OfflineDataManager, OfflineSearchHelper
+from .pagination import KeysetPagination, keyset_paginate
 from .personalization import PersonalizationService
+from .search import IndexedSearchFilter, SearchService
+from .suggestions import SuggestionService
 from .serializers import (
     EquipmentSerializer,
     LicenseSerializer,
@@ -70,6 +109,7 @@ from .spare_parts import (
     StorageLocation,
     Supplier,
 )
+from .tasks import generate_label_sheet
 from .two_factor import TwoFactorAuthService
 
 User = get_user_model()
@@ -124,8 +164,9 @@ class EquipmentViewSet(ModelViewSet):
         .all()
     )
     serializer_class = EquipmentSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
     filterset_class = EquipmentFilter
+    search_kind = "equipment"
     search_fields = [
         "name",
         "serial_number",
@@ -236,7 +277,9 @@ class EquipmentViewSet(ModelViewSet):
                 {"error": "ids та status обовʼязкові"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        updated = Equipment.objects.filter(id__in=ids).update(status=new_status)
+        updated = Equipment.objects.filter(id__in=ids).update_tracked(
+            status=new_status
+        )
         return Response({"updated": updated})
 
     @action(detail=False, methods=["post"], url_path="bulk-delete")
@@ -324,8 +367,9 @@ class SoftwareViewSet(ModelViewSet):
     )
     serializer_class = SoftwareSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
     filterset_fields = ["installed_on"]
+    search_kind = "software"
     search_fields = ["name", "vendor"]
     ordering_fields = ["name", "version", "vendor"]
     ordering = ["name"]
@@ -351,128 +395,227 @@ class PeripheralDeviceViewSet(ModelViewSet):
         return Response(serializer.data)
 
 
-# ============ AGENT REPORT ENDPOINT ============
+# ============ CODE IMAGES ============
 
+CODE_IMAGE_MODELS = {
+    "equipment": Equipment,
+    "peripherals": PeripheralDevice,
+}
 
-@api_view(["POST"])
+
+@api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def agent_report(request):
+def code_image(request, model, pk, kind, fmt):
     """
-    Приймає звіт від агента інвентаризації.
-    Upsert обладнання за serial_number, синхронізує ПЗ та периферію.
+    Рендеринг штрих-коду/QR-коду на запит: /api/codes/<model>/<pk>/<kind>.<fmt>?size=N.
+    ETag залежить лише від закодованих даних, тому повторний запит отримує 304.
     """
-    data = request.data
+    model_class = CODE_IMAGE_MODELS.get(model)
+    if model_class is None or kind not in CODE_KINDS or fmt not in CODE_FORMATS:
+        return Response(
+            {"error": "Невідомий тип коду"}, status=status.HTTP_404_NOT_FOUND
+        )
 
-    serial_number = data.get("serial_number")
-    if not serial_number:
+    try:
+        size = int(request.query_params.get("size", DEFAULT_CODE_SIZE))
+    except ValueError:
         return Response(
-            {"error": "serial_number is required"}, status=status.HTTP_400_BAD_REQUEST
+            {"error": "size має бути цілим числом"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
+    size = min(max(size, MIN_CODE_SIZE), MAX_CODE_SIZE)
 
-    # --- Upsert Equipment ---
-    equipment_fields = {}
-    field_map = {
-        "name": "name",
-        "category": "category",
-        "model": "model",
-        "manufacturer": "manufacturer",
-        "inventory_number": "inventory_number",
-        "asset_tag": "asset_tag",
-        "location": "location",
-        "building": "building",
-        "floor": "floor",
-        "room": "room",
-        "status": "status",
-        "priority": "priority",
-        "ip_address": "ip_address",
-        "mac_address": "mac_address",
-        "hostname": "hostname",
-        "cpu": "cpu",
-        "ram": "ram",
-        "storage": "storage",
-        "gpu": "gpu",
-        "motherboard": "motherboard",
-        "motherboard_serial": "motherboard_serial",
-        "disk_model": "disk_model",
-        "display": "display",
-        "network_adapter": "network_adapter",
-        "power_supply": "power_supply",
-        "bios_version": "bios_version",
-        "operating_system": "operating_system",
-        "description": "description",
-        "notes": "notes",
-        "supplier": "supplier",
-    }
-    for src, dst in field_map.items():
-        val = data.get(src)
-        if val is not None and val != "":
-            equipment_fields[dst] = val
-
-    # Значення за замовчуванням
-    equipment_fields.setdefault("name", serial_number)
-    equipment_fields.setdefault("category", "PC")
-    equipment_fields.setdefault("status", "WORKING")
-
-    equipment, created = Equipment.objects.update_or_create(
-        serial_number=serial_number,
-        defaults=equipment_fields,
-    )
+    obj = model_class.objects.filter(pk=pk).first()
+    if obj is None or not obj.get_code_value():
+        return Response(
+            {"error": "Об'єкт не знайдено"}, status=status.HTTP_404_NOT_FOUND
+        )
 
-    # --- Синхронізація Software ---
-    software_synced = 0
-    installed_software = data.get("installed_software", [])
-    for sw in installed_software:
-        sw_name = sw.get("name", "").strip()
-        if not sw_name:
-            continue
-        sw_obj, _ = Software.objects.get_or_create(
-            name=sw_name,
-            version=sw.get("version", "") or "",
-            defaults={"vendor": sw.get("vendor", "") or ""},
-        )
-        sw_obj.installed_on.add(equipment)
-        software_synced += 1
-
-    # --- Синхронізація Peripherals ---
-    peripherals_synced = 0
-    peripherals = data.get("peripherals", [])
-    for peri in peripherals:
-        peri_serial = peri.get("serial_number", "").strip()
-        peri_name = peri.get("name", "").strip()
-        if not peri_name:
-            continue
-        if peri_serial:
-            peri_obj, _ = PeripheralDevice.objects.update_or_create(
-                serial_number=peri_serial,
-                defaults={
-                    "name": peri_name,
-                    "type": peri.get("type", "OTHER") or "OTHER",
-                    "connected_to": equipment,
-                },
+    payload = CodeImageService.get_payload(obj, kind)
+    etag = f'"{code_etag(kind, payload, fmt, size)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            content = CodeImageService.render(
+                kind, payload, fmt, size, etag.strip('"')
             )
-        else:
-            peri_obj, _ = PeripheralDevice.objects.get_or_create(
-                name=peri_name,
-                connected_to=equipment,
-                defaults={
-                    "type": peri.get("type", "OTHER") or "OTHER",
-                    "serial_number": f"AUTO-{equipment.id}-{peri_name[:20]}",
-                },
+        except CodeRenderError as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY
             )
-        peripherals_synced += 1
+        response = HttpResponse(content, content_type=CODE_FORMATS[fmt])
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def label_sheet(request):
+    """
+    Запустити формування PDF з етикетками у фоні.
+    Тіло: {"model", "ids", "filters", "layout", "kind"}; прогрес — label_sheet_status.
+    """
+    model_key = request.data.get("model", "equipment")
+    layout = request.data.get("layout", DEFAULT_LABEL_LAYOUT)
+    kind = request.data.get("kind", "qrcode")
+    ids = request.data.get("ids") or None
+    filters = request.data.get("filters") or {}
+
+    if (
+        model_key not in LABEL_MODELS
+        or layout not in LABEL_LAYOUTS
+        or kind not in CODE_KINDS
+    ):
+        return Response(
+            {
+                "error": "Невірні параметри",
+                "models": list(LABEL_MODELS),
+                "layouts": list(LABEL_LAYOUTS),
+                "kinds": list(CODE_KINDS),
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if not ids and not filters:
+        return Response(
+            {"error": "Вкажіть ids або filters"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        LabelSheetService.validate_filters(model_key, filters)
+    except ValueError as e:
+        return Response(
+            {"error": str(e), "filters": list(LABEL_FILTER_FIELDS[model_key])},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    task = generate_label_sheet.delay(
+        model_key, ids=ids, filters=filters, layout=layout, kind=kind
+    )
+    return Response({"task_id": task.id}, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def label_sheet_status(request, task_id):
+    """Стан завдання формування етикеток: прогрес або посилання на готовий PDF"""
+    result = AsyncResult(task_id)
+    data = {"task_id": task_id, "state": result.state}
+    if result.state == "PROGRESS":
+        data.update(result.info or {})
+    elif result.successful():
+        data.update(result.result)
+    elif result.failed():
+        data["error"] = str(result.result)
+    return Response(data)
+
+
+# ============ AGENT REPORT ENDPOINT ============
+
+
+def _agent_not_modified(request):
+    """Відповідь "not_modified" за хешами з заголовків, до розбору тіла запиту"""
+    state = AgentIngestService.check_not_modified(
+        request.META.get(AGENT_SERIAL_HEADER, ""),
+        parse_hashes_header(request.META.get(AGENT_HASHES_HEADER, "")),
+    )
+    if state is None:
+        return None
+    return Response(
+        {
+            "status": "not_modified",
+            "equipment_id": state.equipment_id,
+            "created": False,
+            "revision": state.revision,
+        }
+    )
+
+
+def _agent_ingest_response(report):
+    result = AgentIngestService.ingest(report)
+    created = result["created"]
 
     return Response(
         {
             "status": "ok",
-            "equipment_id": equipment.id,
+            "equipment_id": result["equipment_id"],
             "created": created,
-            "software_synced": software_synced,
-            "peripherals_synced": peripherals_synced,
+            "software_synced": result["software_synced"],
+            "software_added": result["software_added"],
+            "software_removed": result["software_removed"],
+            "peripherals_synced": result["peripherals_synced"],
+            "skipped_sections": result["skipped_sections"],
+            "hashes": result["hashes"],
+            "revision": result["revision"],
+            "queries": result["queries"],
         },
         status=status.HTTP_200_OK if not created else status.HTTP_201_CREATED,
     )
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@parser_classes([GzipJSONParser, FormParser, MultiPartParser])
+def agent_report(request):
+    """
+    Приймає звіт від агента інвентаризації (JSON, опційно gzip).
+    Upsert обладнання за serial_number, пакетно синхронізує ПЗ та периферію.
+    """
+    # Хеші секцій у заголовках дозволяють відповісти до розбору тіла запиту
+    not_modified = _agent_not_modified(request)
+    if not_modified is not None:
+        return not_modified
+
+    data = request.data
+
+    serial_number = data.get("serial_number")
+    if not serial_number:
+        return Response(
+            {"error": "serial_number is required"}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return _agent_ingest_response(data)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@parser_classes([GzipJSONParser])
+def agent_report_delta(request):
+    """
+    Приймає дельту звіту агента відносно останнього підтвердженого знімка.
+    Якщо base_revision не збігається з серверною — 409, агент надсилає повний звіт.
+    """
+    not_modified = _agent_not_modified(request)
+    if not_modified is not None:
+        return not_modified
+
+    delta = request.data
+
+    if not delta.get("serial_number"):
+        return Response(
+            {"error": "serial_number is required"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    if delta.get("protocol") != AGENT_PROTOCOL_VERSION:
+        return Response(
+            {
+                "error": "Unsupported protocol version",
+                "protocol": AGENT_PROTOCOL_VERSION,
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    report, current_revision = AgentIngestService.rebuild_from_delta(delta)
+    if report is None:
+        return Response(
+            {"error": "Snapshot revision mismatch", "revision": current_revision},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    return _agent_ingest_response(report)
+
+
 # Публічні налаштування (доступні без авторизації)
 @api_view(["GET"])
 @permission_classes([permissions.AllowAny])
@@ -622,13 +765,7 @@ def users_list(request):
     is_active = request.query_params.get("is_active", "")
 
     if search:
-        queryset = queryset.filter(
-            models.Q(username__icontains=search)
-            | models.Q(first_name__icontains=search)
-            | models.Q(last_name__icontains=search)
-            | models.Q(email__icontains=search)
-            | models.Q(phone__icontains=search)
-        )
+        queryset = queryset.filter(pk__in=SearchService.matching_ids("users", search))
     if department:
         queryset = queryset.filter(department=department)
     if position:
@@ -642,14 +779,12 @@ def users_list(request):
     if employment_type:
         queryset = queryset.filter(employment_type=employment_type)
 
-    # Пагінація
-    page = int(request.query_params.get("page", 1))
-    page_size = int(request.query_params.get("page_size", 25))
-    total = queryset.count()
-    start = (page - 1) * page_size
-    page_queryset = queryset.annotate(
-        equipment_count=models.Count("assigned_equipment")
-    )[start : start + page_size]
+    # Пагінація курсором за (поле сортування, id)
+    paginator = KeysetPagination(ordering=ordering)
+    page_queryset = paginator.paginate_queryset(
+        queryset.annotate(equipment_count=models.Count("assigned_equipment")),
+        request,
+    )
 
     results = []
     for u in page_queryset:
@@ -680,14 +815,7 @@ def users_list(request):
             }
         )
 
-    return Response(
-        {
-            "count": total,
-            "next": None if (start + page_size) >= total else f"?page={page + 1}",
-            "previous": None if page <= 1 else f"?page={page - 1}",
-            "results": results,
-        }
-    )
+    return paginator.get_paginated_response(results)
 
 
 def _serialize_user(u):
@@ -869,10 +997,15 @@ def users_stats(request):
     thirty_days_ago = timezone.now() - timedelta(days=30)
     new_this_month = User.objects.filter(date_joined__gte=thirty_days_ago).count()
 
+    # Лічильник ("user", id) замість JOIN з усією таблицею обладнання
+    has_equipment = EquipmentCounter.objects.filter(
+        dimension="user",
+        value=Cast(models.OuterRef("pk"), models.CharField()),
+        count__gt=0,
+    )
     without_equipment = (
         User.objects.filter(is_active=True)
-        .annotate(eq_count=models.Count("assigned_equipment"))
-        .filter(eq_count=0)
+        .exclude(models.Exists(has_equipment))
         .count()
     )
 
@@ -1102,11 +1235,19 @@ class DashboardView(APIView):
     def get(self, request):
         """Отримати всі дані дашборду"""
         try:
+            # Один агрегуючий запит на всі зрізи обладнання
+            aggregates = EquipmentAggregates.collect()
             dashboard_data = {
-                "equipment_overview": DashboardService.get_equipment_overview(),
+                "equipment_overview": DashboardService.get_equipment_overview(
+                    aggregates
+                ),
                 "financial_overview": DashboardService.get_financial_overview(),
-                "department_statistics": DashboardService.get_department_statistics(),
-                "location_statistics": DashboardService.get_location_statistics(),
+                "department_statistics": DashboardService.get_department_statistics(
+                    aggregates
+                ),
+                "location_statistics": DashboardService.get_location_statistics(
+                    aggregates
+                ),
                 "maintenance_alerts": DashboardService.get_maintenance_alerts(),
                 "notification_summary": DashboardService.get_notification_summary(),
                 "equipment_age_distribution": DashboardService.get_equipment_age_distribution(),
@@ -1125,7 +1266,9 @@ class AnalyticsView(APIView):
 
     permission_classes = [IsAuthenticated]
 
-    @method_decorator(cache_page(3600))
+    @method_decorator(
+        cached_analytics("analytics", tags=("equipment",), params={"months": 12})
+    )
     def get(self, request):
         """Отримати аналітичні дані з трендами"""
         months = int(request.query_params.get("months", 12))
@@ -2182,120 +2325,83 @@ class AdvancedSearchView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        """Виконати розширений пошук"""
-        query = request.data.get("query", "").strip()
-        filters = request.data.get("filters", {})
-        sort_by = request.data.get("sort_by", "name")
-        sort_order = request.data.get("sort_order", "asc")
-        page_size = request.data.get("page_size", 25)
-        page = request.data.get("page", 1)
-
-        # Базовий queryset
-        equipment_qs = Equipment.objects.all()
-
-        # Текстовий пошук
-        if query:
-            from django.db.models import Q
+        """
+        Виконати розширений пошук.
+        Фільтри перевіряються за білим списком, сторінки — за курсором (cursor),
+        загальна кількість рахується лише при include_total і кешується.
+        """
+        query = str(request.data.get("query", "")).strip()
+        filters = request.data.get("filters") or {}
+        favorites_only = False
+        if isinstance(filters, dict):
+            filters = dict(filters)
+            favorites_only = filters.pop("favorites_only", False)
+        cursor = request.data.get("cursor") or None
+        include_total = bool(request.data.get("include_total", False))
 
-            equipment_qs = equipment_qs.filter(
-                Q(name__icontains=query)
-                | Q(serial_number__icontains=query)
-                | Q(inventory_number__icontains=query)
-                | Q(model__icontains=query)
-                | Q(manufacturer__name__icontains=query)
-                | Q(location__icontains=query)
-                | Q(notes__icontains=query)
+        try:
+            page_size = min(max(int(request.data.get("page_size", 25)), 1), 100)
+            condition = compile_filters(filters)
+            sort_field, descending = compile_sort(
+                request.data.get("sort_by", "name"),
+                request.data.get("sort_order", "asc"),
             )
-
-        # Фільтри
-        if filters.get("status"):
-            equipment_qs = equipment_qs.filter(status__in=filters["status"])
-
-        if filters.get("category"):
-            equipment_qs = equipment_qs.filter(category__in=filters["category"])
-
-        if filters.get("manufacturer"):
-            equipment_qs = equipment_qs.filter(manufacturer__in=filters["manufacturer"])
-
-        if filters.get("department"):
-            equipment_qs = equipment_qs.filter(department__in=filters["department"])
-
-        if filters.get("current_user"):
-            equipment_qs = equipment_qs.filter(current_user__in=filters["current_user"])
-
-        if filters.get("location"):
-            equipment_qs = equipment_qs.filter(location__icontains=filters["location"])
-
-        # Фільтри дат
-        if filters.get("purchase_date_from"):
-            equipment_qs = equipment_qs.filter(
-                purchase_date__gte=filters["purchase_date_from"]
+        except FilterValidationError as e:
+            return Response(
+                {"success": False, "errors": e.errors},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-
-        if filters.get("purchase_date_to"):
-            equipment_qs = equipment_qs.filter(
-                purchase_date__lte=filters["purchase_date_to"]
+        except (TypeError, ValueError):
+            return Response(
+                {"success": False, "errors": {"page_size": "Очікується число"}},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if filters.get("warranty_expiring_days"):
-            from datetime import timedelta
+        equipment_qs = Equipment.objects.filter(condition)
 
-            cutoff_date = timezone.now().date() + timedelta(
-                days=int(filters["warranty_expiring_days"])
-            )
+        # Текстовий пошук через пошуковий індекс
+        if query:
             equipment_qs = equipment_qs.filter(
-                warranty_until__lte=cutoff_date,
-                warranty_until__gte=timezone.now().date(),
+                pk__in=SearchService.matching_ids("equipment", query)
             )
 
-        if filters.get("needs_maintenance"):
+        # Тільки улюблене обладнання користувача
+        if favorites_only:
+            preferences = PersonalizationService.get_user_preferences(request.user)
             equipment_qs = equipment_qs.filter(
-                next_maintenance_date__lte=timezone.now().date()
+                id__in=preferences.favorite_equipment.values("id")
             )
 
-        # Фільтри вартості
-        if filters.get("price_from"):
-            equipment_qs = equipment_qs.filter(
-                purchase_price__gte=filters["price_from"]
+        total = None
+        if include_total:
+            cache_key = spec_cache_key(
+                "advanced_search_count",
+                query,
+                filters,
+                request.user.pk if favorites_only else None,
             )
-
-        if filters.get("price_to"):
-            equipment_qs = equipment_qs.filter(purchase_price__lte=filters["price_to"])
-
-        # Тільки улюблене обладнання користувача
-        if filters.get("favorites_only"):
-            preferences = PersonalizationService.get_user_preferences(request.user)
-            favorite_ids = preferences.favorite_equipment.values_list("id", flat=True)
-            equipment_qs = equipment_qs.filter(id__in=favorite_ids)
-
-        # Сортування
-        sort_field = sort_by
-        if sort_order == "desc":
-            sort_field = f"-{sort_field}"
-
-        equipment_qs = equipment_qs.select_related(
-            "manufacturer",
-            "category",
-            "department",
-            "current_user",
-            "responsible_person",
-        ).order_by(sort_field)
-
-        # Пагінація
-        from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-
-        paginator = Paginator(equipment_qs, page_size)
+            total = cache.get(cache_key)
+            if total is None:
+                total = equipment_qs.count()
+                cache.set(cache_key, total, settings.ADVANCED_SEARCH_COUNT_TIMEOUT)
 
         try:
-            equipment_page = paginator.page(page)
-        except PageNotAnInteger:
-            equipment_page = paginator.page(1)
-        except EmptyPage:
-            equipment_page = paginator.page(paginator.num_pages)
+            page, next_cursor = keyset_paginate(
+                equipment_qs.select_related("current_user", "responsible_person"),
+                sort_field,
+                descending=descending,
+                page_size=page_size,
+                cursor=cursor,
+            )
+        except ValueError:
+            return Response(
+                {"success": False, "errors": {"cursor": "Невірний курсор"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         # Серіалізувати результати
         results = []
-        for eq in equipment_page:
+        for eq in page:
             results.append(
                 {
                     "id": eq.id,
@@ -2305,9 +2411,13 @@ class AdvancedSearchView(APIView):
                     "model": eq.model,
                     "status": eq.status,
                     "status_display": eq.get_status_display(),
-                    "manufacturer": eq.manufacturer.name if eq.manufacturer else None,
-                    "category": eq.category.name if eq.category else None,
-                    "department": eq.department.name if eq.department else None,
+                    "manufacturer": eq.manufacturer or None,
+                    "category": eq.get_category_display(),
+                    "department": (
+                        eq.current_user.get_department_display()
+                        if eq.current_user and eq.current_user.department
+                        else None
+                    ),
                     "current_user": (
                         eq.current_user.get_full_name() if eq.current_user else None
                     ),
@@ -2335,15 +2445,14 @@ class AdvancedSearchView(APIView):
                 "success": True,
                 "results": results,
                 "pagination": {
-                    "total": paginator.count,
-                    "pages": paginator.num_pages,
-                    "current_page": equipment_page.number,
-                    "has_next": equipment_page.has_next(),
-                    "has_previous": equipment_page.has_previous(),
+                    "total": total,
+                    "next_cursor": next_cursor,
+                    "has_next": next_cursor is not None,
                     "page_size": page_size,
                 },
                 "query": query,
-                "filters_applied": len([k for k, v in filters.items() if v]),
+                "filters_applied": len([k for k, v in filters.items() if v])
+                + int(bool(favorites_only)),
             }
         )
 
@@ -2361,44 +2470,8 @@ class SearchSuggestionsView(APIView):
         if len(query) < 2:
             return Response({"success": True, "suggestions": []})
 
-        suggestions = []
-
-        # Пошук по назвах обладнання
-        equipment_names = (
-            Equipment.objects.filter(name__icontains=query)
-            .values_list("name", flat=True)
-            .distinct()[: limit // 2]
-        )
-
-        for name in equipment_names:
-            suggestions.append(
-                {"text": name, "type": "equipment_name", "category": "Назви обладнання"}
-            )
-
-        # Пошук по серійних номерах
-        serial_numbers = (
-            Equipment.objects.filter(serial_number__icontains=query)
-            .values_list("serial_number", flat=True)
-            .distinct()[: limit // 4]
-        )
-
-        for serial in serial_numbers:
-            suggestions.append(
-                {"text": serial, "type": "serial_number", "category": "Серійні номери"}
-            )
-
-        # Пошук по локаціях
-        locations = (
-            Equipment.objects.filter(location__icontains=query)
-            .values_list("location", flat=True)
-            .distinct()[: limit // 4]
-        )
-
-        for location in locations:
-            if location:  # Перевірити що локація не пуста
-                suggestions.append(
-                    {"text": location, "type": "location", "category": "Локації"}
-                )
+        # Префіксний індекс у пам'яті процесу, без запитів до БД
+        suggestions = SuggestionService.suggest(query, limit)
 
         return Response({"success": True, "suggestions": suggestions[:limit]})
 
@@ -2796,15 +2869,9 @@ class MaintenanceRequestViewSet(ModelViewSet):
         if request_type_filter:
             queryset = queryset.filter(request_type=request_type_filter)
 
-        queryset = queryset.order_by("-requested_date")
-
-        # Пагінація
-        page = int(request.query_params.get("page", 1))
-        page_size = 25
-        total = queryset.count()
-        start = (page - 1) * page_size
-        end = start + page_size
-        page_queryset = queryset[start:end]
+        # Пагінація курсором за (requested_date, id)
+        paginator = KeysetPagination(ordering="-requested_date")
+        page_queryset = paginator.paginate_queryset(queryset, request)
 
         results = []
         for mr in page_queryset:
@@ -2867,14 +2934,7 @@ class MaintenanceRequestViewSet(ModelViewSet):
                 }
             )
 
-        return Response(
-            {
-                "count": total,
-                "next": None if end >= total else f"?page={page + 1}",
-                "previous": None if page <= 1 else f"?page={page - 1}",
-                "results": results,
-            }
-        )
+        return paginator.get_paginated_response(results)
 
     def create(self, request):
         """Створити новий запит на ТО"""
@@ -3477,19 +3537,14 @@ class SparePartMovementView(APIView):
 
         movements_qs = SparePartMovement.objects.select_related(
             "spare_part", "performed_by", "equipment"
-        ).order_by("-performed_at")
+        )
 
         if spare_part_id:
             movements_qs = movements_qs.filter(spare_part_id=spare_part_id)
 
-        # Пагінація
-        page_size = int(request.GET.get("page_size", 20))
-        page = int(request.GET.get("page", 1))
-        start = (page - 1) * page_size
-        end = start + page_size
-
-        movements = movements_qs[start:end]
-        total_count = movements_qs.count()
+        # Пагінація курсором за (performed_at, id)
+        paginator = KeysetPagination(ordering="-performed_at", page_size=20)
+        movements = paginator.paginate_queryset(movements_qs, request)
 
         data = []
         for movement in movements:
@@ -3525,12 +3580,7 @@ class SparePartMovementView(APIView):
             {
                 "success": True,
                 "movements": data,
-                "pagination": {
-                    "page": page,
-                    "page_size": page_size,
-                    "total": total_count,
-                    "has_next": end < total_count,
-                },
+                "pagination": paginator.get_pagination_meta(),
             }
         )
 
@@ -3987,6 +4037,7 @@ def get_spare_parts_for_equipment(request, equipment_id):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@cached_analytics("spare_parts_analytics", tags=("spare_parts",))
 def spare_parts_analytics(request):
     """Аналітика по запчастинах"""
     from datetime import timedelta
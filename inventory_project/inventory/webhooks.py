@@ -1,13 +1,24 @@
 # inventory/webhooks.py — Webhook інтеграція (Slack/Teams)
+import asyncio
 import hashlib
 import hmac
 import json
 import logging
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import timedelta
 
-import requests as http_requests
+import aiohttp
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Avg, Count, F, Max, Q
+from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 
 from rest_framework import serializers, viewsets
@@ -15,9 +26,13 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from .pagination import KeysetPagination
+
 logger = logging.getLogger("inventory")
 User = get_user_model()
 
+ROUTES_GENERATION_KEY = "webhooks:routes:gen"
+
 
 # ============ MODELS ============
 
@@ -30,6 +45,14 @@ class WebhookConfig(models.Model):
         max_length=255, blank=True, default="", verbose_name="Секретний ключ"
     )
     active = models.BooleanField(default=True, verbose_name="Активний")
+    max_concurrency = models.PositiveSmallIntegerField(
+        default=2, verbose_name="Одночасних запитів"
+    )
+    batch_size = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name="Подій в одному запиті",
+        help_text="Більше 1 — ендпоінт приймає JSON-масив подій",
+    )
     created_by = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, verbose_name="Створив"
     )
@@ -54,6 +77,9 @@ class WebhookLog(models.Model):
     response_status = models.IntegerField(null=True, blank=True)
     response_body = models.TextField(blank=True, default="")
     success = models.BooleanField(default=False)
+    duration_ms = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="Тривалість, мс"
+    )
     sent_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -61,6 +87,130 @@ class WebhookLog(models.Model):
         ordering = ["-sent_at"]
         verbose_name = "Лог Webhook"
         verbose_name_plural = "Логи Webhooks"
+        indexes = [
+            # Сторінки логів webhook курсором за (sent_at, id)
+            models.Index(fields=["webhook", "-sent_at"], name="idx_webhook_log_recent"),
+            # Видалення за терміном зберігання
+            models.Index(fields=["sent_at"], name="idx_webhook_log_sent"),
+        ]
+
+
+class WebhookDelivery(models.Model):
+    """
+    Черга доставки (outbox): подія записується в транзакції, що її породила,
+    а відправляє її WebhookDispatcher із завдання Celery
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "Очікує"),
+        ("SENDING", "Відправляється"),
+        ("DELIVERED", "Доставлено"),
+        ("DEAD", "Не доставлено"),
+    ]
+
+    webhook = models.ForeignKey(
+        WebhookConfig, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    event = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    # Мітка воркера, що тримає оренду; результат записує лише її власник
+    claim_token = models.UUIDField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        app_label = "inventory"
+        verbose_name = "Доставка Webhook"
+        verbose_name_plural = "Доставки Webhooks"
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="idx_webhook_delivery_due"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event} → {self.webhook_id} ({self.status})"
+
+
+# ============ ROUTING ============
+
+
+def _generation_seed():
+    # Генерація, що зникла з кешу, починається з поточного часу в наносекундах,
+    # щоб не збігтися з уже побаченою процесом після кількох збільшень
+    return time.time_ns()
+
+
+class WebhookRoutes:
+    """
+    Таблиця маршрутів процесу: подія -> id активних webhooks.
+    Підписка — точна назва події, префікс "equipment.*" або "*".
+    Актуальність перевіряється одним читанням генерації з кешу; зміни
+    конфігурацій збільшують її після фіксації, і кожен процес перебудовує
+    таблицю одним запитом. Пошук підписників не звертається до БД.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.exact = {}
+        self.prefixes = {}
+
+    def rebuild(self, generation):
+        exact, prefixes = {}, {}
+        rows = WebhookConfig.objects.filter(active=True).values_list("id", "events")
+        for webhook_id, events in rows.order_by("pk"):
+            for event in events or []:
+                if not isinstance(event, str):
+                    continue
+                if event == "*" or event.endswith(".*"):
+                    prefixes.setdefault(event[:-1], []).append(webhook_id)
+                else:
+                    exact.setdefault(event, []).append(webhook_id)
+        self.exact, self.prefixes = exact, prefixes
+        self.generation = generation
+
+    def ensure_current(self):
+        current = cache.get(ROUTES_GENERATION_KEY)
+        # Генерації немає (кеш очищено) — пропущені зміни невідомі, перебудувати
+        reset = current is None
+        if reset:
+            cache.add(ROUTES_GENERATION_KEY, _generation_seed(), None)
+            current = cache.get(ROUTES_GENERATION_KEY, 0)
+        elif current == self.generation:
+            return
+        with self.lock:
+            if reset or current != self.generation:
+                self.rebuild(current)
+
+    def subscribers(self, event):
+        """id webhooks, підписаних на event, без повторів"""
+        self.ensure_current()
+        found = dict.fromkeys(self.exact.get(event, ()))
+        # "a.b.c" відповідають префікси "", "a.", "a.b."
+        prefix = ""
+        for part in event.split(".")[:-1]:
+            found.update(dict.fromkeys(self.prefixes.get(prefix, ())))
+            prefix += part + "."
+        found.update(dict.fromkeys(self.prefixes.get(prefix, ())))
+        return list(found)
+
+    @staticmethod
+    def invalidate():
+        """Після змін конфігурацій: усі процеси перебудують таблицю"""
+        cache.add(ROUTES_GENERATION_KEY, _generation_seed(), None)
+        try:
+            cache.incr(ROUTES_GENERATION_KEY)
+        except ValueError:
+            cache.delete(ROUTES_GENERATION_KEY)
+
+
+_routes = WebhookRoutes()
 
 
 # ============ SERVICE ============
@@ -81,21 +231,55 @@ class WebhookService:
 
     @staticmethod
     def send_webhook(event: str, payload: dict):
-        """Надіслати webhook для всіх активних конфігурацій з відповідною подією"""
-        webhooks = WebhookConfig.objects.filter(active=True)
-        for webhook in webhooks:
-            if event in webhook.events:
-                WebhookService._deliver(webhook, event, payload)
+        """
+        Поставити подію в чергу доставки для всіх активних конфігурацій,
+        підписаних на неї. Рядки пишуться в поточній транзакції, тож подія
+        не загубиться і не піде, якщо транзакцію буде відкочено; відправку
+        запускає deliver_webhooks після фіксації.
+        """
+        subscribers = _routes.subscribers(event)
+        if not subscribers:
+            return []
+        # id перевіряються за первинним ключем: конфігурацію могли видалити
+        # чи вимкнути в іншому процесі до того, як він збільшив генерацію
+        deliveries = [
+            WebhookDelivery(webhook_id=webhook_id, event=event, payload=payload)
+            for webhook_id in WebhookConfig.objects.filter(
+                pk__in=subscribers, active=True
+            ).values_list("pk", flat=True)
+        ]
+        if not deliveries:
+            return []
+        WebhookDelivery.objects.bulk_create(deliveries)
+        transaction.on_commit(_schedule_delivery)
+        return deliveries
 
     @staticmethod
-    def _deliver(webhook: WebhookConfig, event: str, payload: dict):
-        """Доставити webhook"""
+    def build_request(webhook: WebhookConfig, events: list):
+        """
+        Тіло та заголовки запиту для [(подія, payload), ...].
+        Одна подія відправляється як є (або у форматі Slack/Teams),
+        кілька — JSON-масивом [{"event": ..., "payload": ...}, ...].
+        """
+        if len(events) == 1:
+            event, payload = events[0]
+            if "hooks.slack.com" in webhook.url:
+                data = WebhookService._format_slack(event, payload)
+            elif "webhook.office.com" in webhook.url or "microsoft.com" in webhook.url:
+                data = WebhookService._format_teams(event, payload)
+            else:
+                data = payload
+        else:
+            event = "batch"
+            data = [{"event": name, "payload": payload} for name, payload in events]
+
+        body = json.dumps(data, ensure_ascii=False, default=str)
         headers = {
             "Content-Type": "application/json",
             "X-Webhook-Event": event,
         }
-
-        body = json.dumps(payload, ensure_ascii=False, default=str)
+        if len(events) > 1:
+            headers["X-Webhook-Batch-Size"] = str(len(events))
 
         if webhook.secret:
             signature = hmac.new(
@@ -103,34 +287,27 @@ class WebhookService:
             ).hexdigest()
             headers["X-Webhook-Signature"] = f"sha256={signature}"
 
-        # Визначити формат за URL
-        if "hooks.slack.com" in webhook.url:
-            body = json.dumps(
-                WebhookService._format_slack(event, payload),
-                ensure_ascii=False,
-                default=str,
-            )
-        elif "webhook.office.com" in webhook.url or "microsoft.com" in webhook.url:
-            body = json.dumps(
-                WebhookService._format_teams(event, payload),
-                ensure_ascii=False,
-                default=str,
-            )
-
-        log = WebhookLog(webhook=webhook, event=event, payload=payload)
+        return body, headers
 
-        try:
-            resp = http_requests.post(
-                webhook.url, data=body, headers=headers, timeout=10
-            )
-            log.response_status = resp.status_code
-            log.response_body = resp.text[:2000]
-            log.success = 200 <= resp.status_code < 300
-        except Exception as e:
-            log.response_body = str(e)[:2000]
-            log.success = False
+    @staticmethod
+    def accepts_batch(webhook: WebhookConfig):
+        """Slack і Teams приймають лише одне повідомлення на запит"""
+        return (
+            webhook.batch_size > 1
+            and "hooks.slack.com" not in webhook.url
+            and "webhook.office.com" not in webhook.url
+            and "microsoft.com" not in webhook.url
+        )
 
+    @staticmethod
+    def _deliver(webhook: WebhookConfig, event: str, payload: dict):
+        """Доставити webhook одразу, в обхід черги (тестове надсилання)"""
+        dispatcher = WebhookDispatcher()
+        job = dispatcher.make_job(webhook, [(event, payload)])
+        (result,) = asyncio.run(dispatcher.post_all([job]))
+        log = dispatcher.make_log(job, *result)[0]
         log.save()
+        return log
 
     @staticmethod
     def _format_slack(event: str, payload: dict) -> dict:
@@ -177,6 +354,391 @@ class WebhookService:
         }
 
 
+# ============ DELIVERY ============
+
+
+def _schedule_delivery():
+    """Запустити доставку після фіксації; якщо брокер недоступний — підбере beat"""
+    from .tasks import deliver_webhooks
+
+    try:
+        deliver_webhooks.delay()
+    except Exception as e:
+        logger.warning(f"Не вдалося запустити доставку webhooks: {e}")
+
+
+# Коди відповіді, після яких повтор має сенс; інші 4xx — одразу в DEAD
+RETRYABLE_CLIENT_ERRORS = {408, 409, 425, 429}
+
+
+class WebhookJob:
+    """Один POST: конфігурація, події, доставки з черги та підготовлений запит"""
+
+    def __init__(self, webhook, events, deliveries, body, headers):
+        self.webhook = webhook
+        self.events = events
+        self.deliveries = deliveries
+        self.body = body
+        self.headers = headers
+
+
+class WebhookDispatcher:
+    """
+    Розбирає чергу WebhookDelivery. Рядки забираються через
+    SELECT ... FOR UPDATE SKIP LOCKED з орендою locked_until на весь час
+    розсилки пачки, тож кілька воркерів Celery працюють паралельно без
+    подвійної відправки, а рядки впалого воркера повертаються в роботу після
+    закінчення оренди. Результат записується лише для рядків, чия
+    claim_token досі належить цьому claim.
+    Запити йдуть конкурентно через одну aiohttp-сесію з пулом з'єднань,
+    з обмеженням max_concurrency на кожен ендпоінт. Невдалі доставки
+    повторюються з експоненційною затримкою, після WEBHOOK_MAX_ATTEMPTS
+    спроб переходять у DEAD.
+    """
+
+    def __init__(self, batch=None):
+        self.batch = batch or settings.WEBHOOK_DRAIN_BATCH
+        self.logs = WebhookLogBuffer()
+
+    def claim(self):
+        """Забрати до self.batch доставок, яким настав час, під новою claim_token"""
+        now = timezone.now()
+        token = uuid.uuid4()
+        with transaction.atomic():
+            deliveries = list(
+                WebhookDelivery.objects.select_for_update(
+                    skip_locked=True, of=("self",)
+                )
+                .filter(
+                    Q(status="PENDING", next_attempt_at__lte=now)
+                    | Q(status="SENDING", locked_until__lt=now),
+                    webhook__active=True,
+                )
+                .select_related("webhook")
+                .order_by("next_attempt_at", "pk")[: self.batch]
+            )
+            if deliveries:
+                locked_until = now + self.lease(deliveries)
+                WebhookDelivery.objects.filter(
+                    pk__in=[d.pk for d in deliveries]
+                ).update(status="SENDING", locked_until=locked_until, claim_token=token)
+                for delivery in deliveries:
+                    delivery.status = "SENDING"
+                    delivery.locked_until = locked_until
+                    delivery.claim_token = token
+        return sorted(deliveries, key=lambda d: d.pk)
+
+    @staticmethod
+    def lease(deliveries):
+        """
+        Оренда на всю пачку: запити до ендпоінта йдуть хвилями по
+        max_concurrency, кожна не довша за WEBHOOK_TIMEOUT, плюс одна хвиля
+        запасу на запис результатів
+        """
+        by_webhook = {}
+        for delivery in deliveries:
+            by_webhook.setdefault(delivery.webhook_id, []).append(delivery)
+        waves = 0
+        for items in by_webhook.values():
+            webhook = items[0].webhook
+            size = webhook.batch_size if WebhookService.accepts_batch(webhook) else 1
+            requests = math.ceil(len(items) / size)
+            waves = max(waves, math.ceil(requests / max(1, webhook.max_concurrency)))
+        return timedelta(seconds=settings.WEBHOOK_TIMEOUT * (waves + 1))
+
+    def make_job(self, webhook, events, deliveries=()):
+        body, headers = WebhookService.build_request(webhook, events)
+        return WebhookJob(webhook, events, list(deliveries), body, headers)
+
+    def jobs(self, deliveries):
+        """Згрупувати доставки по ендпоінтах у пачки по batch_size"""
+        by_webhook = {}
+        for delivery in deliveries:
+            by_webhook.setdefault(delivery.webhook_id, []).append(delivery)
+        jobs = []
+        for items in by_webhook.values():
+            webhook = items[0].webhook
+            size = webhook.batch_size if WebhookService.accepts_batch(webhook) else 1
+            for start in range(0, len(items), size):
+                chunk = items[start : start + size]
+                events = [(d.event, d.payload) for d in chunk]
+                jobs.append(self.make_job(webhook, events, chunk))
+        return jobs
+
+    async def post_all(self, jobs):
+        """[(статус, тіло відповіді, помилка, мс), ...] у порядку jobs"""
+        semaphores = {}
+        timeout = aiohttp.ClientTimeout(total=settings.WEBHOOK_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit=settings.WEBHOOK_MAX_CONNECTIONS)
+
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout
+        ) as session:
+
+            async def post(job):
+                semaphore = semaphores.setdefault(
+                    job.webhook.pk,
+                    asyncio.Semaphore(max(1, job.webhook.max_concurrency)),
+                )
+                async with semaphore:
+                    started = time.monotonic()
+                    try:
+                        async with session.post(
+                            job.webhook.url, data=job.body.encode(), headers=job.headers
+                        ) as resp:
+                            text = await resp.text(errors="replace")
+                            status, error = resp.status, ""
+                    except Exception as e:
+                        text, status = "", None
+                        error = str(e) or e.__class__.__name__
+                    duration = int((time.monotonic() - started) * 1000)
+                    limit = settings.WEBHOOK_LOG_BODY_LIMIT
+                    return status, text[:limit], error[:limit], duration
+
+            return await asyncio.gather(*(post(job) for job in jobs))
+
+    def make_log(self, job, status, body, error, duration):
+        success = status is not None and 200 <= status < 300
+        return [
+            WebhookLog(
+                webhook=job.webhook,
+                event=event,
+                payload=payload,
+                response_status=status,
+                response_body=body or error,
+                success=success,
+                duration_ms=duration,
+            )
+            for event, payload in job.events
+        ]
+
+    @staticmethod
+    def backoff(attempts):
+        """Затримка перед наступною спробою: base * 2^(n-1) до max, з jitter"""
+        delay = min(
+            settings.WEBHOOK_RETRY_BASE * 2 ** (attempts - 1),
+            settings.WEBHOOK_RETRY_MAX,
+        )
+        return timedelta(seconds=delay + random.uniform(0, delay / 10))
+
+    def record(self, jobs, results):
+        """
+        Зберегти результати: логи, DELIVERED, повтори та DEAD. Рядки, оренду
+        яких уже перехопив інший воркер (claim_token змінилася), не чіпаються.
+        """
+        now = timezone.now()
+        delivered, failed = [], []
+        stats = {"delivered": 0, "retried": 0, "dead": 0}
+        claimed = [d for job in jobs for d in job.deliveries]
+
+        with transaction.atomic():
+            tokens = dict(
+                WebhookDelivery.objects.select_for_update()
+                .filter(pk__in=[d.pk for d in claimed])
+                .values_list("pk", "claim_token")
+            )
+            lost = {d.pk for d in claimed if tokens.get(d.pk) != d.claim_token}
+
+            for job, (status, body, error, duration) in zip(jobs, results):
+                self.logs.add(self.make_log(job, status, body, error, duration))
+                deliveries = [d for d in job.deliveries if d.pk not in lost]
+                if status is not None and 200 <= status < 300:
+                    delivered += [d.pk for d in deliveries]
+                    continue
+                permanent = (
+                    status is not None
+                    and 400 <= status < 500
+                    and status not in RETRYABLE_CLIENT_ERRORS
+                )
+                reason = f"HTTP {status}: {body[:500]}" if status else error
+                for delivery in deliveries:
+                    delivery.attempts += 1
+                    delivery.last_error = reason
+                    delivery.locked_until = None
+                    delivery.claim_token = None
+                    if permanent or delivery.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                        delivery.status = "DEAD"
+                        stats["dead"] += 1
+                    else:
+                        delivery.status = "PENDING"
+                        delivery.next_attempt_at = now + self.backoff(delivery.attempts)
+                        stats["retried"] += 1
+                    failed.append(delivery)
+
+            if delivered:
+                WebhookDelivery.objects.filter(pk__in=delivered).update(
+                    status="DELIVERED",
+                    attempts=F("attempts") + 1,
+                    locked_until=None,
+                    claim_token=None,
+                    last_error="",
+                    delivered_at=now,
+                )
+            WebhookDelivery.objects.bulk_update(
+                failed,
+                [
+                    "status",
+                    "attempts",
+                    "next_attempt_at",
+                    "locked_until",
+                    "claim_token",
+                    "last_error",
+                ],
+            )
+        if lost:
+            logger.warning(
+                f"Webhooks: оренду {len(lost)} доставок перехопив інший воркер, "
+                f"результат не записано"
+            )
+        stats["delivered"] = len(delivered)
+        for delivery in failed:
+            if delivery.status == "DEAD":
+                logger.error(
+                    f"Webhook {delivery.webhook.name}: подію {delivery.event} "
+                    f"не доставлено після {delivery.attempts} спроб: "
+                    f"{delivery.last_error}"
+                )
+        return stats
+
+    def drain(self, budget=None):
+        """
+        Розбирати чергу, поки є доставки, яким настав час, або до вичерпання
+        budget секунд. Повертає {"delivered", "retried", "dead"}.
+        """
+        budget = settings.WEBHOOK_DRAIN_SECONDS if budget is None else budget
+        deadline = time.monotonic() + budget
+        totals = {"delivered": 0, "retried": 0, "dead": 0}
+        try:
+            while True:
+                deliveries = self.claim()
+                if not deliveries:
+                    break
+                jobs = self.jobs(deliveries)
+                results = asyncio.run(self.post_all(jobs))
+                for key, value in self.record(jobs, results).items():
+                    totals[key] += value
+                if len(deliveries) < self.batch or time.monotonic() >= deadline:
+                    break
+        finally:
+            self.logs.flush()
+        return totals
+
+
+# ============ LOGS ============
+
+
+class WebhookLogBuffer:
+    """Накопичує WebhookLog і записує їх пачками через bulk_create"""
+
+    def __init__(self, size=None):
+        self.size = size or settings.WEBHOOK_LOG_BUFFER
+        self.items = []
+
+    def add(self, logs):
+        self.items += logs
+        if len(self.items) >= self.size:
+            self.flush()
+
+    def flush(self):
+        if self.items:
+            WebhookLog.objects.bulk_create(self.items, batch_size=self.size)
+            self.items = []
+
+
+def _delete_in_chunks(queryset, chunk):
+    """Видаляти рядки пачками по chunk, кожна в окремій короткій транзакції"""
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:chunk])
+        if not ids:
+            return deleted
+        queryset.model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+class WebhookLogService:
+    """Термін зберігання та агрегати логів доставки"""
+
+    @staticmethod
+    def prune(days=None, chunk=None):
+        """
+        Видалити логи та доставлені рядки черги, старші за
+        WEBHOOK_LOG_RETENTION_DAYS. DEAD-рядки лишаються для redeliver.
+        """
+        days = settings.WEBHOOK_LOG_RETENTION_DAYS if days is None else days
+        chunk = chunk or settings.WEBHOOK_CLEANUP_CHUNK
+        cutoff = timezone.now() - timedelta(days=days)
+        return {
+            "logs": _delete_in_chunks(
+                WebhookLog.objects.filter(sent_at__lt=cutoff), chunk
+            ),
+            "deliveries": _delete_in_chunks(
+                WebhookDelivery.objects.filter(
+                    status="DELIVERED", delivered_at__lt=cutoff
+                ),
+                chunk,
+            ),
+        }
+
+    @staticmethod
+    def stats(webhook, days=7):
+        """Успішність і затримка доставки webhook за останні days днів"""
+        logs = webhook.logs.filter(sent_at__gte=timezone.now() - timedelta(days=days))
+        totals = logs.aggregate(
+            total=Count("id"),
+            succeeded=Count("id", filter=Q(success=True)),
+            avg_ms=Avg("duration_ms"),
+            max_ms=Max("duration_ms"),
+            timed=Count("duration_ms"),
+        )
+        p95 = None
+        if totals["timed"]:
+            p95 = (
+                logs.exclude(duration_ms__isnull=True)
+                .order_by("duration_ms")
+                .values_list("duration_ms", flat=True)[
+                    int((totals["timed"] - 1) * 0.95)
+                ]
+            )
+        queue = dict(
+            webhook.deliveries.filter(status__in=["PENDING", "SENDING", "DEAD"])
+            .values_list("status")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        total = totals["total"]
+        return {
+            "days": days,
+            "total": total,
+            "succeeded": totals["succeeded"],
+            "failed": total - totals["succeeded"],
+            "success_rate": (
+                round(totals["succeeded"] / total * 100, 1) if total else None
+            ),
+            "avg_ms": round(totals["avg_ms"]) if totals["avg_ms"] is not None else None,
+            "p95_ms": p95,
+            "max_ms": totals["max_ms"],
+            "pending": queue.get("PENDING", 0) + queue.get("SENDING", 0),
+            "dead": queue.get("DEAD", 0),
+        }
+
+
+# ============ SIGNALS ============
+
+
+def _config_changed(sender, instance, **kwargs):
+    transaction.on_commit(WebhookRoutes.invalidate)
+
+
+def connect_signals():
+    post_save.connect(
+        _config_changed, sender=WebhookConfig, dispatch_uid="webhook_routes_save"
+    )
+    post_delete.connect(
+        _config_changed, sender=WebhookConfig, dispatch_uid="webhook_routes_delete"
+    )
+
+
 # ============ SERIALIZERS ============
 
 
@@ -186,6 +748,23 @@ class WebhookConfigSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ["created_by", "created_at", "updated_at"]
 
+    def validate_events(self, value):
+        """Назви подій; "*" в кінці дозволено лише як цілий сегмент ("equipment.*")"""
+        if not isinstance(value, list) or not all(
+            isinstance(event, str) and event for event in value
+        ):
+            raise serializers.ValidationError("Очікується список назв подій")
+        for event in value:
+            if "*" in event and not (event == "*" or event.endswith(".*")):
+                raise serializers.ValidationError(
+                    f'Некоректна підписка {event}: використовуйте "equipment.*"'
+                )
+            if "*" in event.rstrip("*"):
+                raise serializers.ValidationError(
+                    f'Некоректна підписка {event}: "*" лише в кінці'
+                )
+        return value
+
 
 class WebhookLogSerializer(serializers.ModelSerializer):
     webhook_name = serializers.CharField(source="webhook.name", read_only=True)
@@ -216,13 +795,40 @@ class WebhookViewSet(viewsets.ModelViewSet):
             "event": "test",
             "timestamp": timezone.now().isoformat(),
         }
-        WebhookService._deliver(webhook, "test", payload)
-        return Response({"status": "sent"})
+        log = WebhookService._deliver(webhook, "test", payload)
+        return Response(
+            {
+                "status": "sent",
+                "success": log.success,
+                "response_status": log.response_status,
+            }
+        )
+
+    @action(detail=True, methods=["post"])
+    def redeliver(self, request, pk=None):
+        """Повернути недоставлені (DEAD) події webhook у чергу"""
+        webhook = self.get_object()
+        count = webhook.deliveries.filter(status="DEAD").update(
+            status="PENDING", attempts=0, next_attempt_at=timezone.now(), last_error=""
+        )
+        if count:
+            transaction.on_commit(_schedule_delivery)
+        return Response({"requeued": count})
 
     @action(detail=True, methods=["get"])
     def logs(self, request, pk=None):
-        """Логи доставки webhook"""
+        """Логи доставки webhook сторінками курсором та агрегати за ?days=N"""
         webhook = self.get_object()
-        logs = webhook.logs.all()[:50]
-        serializer = WebhookLogSerializer(logs, many=True)
-        return Response({"results": serializer.data})
+        try:
+            days = min(max(int(request.query_params.get("days", 7)), 1), 365)
+        except ValueError:
+            days = 7
+
+        paginator = KeysetPagination(ordering="-sent_at", page_size=50)
+        page = paginator.paginate_queryset(
+            webhook.logs.select_related("webhook"), request
+        )
+        serializer = WebhookLogSerializer(page, many=True)
+        response = paginator.get_paginated_response(serializer.data)
+        response.data["stats"] = WebhookLogService.stats(webhook, days)
+        return response
@@ -118,6 +118,30 @@ app.conf.update(
             "schedule": 60.0 * 60.0 * 24.0,  # Кожні 24 години
             "options": {"queue": "maintenance"},
         },
+        # Знімок амортизації за попередній місяць (інкрементно)
+        "snapshot-depreciation": {
+            "task": "inventory.tasks.snapshot_depreciation",
+            "schedule": 60.0 * 60.0 * 24.0,  # Кожні 24 години
+            "options": {"queue": "reports"},
+        },
+        # Звірка лічильників KPI з таблицею обладнання
+        "reconcile-equipment-counters": {
+            "task": "inventory.tasks.reconcile_equipment_counters",
+            "schedule": 60.0 * 60.0,  # Щогодини
+            "options": {"queue": "maintenance"},
+        },
+        # Видалення старих логів webhooks пачками щодня
+        "cleanup-webhook-logs": {
+            "task": "inventory.tasks.cleanup_webhook_logs",
+            "schedule": 60.0 * 60.0 * 24.0,  # Кожні 24 години
+            "options": {"queue": "maintenance"},
+        },
+        # Доставка webhooks з черги: повтори та пропущені запуски
+        "deliver-webhooks": {
+            "task": "inventory.tasks.deliver_webhooks",
+            "schedule": 60.0,  # Щохвилини
+            "options": {"queue": "notifications"},
+        },
     },
     # Маршрутизація завдань по чергах
     task_routes={
@@ -132,6 +156,9 @@ app.conf.update(
         "inventory.tasks.send_daily_digests": {"queue": "notifications"},
         "inventory.tasks.monitor_equipment_health": {"queue": "monitoring"},
         "inventory.tasks.generate_weekly_summary": {"queue": "reports"},
+        "inventory.tasks.snapshot_depreciation": {"queue": "reports"},
+        "inventory.tasks.reconcile_equipment_counters": {"queue": "maintenance"},
+        "inventory.tasks.deliver_webhooks": {"queue": "notifications"},
         "inventory.tasks.detect_equipment_anomalies": {"queue": "analytics"},
     },
     # Налаштування воркерів
@@ -371,6 +371,59 @@ DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="inventory@yourcompany
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.environ.get("MEDIA_ROOT", str(BASE_DIR / "media"))
 
+# Штрих-коди та QR-коди
+# False — зображення не генеруються при save(), коди віддає /api/codes/ на запит
+CODE_IMAGES_ON_SAVE = config("CODE_IMAGES_ON_SAVE", default=True, cast=bool)
+CODE_IMAGE_CACHE_DIR = os.environ.get(
+    "CODE_IMAGE_CACHE_DIR", str(BASE_DIR / "code_cache")
+)
+CODE_IMAGE_CACHE_MAX_FILES = config(
+    "CODE_IMAGE_CACHE_MAX_FILES", default=5000, cast=int
+)
+
+# Аркуші етикеток для друку (inventory/labels.py)
+LABEL_SHEET_WORKERS = config("LABEL_SHEET_WORKERS", default=4, cast=int)
+LABEL_SHEET_PAGES_PER_CHUNK = config("LABEL_SHEET_PAGES_PER_CHUNK", default=5, cast=int)
+LABEL_SHEET_CODE_SIZE = config("LABEL_SHEET_CODE_SIZE", default=6, cast=int)
+# Більші вибірки з адмінки формуються у фоновому завданні Celery
+LABEL_SHEET_SYNC_LIMIT = config("LABEL_SHEET_SYNC_LIMIT", default=240, cast=int)
+
+# Скільки секунд кешувати загальну кількість результатів розширеного пошуку
+ADVANCED_SEARCH_COUNT_TIMEOUT = config(
+    "ADVANCED_SEARCH_COUNT_TIMEOUT", default=60, cast=int
+)
+
+# З якої кількості рядків (за pg_class.reltuples) count у пагінації оцінюється,
+# а не рахується через COUNT(*)
+PAGINATION_ESTIMATE_THRESHOLD = config(
+    "PAGINATION_ESTIMATE_THRESHOLD", default=10000, cast=int
+)
+
+# Кеш результатів аналітики (inventory/analytics_cache.py): час свіжості запису,
+# час блокування перерахунку та скільки інші воркери чекають на результат
+ANALYTICS_CACHE_TIMEOUT = config("ANALYTICS_CACHE_TIMEOUT", default=3600, cast=int)
+ANALYTICS_CACHE_LOCK_TIMEOUT = config(
+    "ANALYTICS_CACHE_LOCK_TIMEOUT", default=60, cast=int
+)
+ANALYTICS_CACHE_WAIT = config("ANALYTICS_CACHE_WAIT", default=5, cast=float)
+
+# Черга доставки webhooks (inventory/webhooks.py): таймаут запиту, пул з'єднань,
+# розмір пачки з черги, час роботи одного запуску та повтори з затримкою
+WEBHOOK_TIMEOUT = config("WEBHOOK_TIMEOUT", default=10, cast=int)
+WEBHOOK_MAX_CONNECTIONS = config("WEBHOOK_MAX_CONNECTIONS", default=20, cast=int)
+WEBHOOK_DRAIN_BATCH = config("WEBHOOK_DRAIN_BATCH", default=100, cast=int)
+WEBHOOK_DRAIN_SECONDS = config("WEBHOOK_DRAIN_SECONDS", default=50, cast=int)
+WEBHOOK_MAX_ATTEMPTS = config("WEBHOOK_MAX_ATTEMPTS", default=8, cast=int)
+WEBHOOK_RETRY_BASE = config("WEBHOOK_RETRY_BASE", default=30, cast=int)
+WEBHOOK_RETRY_MAX = config("WEBHOOK_RETRY_MAX", default=6 * 60 * 60, cast=int)
+# Логи доставки: запис пачками, обрізання відповіді та термін зберігання
+WEBHOOK_LOG_BUFFER = config("WEBHOOK_LOG_BUFFER", default=500, cast=int)
+WEBHOOK_LOG_BODY_LIMIT = config("WEBHOOK_LOG_BODY_LIMIT", default=2000, cast=int)
+WEBHOOK_LOG_RETENTION_DAYS = config(
+    "WEBHOOK_LOG_RETENTION_DAYS", default=30, cast=int
+)
+WEBHOOK_CLEANUP_CHUNK = config("WEBHOOK_CLEANUP_CHUNK", default=5000, cast=int)
+
 # Налаштування кешування
 if DEBUG:
     # Для розробки використовуємо простий кеш